@@ -1,90 +1,157 @@
 """Processes the data and converts it to an ARFF file"""
 
-from pandas import DataFrame, read_csv, Series, merge
+from os import replace
+from pandas import DataFrame, read_csv, merge
+from numpy import ndarray, arange, sort, isnan, concatenate, flatnonzero, result_type, float32, float64, unique
 
+from handler.profiling import profile_stage
 from handler.utils import (
-    ARFF_PATH, PTID_COL, CLUSTERING_PATH, CLUSTER_ID_COL, NUMERIC_COL_TYPE, get_data
+    ARFF_PATH, PTID_COL, CLUSTERING_PATH, CLUSTER_ID_COL, NUMERIC_COL_TYPE, MATRIX_COL_BLOCK_SIZE, get_data,
+    get_n_kept_feats, get_tmp_path
 )
 
+# Scale the numbers to avoid the "duplicate bin range" error when the info gain is computed
+ARFF_SCALE: int = 1000
+
+# The number of values formatted at a time when writing the data of the ARFF
+ARFF_CHUNK_SIZE: int = 1000000
+
+ROW_COL: str = 'row'
+MISSING_VAL: str = '?'
+
 
 def arff_handler(
     cohort: str, dataset: str, cluster_method: str, n_clusters: int, iteration: int, n_kept_feats: int,
-    clustering_score: float
+    clustering_score: float, data: DataFrame = None, col_types: DataFrame = None, clustering: DataFrame = None,
+    do_sparse_arff: bool = False
 ):
     """Main function of this module"""
 
-    # Load the data
-    data, col_types, n_kept_feats = get_data(
-        cohort=cohort, dataset=dataset, cluster_method=cluster_method, n_clusters=n_clusters, iteration=iteration,
-        n_kept_feats=n_kept_feats
-    )
-
-    # Load the clustering
-    clustering_path: str = CLUSTERING_PATH.format(
-        cohort, dataset, cluster_method, n_clusters, iteration, n_kept_feats, clustering_score
-    )
-    clustering: DataFrame = read_csv(clustering_path)
+    # Load the data unless it is already in memory
+    with profile_stage(stage='arff.load'):
+        if data is None:
+            data, col_types, n_kept_feats = get_data(
+                cohort=cohort, dataset=dataset, cluster_method=cluster_method, n_clusters=n_clusters,
+                iteration=iteration, n_kept_feats=n_kept_feats
+            )
+        else:
+            n_kept_feats: int = get_n_kept_feats(col_types=col_types, n_kept_feats=n_kept_feats)
 
-    # Combine the data with the clustering labels
-    data: DataFrame = merge(data, clustering, on=PTID_COL, how='inner')
+        # Load the clustering unless it is already in memory
+        if clustering is None:
+            clustering_path: str = CLUSTERING_PATH.format(
+                cohort, dataset, cluster_method, n_clusters, iteration, n_kept_feats, clustering_score
+            )
+            clustering: DataFrame = read_csv(clustering_path)
 
+    # Line the rows of the data up with the clustering labels without copying the data
     # Since the clustering labels are for selecting features, we do not want to include the patient IDs in the ARFF
-    del data[PTID_COL]
-
-    # Scale the numbers to avoid the "duplicate bin range" error when the info gain is computed
-    data: DataFrame = data * 1000
+    rows: DataFrame = DataFrame({PTID_COL: data[PTID_COL], ROW_COL: arange(data.shape[0])})
+    rows: DataFrame = merge(rows, clustering, on=PTID_COL, how='inner')
 
     # Convert the data to ARFF format and save it as an ARFF file
     arff_path: str = ARFF_PATH.format(cohort, dataset, cluster_method, n_clusters, iteration, n_kept_feats)
-    save_data(arff_path=arff_path, arff_data=data, col_types=col_types, target_col=CLUSTER_ID_COL, cohort=cohort)
+
+    with profile_stage(stage='arff.save'):
+        save_data(
+            arff_path=arff_path, arff_data=data, rows=rows[ROW_COL].to_numpy(),
+            labels=rows[CLUSTER_ID_COL].to_numpy(), col_types=col_types, target_col=CLUSTER_ID_COL, cohort=cohort,
+            do_sparse_arff=do_sparse_arff
+        )
 
 
-def save_data(arff_path: str, arff_data: DataFrame, col_types: DataFrame, target_col: str, cohort: str):
-    """Stores the data on disk as an ARFF and a CSV"""
+def save_data(
+    arff_path: str, arff_data: DataFrame, rows: ndarray, labels: ndarray, col_types: DataFrame, target_col: str,
+    cohort: str, do_sparse_arff: bool
+):
+    """Streams the given rows of the data and their labels to an ARFF, a chunk of rows at a time"""
 
-    # Save the data of the ARFF as a CSV so the header can be added to it
-    arff_data.to_csv(arff_path, index=False)
+    # The column types decide the features since an in-memory data set keeps the features that were not selected
+    feats: list = list(col_types)
+    feat_idxs: ndarray = arff_data.columns.get_indexer(feats)
 
-    # Open the ARFF as a text file to edit
-    with open(arff_path, 'r') as f:
-        arff: str = f.read()
+    # Numbers are formatted with enough digits to be read back exactly
+    dtype = result_type(*arff_data.dtypes.iloc[feat_idxs], float32)
+    fmt: str = '%.9g' if dtype == float32 else '%.17g'
+    dtype = float32 if dtype == float32 else float64
 
-    # Remove the first line
-    arff: list = arff.split('\n')
-    arff: list = arff[1:]
+    is_nominal: ndarray = (col_types.loc[0, feats] != NUMERIC_COL_TYPE).to_numpy()
+    categories: dict = get_categories(
+        arff_data=arff_data, rows=rows, feat_idxs=feat_idxs[is_nominal], dtype=dtype, fmt=fmt
+    )
+    target_categories: list = ['%d' % label for label in unique(labels)]
 
-    # Remove empty strings
-    while '' in arff:
-        arff.remove('')
+    # The ARFF only appears at its path once it is completely written
+    tmp_path: str = get_tmp_path(path=arff_path)
 
-    # Make the header
-    header: list = ['@RELATION {}'.format(cohort.upper())]
+    with open(tmp_path, 'w') as f:
+        # Write the header
+        f.write('@RELATION {}\n'.format(cohort.upper()))
 
-    col_names: list = list(arff_data)
-    for col_name in col_names:
-        line: str = '@ATTRIBUTE {}'.format(col_name)
+        for feat_idx, feat in zip(feat_idxs, feats):
+            if feat_idx in categories:
+                f.write('@ATTRIBUTE {} {{{}}}\n'.format(feat, ','.join(categories[feat_idx])))
+            else:
+                f.write('@ATTRIBUTE {} NUMERIC\n'.format(feat))
 
-        if col_name == target_col:
-            is_numeric: bool = False
-        else:
-            is_numeric: bool = col_types.loc[0, col_name] == NUMERIC_COL_TYPE
+        f.write('@ATTRIBUTE {} {{{}}}\n'.format(target_col, ','.join(target_categories)))
+        f.write('@DATA\n')
 
-        if is_numeric:
-            line += ' ' + 'NUMERIC'
-        else:
-            col: Series = arff_data[col_name]
-            categories: set = set(col.unique())
-            line += ' ' + str(categories).replace(' ', '')
+        # Write the data
+        n_chunk_rows: int = max(1, ARFF_CHUNK_SIZE // max(len(feats), 1))
+        row_fmt: str = ','.join([fmt] * len(feats) + ['%d'])
+
+        for start in range(0, len(rows), n_chunk_rows):
+            chunk: ndarray = arff_data.iloc[rows[start:start + n_chunk_rows], feat_idxs].to_numpy(dtype=dtype)
+            chunk: ndarray = chunk * dtype(ARFF_SCALE)
+            chunk_labels: ndarray = labels[start:start + n_chunk_rows]
+
+            if do_sparse_arff:
+                lines: list = [
+                    get_sparse_line(row=row, label=label, fmt=fmt) for row, label in zip(chunk, chunk_labels)
+                ]
+            else:
+                # Missing values are the only ones formatted as "nan"
+                lines: list = [
+                    (row_fmt % (*row, label)).replace('nan', MISSING_VAL)
+                    for row, label in zip(chunk.tolist(), chunk_labels.tolist())
+                ]
+
+            f.write('\n'.join(lines) + '\n')
+
+    replace(tmp_path, arff_path)
+
+
+def get_categories(arff_data: DataFrame, rows: ndarray, feat_idxs: ndarray, dtype, fmt: str) -> dict:
+    """Gets the formatted categories of each nominal feature, a block of features at a time"""
+
+    categories: dict = {}
+
+    for start in range(0, len(feat_idxs), MATRIX_COL_BLOCK_SIZE):
+        block_idxs: ndarray = feat_idxs[start:start + MATRIX_COL_BLOCK_SIZE]
+        block: ndarray = arff_data.iloc[rows, block_idxs].to_numpy(dtype=dtype) * dtype(ARFF_SCALE)
+
+        # The distinct values of every column are where its sorted values change
+        block: ndarray = sort(block, axis=0)
+        is_new: ndarray = concatenate([block[:1] == block[:1], block[1:] != block[:-1]], axis=0) & ~isnan(block)
+
+        for i, feat_idx in enumerate(block_idxs):
+            vals: ndarray = block[is_new[:, i], i]
+
+            # Values omitted from a row of a sparse ARFF take the first category so zero must come first
+            vals: ndarray = concatenate([vals[vals == 0], vals[vals != 0]])
+            categories[feat_idx] = [fmt % val for val in vals.tolist()]
+
+    return categories
 
-        header.append(line)
 
-    header.append('@DATA')
+def get_sparse_line(row: ndarray, label: int, fmt: str) -> str:
+    """Formats a row of the data as a line of a sparse ARFF which only includes the values that are not zero"""
 
-    # Attach the header to the ARFF
-    header.extend(arff)
-    arff: list = header
+    # Missing values are not zero so they are included
+    idxs: ndarray = flatnonzero(row != 0)
+    vals: list = [MISSING_VAL if val != val else fmt % val for val in row[idxs].tolist()]
+    vals.append('%d' % label)
+    idxs: list = idxs.tolist() + [len(row)]
 
-    # Rewrite the ARFF with the header included
-    with open(arff_path, 'w') as f:
-        for line in arff:
-            f.write(line + '\n')
+    return '{' + ','.join('{} {}'.format(idx, val) for idx, val in zip(idxs, vals)) + '}'
@@ -0,0 +1,272 @@
+"""Times the handlers and the pipeline on synthetic cohorts of several sizes and records the times to compare later"""
+
+import sys
+from os import chdir, getcwd, makedirs, mkdir, popen
+from os.path import abspath, join, isdir, isfile
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import perf_counter
+from datetime import datetime
+from platform import node
+from json import dumps, loads
+from subprocess import run
+from pandas import DataFrame, Series
+from numpy import ndarray, median, nan, float32
+from numpy.random import default_rng
+
+from handler.synthetic import synthetic_data_handler
+from handler.combine import combine_handler, remove_constant_cols_and_normalize
+from handler.cluster import cluster_handler
+from handler.arff import arff_handler
+from handler.feat_select import feat_select_handler
+from handler.pipeline import pipeline_handler, make_data_dirs, ITER_DIR
+from handler.utils import DATA_DIR
+
+BENCHMARK_COHORT: str = 'synthetic'
+BENCHMARK_DATASET: str = 'combined'
+
+# The modules whose import is timed, since the pipeline imports main and a handler several times every iteration
+IMPORT_MODULES: tuple = (
+    'main', 'handler.combine', 'handler.cluster', 'handler.arff', 'handler.feat_select', 'handler.pipeline',
+    'handler.best_clustering', 'handler.counts', 'handler.report', 'handler.plot_clustering'
+)
+
+# The fields of a benchmark result which must match for its times to be compared with an earlier result
+CONFIG_FIELDS: tuple = (
+    'stage', 'n_ptids', 'n_feats', 'nominal_ratio', 'n_true_clusters', 'cluster_method', 'n_clusters', 'ranker',
+    'n_iterations'
+)
+
+
+def benchmark_handler(
+    scales: list, n_ptids: int, n_feats: int, nominal_ratio: float, n_true_clusters: int, informative_ratio: float,
+    cluster_separation: float, cluster_method: str, n_clusters: int, n_iterations: int, ranker: str, n_repeats: int,
+    results_path: str, seed: int, do_imports_only: bool = False, max_slowdown: float = None
+):
+    """Main method of this module"""
+
+    results_path: str = abspath(results_path)
+    prev_results: dict = load_prev_results(results_path=results_path)
+    commit: str = popen('git rev-parse --short HEAD 2> /dev/null').read().strip() or None
+    start_time: str = datetime.now().isoformat(timespec='seconds')
+    results: list = []
+
+    # The imports do not depend on the size of the data so their results only have a stage
+    import_config: dict = dict.fromkeys(CONFIG_FIELDS[1:])
+    results += get_results(stage_times=time_imports(n_repeats=n_repeats), config=import_config)
+
+    # The handlers read and write relative to the working directory so the benchmark runs in an empty one
+    # which keeps the synthetic cohorts and their clusterings apart from the real ones
+    work_dir: str = getcwd()
+    benchmark_dir: str = mkdtemp(prefix='benchmark-')
+
+    try:
+        chdir(benchmark_dir)
+        mkdir(DATA_DIR)
+
+        for scale in [] if do_imports_only else scales:
+            config: dict = {
+                'n_ptids': n_ptids * scale, 'n_feats': n_feats * scale, 'nominal_ratio': nominal_ratio,
+                'n_true_clusters': n_true_clusters, 'cluster_method': cluster_method, 'n_clusters': n_clusters,
+                'ranker': ranker, 'n_iterations': n_iterations
+            }
+            synthetic_data_handler(
+                cohort=BENCHMARK_COHORT, n_ptids=config['n_ptids'], n_feats=config['n_feats'],
+                nominal_ratio=nominal_ratio, n_true_clusters=n_true_clusters, informative_ratio=informative_ratio,
+                cluster_separation=cluster_separation, seed=seed
+            )
+
+            stage_times: dict = {}
+            normalize_data: DataFrame = get_normalize_data(
+                n_ptids=config['n_ptids'], n_feats=config['n_feats'], seed=seed
+            )
+
+            for _ in range(n_repeats):
+                for stage, stage_time in time_stages(
+                    cluster_method=cluster_method, n_clusters=n_clusters, n_iterations=n_iterations, ranker=ranker
+                ) + time_normalization(data=normalize_data):
+                    stage_times.setdefault(stage, []).append(stage_time)
+
+            results += get_results(stage_times=stage_times, config=config)
+    finally:
+        chdir(work_dir)
+        rmtree(benchmark_dir)
+
+    slowdowns: list = []
+
+    with open(results_path, 'a') as f:
+        for result in results:
+            result.update({'time': start_time, 'commit': commit, 'host': node()})
+            prev_result: dict = prev_results.get(get_config_key(result=result))
+            report_result(result=result, prev_result=prev_result)
+            f.write(dumps(result) + '\n')
+
+            if prev_result is not None:
+                slowdowns.append((result['stage'], result['median_seconds'] / prev_result['median_seconds']))
+
+    # Fail when a stage has become slower than allowed so the benchmark can guard against regressions
+    if max_slowdown is not None:
+        regressions: list = [
+            '{} ({:.2f}x)'.format(stage, slowdown) for stage, slowdown in slowdowns if slowdown > max_slowdown
+        ]
+
+        if len(regressions) > 0:
+            sys.exit('Slower than {}x the previous results: {}'.format(max_slowdown, ', '.join(regressions)))
+
+
+def get_results(stage_times: dict, config: dict) -> list:
+    """Gets the result of each stage from its times"""
+
+    return [
+        {'stage': stage, **config, 'median_seconds': float(median(times)), 'seconds': times}
+        for stage, times in stage_times.items()
+    ]
+
+
+def time_imports(n_repeats: int) -> dict:
+    """Times how long each module takes to import in a new interpreter, like when the pipeline runs a handler"""
+
+    stage_times: dict = {}
+
+    for module in IMPORT_MODULES:
+        for _ in range(n_repeats):
+            start_time: float = perf_counter()
+            run([sys.executable, '-c', 'import ' + module], check=True)
+            stage_times.setdefault('import ' + module, []).append(perf_counter() - start_time)
+
+    return stage_times
+
+
+def time_stages(cluster_method: str, n_clusters: int, n_iterations: int, ranker: str) -> list:
+    """Runs each handler once on the synthetic cohort and then the whole pipeline, timing each of them"""
+
+    stage_times: list = []
+
+    start_time: float = perf_counter()
+    combine_handler(cohort=BENCHMARK_COHORT, dataset=BENCHMARK_DATASET, mri_path=None, do_debug=False)
+    stage_times.append(('combine', perf_counter() - start_time))
+
+    data_dir: str = make_data_dirs(
+        cohort=BENCHMARK_COHORT, dataset=BENCHMARK_DATASET, cluster_method=cluster_method, n_clusters=n_clusters
+    )
+    iter_dir: str = join(data_dir, ITER_DIR + '0')
+
+    if isdir(iter_dir):
+        rmtree(iter_dir)
+
+    mkdir(iter_dir)
+    handler_args: dict = {
+        'cohort': BENCHMARK_COHORT, 'dataset': BENCHMARK_DATASET, 'cluster_method': cluster_method,
+        'n_clusters': n_clusters, 'iteration': 0, 'n_kept_feats': None
+    }
+
+    start_time: float = perf_counter()
+    _, clustering_score = cluster_handler(**handler_args)
+    stage_times.append(('cluster', perf_counter() - start_time))
+
+    start_time: float = perf_counter()
+    arff_handler(**handler_args, clustering_score=clustering_score)
+    stage_times.append(('arff', perf_counter() - start_time))
+
+    start_time: float = perf_counter()
+    feat_select_handler(**handler_args, ranker=ranker)
+    stage_times.append(('feat-select', perf_counter() - start_time))
+
+    # The pipeline starts over from the combined data set
+    start_time: float = perf_counter()
+    pipeline_handler(
+        cohort=BENCHMARK_COHORT, dataset=BENCHMARK_DATASET, cluster_method=cluster_method, n_clusters=n_clusters,
+        n_iterations=n_iterations, do_continue=False, do_in_process=True, ranker=ranker
+    )
+    stage_times.append(('pipeline', perf_counter() - start_time))
+
+    return stage_times
+
+
+def get_normalize_data(n_ptids: int, n_feats: int, seed: int) -> DataFrame:
+    """Makes a combined data set with constant and missing values to remove the constant columns of and normalize"""
+
+    rng = default_rng(seed)
+    data: ndarray = rng.normal(loc=5, scale=3, size=(n_ptids, n_feats))
+    data[rng.random(size=(n_ptids, n_feats)) < 0.05] = nan
+    data[:, 2::11] = 1
+    data[:, 3::13] = nan
+
+    return DataFrame(data, columns=['feat{}'.format(i) for i in range(n_feats)])
+
+
+def time_normalization(data: DataFrame) -> list:
+    """Times removing the constant columns and normalizing with the pandas path combine used and with its kernel"""
+
+    stage_times: list = []
+
+    pandas_data: DataFrame = data.copy()
+    start_time: float = perf_counter()
+    normalize(df=remove_cols_of_one_unique_val(data=pandas_data))
+    stage_times.append(('normalize-pandas', perf_counter() - start_time))
+
+    matrix: ndarray = data.to_numpy(dtype=float32)
+    start_time: float = perf_counter()
+    remove_constant_cols_and_normalize(matrix=matrix, cols=list(data.columns))
+    stage_times.append(('normalize-kernel', perf_counter() - start_time))
+
+    return stage_times
+
+
+def remove_cols_of_one_unique_val(data: DataFrame) -> DataFrame:
+    """Removes the columns that only have one unique value like combine did before the vectorized kernel"""
+
+    for col_name in list(data):
+        col: Series = data[col_name]
+
+        if len(col.unique()) == 1:
+            del data[col_name]
+
+    return data
+
+
+def normalize(df: DataFrame) -> DataFrame:
+    """Normalizes the data like combine did before the vectorized kernel"""
+
+    return (df - df.min(axis=0)) / (df.max(axis=0) - df.min(axis=0))
+
+
+def get_config_key(result: dict) -> tuple:
+    """Gets what identifies the benchmark a result is for"""
+
+    return tuple(result[field] for field in CONFIG_FIELDS)
+
+
+def load_prev_results(results_path: str) -> dict:
+    """Gets the latest earlier result of each benchmark"""
+
+    prev_results: dict = {}
+
+    if isfile(results_path):
+        with open(results_path) as f:
+            for line in f:
+                result: dict = loads(line)
+                prev_results[get_config_key(result=result)] = result
+    else:
+        makedirs(abspath(join(results_path, '..')), exist_ok=True)
+
+    return prev_results
+
+
+def report_result(result: dict, prev_result: dict):
+    """Prints the time of a benchmark next to its time in the latest earlier result"""
+
+    line: str = '{}: {:.3f}s'.format(result['stage'], result['median_seconds'])
+
+    if result['n_ptids'] is not None:
+        line: str = '{} with {} individuals and {} features: {:.3f}s'.format(
+            result['stage'], result['n_ptids'], result['n_feats'], result['median_seconds']
+        )
+
+    if prev_result is not None:
+        line += ' ({:.2f}x of {:.3f}s at {} on {})'.format(
+            result['median_seconds'] / prev_result['median_seconds'], prev_result['median_seconds'],
+            prev_result['commit'], prev_result['time']
+        )
+
+    print(line)
@@ -2,29 +2,70 @@
 
 from os.path import join
 from os import listdir, walk
+from re import fullmatch
+from pandas import DataFrame
 
-from handler.utils import DATA_DIR, CSV_EXTENSION
+from handler.catalog import record_clusterings, query_clusterings
+from handler.utils import DATA_DIR
 
+# The cohort, data set, clustering method, number of clusters, iteration, number of features and score of a clustering
+CLUSTERING_PATH_PATTERN: str = r'clean-data/([^/]+)/([^/]+)/([^/]+)/k=(\d+)/iter(\d+)/clustering-(\d+)-(-?[\d.]+)\.csv'
 
-def best_clustering_handler(cohort: str, dataset: str):
+
+def best_clustering_handler(
+    cohort: str, dataset: str, do_backfill: bool = False, top_n: int = None, cluster_method: str = None,
+    min_n_clusters: int = None, max_n_clusters: int = None, min_n_kept_feats: int = None,
+    max_n_kept_feats: int = None
+):
     """Main method of this module"""
 
-    cur_dir: str = join(DATA_DIR, cohort, dataset)
-    clustering_scores: dict = {}
-    get_clustering_scores(cur_dir=cur_dir, clustering_scores=clustering_scores)
-    max_score: float = max(clustering_scores.values())
+    if do_backfill:
+        backfill_catalog(cohort=cohort, dataset=dataset)
+
+    clusterings: DataFrame = query_clusterings(
+        cohort=cohort, dataset=dataset, cluster_method=cluster_method, min_n_clusters=min_n_clusters,
+        max_n_clusters=max_n_clusters, min_n_kept_feats=min_n_kept_feats, max_n_kept_feats=max_n_kept_feats,
+        top_n=top_n
+    )
+
+    if top_n is not None:
+        print(clusterings.to_string(index=False))
+        return
+
+    assert clusterings.shape[0] > 0, 'No clusterings are in the catalog; backfill it with --do-backfill'
+    max_score: float = clusterings.loc[0, 'score']
     print('BEST SCORE:', max_score)
     print('PATHS TO CLUSTERINGS WITH BEST SCORE:')
 
+    for path in clusterings.loc[clusterings['score'] == max_score, 'path']:
+        print(path)
+
+
+def backfill_catalog(cohort: str, dataset: str):
+    """Adds the clusterings saved before the catalog existed to the catalog, keeping the ones already in it"""
+
+    clustering_scores: dict = {}
+    get_clustering_scores(cur_dir=join(DATA_DIR, cohort, dataset), clustering_scores=clustering_scores)
+    clusterings: list = []
+
     for path, score in clustering_scores.items():
-        if score == max_score:
-            print(path)
+        match = fullmatch(CLUSTERING_PATH_PATTERN, path)
+        assert match is not None, path
+        path_cohort, path_dataset, cluster_method, n_clusters, iteration, n_kept_feats, _ = match.groups()
+
+        # The runtimes of these clusterings were not recorded
+        clusterings.append((
+            path_cohort, path_dataset, cluster_method, int(n_clusters), int(iteration), int(n_kept_feats), score,
+            None, path
+        ))
+
+    record_clusterings(clusterings=clusterings, do_replace=False)
+    print('Backfilled Clusterings:', len(clusterings))
 
 
 def get_clustering_scores(cur_dir: str, clustering_scores: dict):
     """Recursively creates a mapping from clustering CSV paths to clustering scores"""
 
-    clustering_part: str = 'clustering-'
     sub_dirs: list = sorted(next(walk(cur_dir))[1])
 
     if len(sub_dirs) > 0:
@@ -32,17 +73,11 @@ def get_clustering_scores(cur_dir: str, clustering_scores: dict):
             sub_dir: str = join(cur_dir, sub_dir)
             get_clustering_scores(cur_dir=sub_dir, clustering_scores=clustering_scores)
     else:
-        paths: list = listdir(cur_dir)
-        path = None
-        score = None
-
-        for path in paths:
-            if clustering_part in path:
-                path_parts: list = path.split('-')
-                score: str = path_parts[-1][:-len(CSV_EXTENSION)]
-                score: float = float(score)
-                break
+        for path in listdir(cur_dir):
+            path: str = join(cur_dir, path)
+            match = fullmatch(CLUSTERING_PATH_PATTERN, path)
 
-        assert path is not None and score is not None
-        path: str = join(cur_dir, path)
-        clustering_scores[path] = score
+            # An iteration which was interrupted before clustering has no clustering
+            if match is not None:
+                clustering_scores[path] = float(match.groups()[-1])
+                break
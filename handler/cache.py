@@ -0,0 +1,69 @@
+"""Caches matrices which are expensive to compute from a data set, keyed by the contents of the data set"""
+
+from hashlib import sha1
+from os import makedirs, replace, getpid
+from os.path import join, isfile
+from numpy import ndarray, ascontiguousarray, save, load
+from scipy.sparse import issparse, save_npz, load_npz
+
+from handler.utils import CACHE_DIR
+
+DENSE_EXTENSION: str = '.npy'
+SPARSE_EXTENSION: str = '.npz'
+FILE_HASH_CHUNK_SIZE: int = 1 << 24
+
+
+def get_cache_key(data: ndarray, **params) -> str:
+    """Hashes a data set together with the parameters of the computation that is cached"""
+
+    data: ndarray = ascontiguousarray(data)
+    hasher = sha1()
+    hasher.update(str((data.shape, data.dtype.str, sorted(params.items()))).encode())
+    hasher.update(data)
+
+    return hasher.hexdigest()
+
+
+def get_file_cache_key(paths: list) -> str:
+    """Hashes the contents of files, reading them a chunk at a time so a large data set is not loaded into memory"""
+
+    hasher = sha1()
+
+    for path in paths:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(FILE_HASH_CHUNK_SIZE), b''):
+                hasher.update(chunk)
+
+    return hasher.hexdigest()
+
+
+def load_cached(cache_name: str, key: str):
+    """Loads a cached dense or sparse matrix, returning None if it has not been cached"""
+
+    cache_path: str = join(CACHE_DIR, cache_name, key)
+
+    if isfile(cache_path + DENSE_EXTENSION):
+        return load(cache_path + DENSE_EXTENSION)
+    elif isfile(cache_path + SPARSE_EXTENSION):
+        return load_npz(cache_path + SPARSE_EXTENSION)
+
+    return None
+
+
+def save_cached(cache_name: str, key: str, matrix):
+    """Caches a dense or sparse matrix"""
+
+    cache_dir: str = join(CACHE_DIR, cache_name)
+    makedirs(cache_dir, exist_ok=True)
+    extension: str = SPARSE_EXTENSION if issparse(matrix) else DENSE_EXTENSION
+    cache_path: str = join(cache_dir, key + extension)
+
+    # Several pipeline jobs may cache the same matrix at once so write to a temporary file and move it into place
+    tmp_path: str = join(cache_dir, '{}.{}.tmp{}'.format(key, getpid(), extension))
+
+    if issparse(matrix):
+        save_npz(tmp_path, matrix)
+    else:
+        save(tmp_path, matrix)
+
+    replace(tmp_path, cache_path)
@@ -0,0 +1,73 @@
+"""Records the metadata of every clustering in an SQLite catalog so the clusterings can be queried without a walk"""
+
+from os import makedirs
+from os.path import dirname
+from contextlib import closing
+from sqlite3 import connect, Connection
+from pandas import DataFrame, read_sql_query
+
+from handler.utils import CATALOG_PATH
+
+# How long to wait for other pipelines which are writing to the catalog, in seconds
+CATALOG_TIMEOUT: float = 60.0
+
+CATALOG_COLS: list = [
+    'cohort', 'dataset', 'cluster_method', 'n_clusters', 'iteration', 'n_kept_feats', 'score', 'runtime', 'path'
+]
+
+
+def connect_catalog() -> Connection:
+    """Connects to the catalog, creating it if it does not exist"""
+
+    makedirs(dirname(CATALOG_PATH), exist_ok=True)
+    connection: Connection = connect(CATALOG_PATH, timeout=CATALOG_TIMEOUT)
+
+    # Re-running an iteration of a pipeline replaces the clustering it had before
+    connection.execute(
+        'CREATE TABLE IF NOT EXISTS clusterings (cohort TEXT, dataset TEXT, cluster_method TEXT, n_clusters INTEGER, '
+        'iteration INTEGER, n_kept_feats INTEGER, score REAL, runtime REAL, path TEXT, '
+        'PRIMARY KEY (cohort, dataset, cluster_method, n_clusters, iteration))'
+    )
+    connection.execute('CREATE INDEX IF NOT EXISTS clusterings_by_score ON clusterings (cohort, dataset, score)')
+
+    return connection
+
+
+def record_clusterings(clusterings: list, do_replace: bool = True):
+    """Adds rows of clustering metadata, in the order of the catalog columns, to the catalog"""
+
+    command: str = 'INSERT OR {} INTO clusterings ({}) VALUES ({})'.format(
+        'REPLACE' if do_replace else 'IGNORE', ', '.join(CATALOG_COLS), ', '.join('?' * len(CATALOG_COLS))
+    )
+
+    with closing(connect_catalog()) as connection, connection:
+        connection.executemany(command, clusterings)
+
+
+def query_clusterings(
+    cohort: str, dataset: str, cluster_method: str = None, min_n_clusters: int = None, max_n_clusters: int = None,
+    min_n_kept_feats: int = None, max_n_kept_feats: int = None, top_n: int = None
+) -> DataFrame:
+    """Gets the clusterings of a cohort and data set which match the filters, best first"""
+
+    conditions: list = ['cohort = ?', 'dataset = ?']
+    params: list = [cohort, dataset]
+
+    for condition, param in (
+        ('cluster_method = ?', cluster_method), ('n_clusters >= ?', min_n_clusters),
+        ('n_clusters <= ?', max_n_clusters), ('n_kept_feats >= ?', min_n_kept_feats),
+        ('n_kept_feats <= ?', max_n_kept_feats)
+    ):
+        if param is not None:
+            conditions.append(condition)
+            params.append(param)
+
+    query: str = 'SELECT {} FROM clusterings WHERE {} '.format(', '.join(CATALOG_COLS), ' AND '.join(conditions))
+    query += 'ORDER BY score DESC, cluster_method, n_clusters, iteration'
+
+    if top_n is not None:
+        query += ' LIMIT ?'
+        params.append(top_n)
+
+    with closing(connect_catalog()) as connection:
+        return read_sql_query(query, connection, params=params)
@@ -1,32 +1,279 @@
 """Runs a clustering algorithm on a data set and labels the data"""
 
-from pandas import DataFrame, concat, Series, get_dummies
-from sklearn.cluster import SpectralClustering
-from sklearn.metrics import silhouette_score
-from numpy import ndarray
+from os.path import splitext
+from os import remove
+from glob import glob
+from time import perf_counter
+from pandas import DataFrame, concat
+from sklearn.cluster import SpectralClustering, MiniBatchKMeans, k_means
+from sklearn.kernel_approximation import Nystroem
+from sklearn.random_projection import SparseRandomProjection
+from sklearn.decomposition import PCA
+from sklearn.manifold import spectral_embedding
+from sklearn.metrics.pairwise import pairwise_kernels
+from sklearn.neighbors import kneighbors_graph
+from numpy import ndarray, zeros, empty, arange, argmax, sign, fill_diagonal, bincount, sqrt, maximum, finfo, float64
+from numpy.linalg import eigh
+from numpy.random import RandomState
+from scipy.sparse import issparse, csr_matrix
+from scipy.sparse.csgraph import laplacian as csgraph_laplacian
+from scipy.sparse.linalg import lobpcg
 
+from handler.encode import encode_data, get_vocab
+from handler.catalog import record_clusterings
+from handler.profiling import profile_stage
+from handler.cache import get_cache_key, load_cached, save_cached
+from handler.scoring import score_clustering
 from handler.utils import (
-    get_del_ptid_col, CLUSTERING_PATH, CLUSTER_ID_COL, get_data, NOMINAL_COL_TYPE, NUMERIC_COL_TYPE
+    get_del_ptid_col, CLUSTERING_PATH, SCORE_PATH, CLUSTER_ID_COL, EXACT_SCORE_MODE, SUBSAMPLE_SCORE_MODE,
+    NYSTROM_CLUSTER_METHOD, SCALABLE_CLUSTER_METHODS, NO_REDUCTION, PCA_REDUCTION, PTID_COL, NOMINAL_COL_TYPE,
+    STORAGE_EXTENSIONS, MATRIX_STORAGE_FORMAT, MATRIX_COL_BLOCK_SIZE, get_data, get_n_kept_feats, get_data_path,
+    get_col_types_path, get_stored_path, read_data, write_csv
 )
 
+AFFINITY_CACHE_NAME: str = 'affinity'
+REDUCTION_CACHE_NAME: str = 'reduction'
+
+# The same limit on the eigensolver iterations that spectral clustering uses
+MAX_SOLVER_ITERS: int = 2000
+
+# The largest residual of an eigenvector for which the eigensolver of the warm starts has converged
+SOLVER_TOL: float = 1e-5
+
+# The scalable clustering methods cluster the features randomly projected down to this many dimensions
+N_PROJECTED_FEATS: int = 256
+
+# The number of individuals that the scalable clustering methods handle in memory at a time
+ROW_BLOCK_SIZE: int = 10000
+
+# The number of individuals whose kernel values approximate the affinity matrix of the Nystrom method
+N_LANDMARKS: int = 500
+
+MINI_BATCH_SIZE: int = 1024
+
 
 def cluster_handler(
-    cohort: str, dataset: str, cluster_method: str, n_clusters: int, iteration: int, n_kept_feats: int
-):
+    cohort: str, dataset: str, cluster_method: str, n_clusters: int, iteration: int, n_kept_feats: int,
+    data: DataFrame = None, col_types: DataFrame = None, do_cache_affinity: bool = False,
+    score_mode: str = EXACT_SCORE_MODE, score_sample_size: int = None, score_working_memory: int = None,
+    warm_start: dict = None, reduction: str = NO_REDUCTION, n_components: int = None
+) -> tuple:
     """Main function of this module"""
 
-    data, ptid_col, n_kept_feats = get_data_set(
-        cohort=cohort, dataset=dataset, cluster_method=cluster_method, n_clusters=n_clusters, iteration=iteration,
-        n_kept_feats=n_kept_feats
+    start_time: float = perf_counter()
+
+    if cluster_method in SCALABLE_CLUSTER_METHODS:
+        # The scalable clustering methods do not have an affinity matrix or eigenvectors to carry between iterations
+        assert warm_start is None
+
+        with profile_stage(stage='cluster.load'):
+            data, ptid_col, n_kept_feats = get_projected_data_set(
+                cohort=cohort, dataset=dataset, cluster_method=cluster_method, n_clusters=n_clusters,
+                iteration=iteration, n_kept_feats=n_kept_feats, data=data, col_types=col_types
+            )
+
+        with profile_stage(stage='cluster.' + cluster_method):
+            if cluster_method == NYSTROM_CLUSTER_METHOD:
+                labels: ndarray = get_nystrom_labels(data=data, n_clusters=n_clusters)
+            else:
+                model = MiniBatchKMeans(n_clusters=n_clusters, batch_size=MINI_BATCH_SIZE, random_state=0, n_init=3)
+                labels: ndarray = model.fit_predict(data)
+
+        # The clustering is scored on the projected features, whose distances approximate those of the data set
+        return save_clustering(
+            data=data, labels=labels, ptid_col=ptid_col, cohort=cohort, dataset=dataset,
+            cluster_method=cluster_method, n_clusters=n_clusters, iteration=iteration, n_kept_feats=n_kept_feats,
+            score_mode=score_mode, score_sample_size=score_sample_size, score_working_memory=score_working_memory,
+            start_time=start_time
+        )
+
+    with profile_stage(stage='cluster.load'):
+        data, ptid_col, n_kept_feats = get_data_set(
+            cohort=cohort, dataset=dataset, cluster_method=cluster_method, n_clusters=n_clusters,
+            iteration=iteration, n_kept_feats=n_kept_feats, data=data, col_types=col_types, reduction=reduction,
+            n_components=n_components
+        )
+
+    with profile_stage(stage='cluster.affinity'):
+        affinity = get_affinity(data=data, cluster_method=cluster_method, do_cache_affinity=do_cache_affinity)
+
+    with profile_stage(stage='cluster.spectral'):
+        if warm_start is None:
+            model = SpectralClustering(
+                n_clusters=n_clusters, affinity='precomputed', assign_labels='kmeans', random_state=0
+            )
+            labels: ndarray = model.fit_predict(affinity)
+        else:
+            labels: ndarray = get_warm_started_labels(
+                affinity=affinity, n_clusters=n_clusters, warm_start=warm_start
+            )
+
+    return save_clustering(
+        data=data, labels=labels, ptid_col=ptid_col, cohort=cohort, dataset=dataset, cluster_method=cluster_method,
+        n_clusters=n_clusters, iteration=iteration, n_kept_feats=n_kept_feats, score_mode=score_mode,
+        score_sample_size=score_sample_size, score_working_memory=score_working_memory, start_time=start_time
     )
 
-    model = SpectralClustering(
-        n_clusters=n_clusters, affinity=cluster_method, assign_labels='kmeans', random_state=0
+
+def get_warm_started_labels(affinity, n_clusters: int, warm_start: dict) -> ndarray:
+    """Clusters spectrally starting from the eigenvectors and clustering of the previous iteration in the state"""
+
+    # Like spectral clustering, find the smallest eigenvectors of the normalized Laplacian with its diagonal set to 1
+    # in double precision, which spectral clustering converts the affinity matrix to
+    affinity = affinity.astype(float64, copy=False)
+    laplacian, diag = csgraph_laplacian(affinity, normed=True, return_diag=True)
+
+    if issparse(laplacian):
+        laplacian = laplacian.tocsr()
+        laplacian.setdiag(1)
+    else:
+        fill_diagonal(laplacian, 1)
+
+    n_samples: int = laplacian.shape[0]
+    prev_eigenvectors: ndarray = warm_start.get('eigenvectors')
+    prev_labels: ndarray = warm_start.get('labels')
+    eigenvectors: ndarray = None
+
+    if prev_eigenvectors is not None and prev_eigenvectors.shape == (n_samples, n_clusters):
+        # A warm start which does not converge falls back to a cold start
+        eigenvectors, n_solver_iters = solve_eigenvectors(laplacian=laplacian, init_eigenvectors=prev_eigenvectors)
+
+    if eigenvectors is not None:
+        # Recover the embedding from the eigenvectors and flip their signs deterministically like spectral embedding
+        embedding: ndarray = eigenvectors / diag[:, None]
+        max_abs_rows: ndarray = argmax(abs(embedding), axis=0)
+        embedding: ndarray = embedding * sign(embedding[max_abs_rows, arange(n_clusters)])
+
+        # The previous clusters, located in the new embedding, are the initial centroids
+        centroids: ndarray = zeros((n_clusters, n_clusters))
+
+        for cluster_id in range(n_clusters):
+            centroids[cluster_id] = embedding[prev_labels == cluster_id].mean(axis=0)
+
+        _, labels, _ = k_means(embedding, n_clusters, init=centroids, n_init=1)
+
+        # The iterations saved are estimated from a cold start of the eigensolver on the first iteration
+        if warm_start['n_cold_solver_iters'] is not None:
+            warm_start['n_saved_solver_iters'] += max(warm_start['n_cold_solver_iters'] - n_solver_iters, 0)
+    else:
+        # A cold start clusters the same way as spectral clustering so the labels do not depend on warm starting
+        random_state: RandomState = RandomState(0)
+        embedding: ndarray = spectral_embedding(
+            affinity, n_components=n_clusters, random_state=random_state, eigen_tol='auto', drop_first=False
+        )
+        _, labels, _ = k_means(embedding, n_clusters, random_state=random_state, n_init=10)
+        eigenvectors: ndarray = embedding * diag[:, None]
+
+        # The cold start to compare to runs the eigensolver of the warm starts from random eigenvectors
+        # A cold restart after an empty cluster keeps the iterations saved so far and the first cold start
+        if 'n_cold_solver_iters' not in warm_start:
+            init_eigenvectors: ndarray = RandomState(0).standard_normal(size=(n_samples, n_clusters))
+            init_eigenvectors[:, 0] = diag
+            cold_eigenvectors, n_cold_solver_iters = solve_eigenvectors(
+                laplacian=laplacian, init_eigenvectors=init_eigenvectors
+            )
+
+            # There are no iterations saved to estimate when the cold start does not converge
+            warm_start['n_cold_solver_iters'] = None if cold_eigenvectors is None else n_cold_solver_iters
+            warm_start['n_saved_solver_iters'] = 0
+
+    # A cluster which is empty cannot be located in the next embedding
+    if bincount(labels, minlength=n_clusters).min() == 0:
+        warm_start['eigenvectors'] = None
+    else:
+        warm_start['eigenvectors'] = eigenvectors
+
+    warm_start['labels'] = labels
+
+    return labels
+
+
+def solve_eigenvectors(laplacian, init_eigenvectors: ndarray) -> tuple:
+    """Finds the smallest eigenvectors of the Laplacian from initial ones unless the eigensolver does not converge"""
+
+    _, eigenvectors, residual_norms = lobpcg(
+        laplacian, init_eigenvectors, tol=SOLVER_TOL, largest=False, maxiter=MAX_SOLVER_ITERS,
+        retResidualNormsHistory=True
     )
-    labels: ndarray = model.fit_predict(data)
-    clustering_score: float = silhouette_score(data, labels)
-    clustering_score: float = round(clustering_score, 2)
-    print(clustering_score)
+    n_solver_iters: int = len(residual_norms)
+
+    if max(residual_norms[-1]) > SOLVER_TOL:
+        return None, n_solver_iters
+
+    return eigenvectors, n_solver_iters
+
+
+def get_nystrom_labels(data: ndarray, n_clusters: int) -> ndarray:
+    """Clusters spectrally using an RBF affinity approximated from its values between every individual and landmarks"""
+
+    # The affinity matrix is approximated by the inner products of the features that the landmarks map to
+    # The kernel is scaled to the spread of the data since the kernel values of a fixed scale vanish in high dimensions
+    n_samples: int = data.shape[0]
+    n_landmarks: int = min(N_LANDMARKS, n_samples)
+    gamma: float = 1.0 / max(data.shape[-1] * data.var(), finfo(float).tiny)
+    feature_map: Nystroem = Nystroem(gamma=gamma, n_components=n_landmarks, random_state=0)
+    feature_map.fit(data)
+    row_blocks: list = [slice(start, start + ROW_BLOCK_SIZE) for start in range(0, n_samples, ROW_BLOCK_SIZE)]
+
+    # The degree of each individual is its approximate affinity to every individual
+    feat_sums: ndarray = sum(feature_map.transform(data[rows]).sum(axis=0) for rows in row_blocks)
+    degrees: ndarray = empty(n_samples)
+    gram: ndarray = zeros((n_landmarks, n_landmarks))
+
+    for rows in row_blocks:
+        feats: ndarray = feature_map.transform(data[rows])
+        degrees[rows] = maximum(feats @ feat_sums, finfo(float).tiny)
+        feats: ndarray = feats / sqrt(degrees[rows])[:, None]
+        gram += feats.T @ feats
+
+    # The largest eigenvectors of the normalized affinity are the largest left singular vectors of the normalized
+    # features, found from the small matrix of their inner products
+    eigenvalues, eigenvectors = eigh(gram)
+    eigenvalues: ndarray = sqrt(maximum(eigenvalues[::-1][:n_clusters], finfo(float).tiny))
+    eigenvectors: ndarray = eigenvectors[:, ::-1][:, :n_clusters]
+    embedding: ndarray = empty((n_samples, n_clusters))
+
+    for rows in row_blocks:
+        feats: ndarray = feature_map.transform(data[rows]) / sqrt(degrees[rows])[:, None]
+
+        # Recover the embedding from the eigenvectors like spectral embedding
+        embedding[rows] = feats @ eigenvectors / eigenvalues / sqrt(degrees[rows])[:, None]
+
+    max_abs_rows: ndarray = argmax(abs(embedding), axis=0)
+    embedding: ndarray = embedding * sign(embedding[max_abs_rows, arange(n_clusters)])
+    _, labels, _ = k_means(embedding, n_clusters, random_state=RandomState(0), n_init=10)
+
+    return labels
+
+
+def save_clustering(
+    data: ndarray, labels: ndarray, ptid_col: DataFrame, cohort: str, dataset: str, cluster_method: str,
+    n_clusters: int, iteration: int, n_kept_feats: int, score_mode: str, score_sample_size: int,
+    score_working_memory: int, start_time: float
+) -> tuple:
+    """Scores the cluster labels of the data set and saves them as the clustering of an iteration"""
+
+    with profile_stage(stage='cluster.score'):
+        clustering_score, score_lower_bound, score_upper_bound = score_clustering(
+            data=data, labels=labels, score_mode=score_mode, score_sample_size=score_sample_size,
+            score_working_memory=score_working_memory
+        )
+
+    # Record how the clustering was scored so scores from different runs can be compared
+    if score_mode == SUBSAMPLE_SCORE_MODE:
+        score_sample_size: int = min(score_sample_size, data.shape[0])
+    else:
+        score_sample_size: int = data.shape[0]
+
+    score: DataFrame = DataFrame({
+        'score': [clustering_score], 'score_mode': [score_mode], 'lower_bound': [score_lower_bound],
+        'upper_bound': [score_upper_bound], 'sample_size': [score_sample_size]
+    })
+    score_path: str = SCORE_PATH.format(cohort, dataset, cluster_method, n_clusters, iteration, n_kept_feats)
+    write_csv(data=score, csv_path=score_path)
+
+    # A negative score which rounds to zero is saved as zero rather than as negative zero
+    clustering_score: float = round(clustering_score, 2) + 0.0
 
     labels: DataFrame = DataFrame(labels, columns=[CLUSTER_ID_COL])
     clustering: DataFrame = concat([ptid_col, labels], axis=1)
@@ -35,42 +282,203 @@ def cluster_handler(
     clustering_path: str = CLUSTERING_PATH.format(
         cohort, dataset, cluster_method, n_clusters, iteration, n_kept_feats, clustering_score
     )
-    clustering.to_csv(clustering_path, index=False)
+    write_csv(data=clustering, csv_path=clustering_path)
+
+    # A clustering saved for the iteration before, by an earlier run, has the earlier score in its path
+    # Only one clustering of an iteration may exist since the later stages find it without knowing its score
+    for stale_path in glob(CLUSTERING_PATH.format(
+        cohort, dataset, cluster_method, n_clusters, iteration, n_kept_feats, '*'
+    )):
+        if stale_path != clustering_path:
+            remove(stale_path)
+
+    # Record the clustering in the catalog so the best clusterings can be found without walking the directories
+    runtime: float = perf_counter() - start_time
+    record_clusterings(clusterings=[(
+        cohort, dataset, cluster_method, n_clusters, iteration, n_kept_feats, clustering_score, runtime,
+        clustering_path
+    )])
+
+    return clustering, clustering_score
 
 
 def get_data_set(
-    cohort: str, dataset: str, cluster_method: str, n_clusters: int, iteration: int, n_kept_feats: int
+    cohort: str, dataset: str, cluster_method: str, n_clusters: int, iteration: int, n_kept_feats: int,
+    data: DataFrame = None, col_types: DataFrame = None, reduction: str = NO_REDUCTION, n_components: int = None
 ) -> tuple:
     """Creates the final data set from the selected features and one-hot encoded nominal columns"""
 
-    data, col_types, n_kept_feats = get_data(
-        cohort=cohort, dataset=dataset, cluster_method=cluster_method, n_clusters=n_clusters, iteration=iteration,
-        n_kept_feats=n_kept_feats
-    )
+    if data is None:
+        data, col_types, n_kept_feats = get_data(
+            cohort=cohort, dataset=dataset, cluster_method=cluster_method, n_clusters=n_clusters,
+            iteration=iteration, n_kept_feats=n_kept_feats
+        )
+    else:
+        # Avoid deleting the patient id column from the caller's in-memory data set
+        data: DataFrame = data.copy(deep=False)
+        n_kept_feats: int = get_n_kept_feats(col_types=col_types, n_kept_feats=n_kept_feats)
 
     # Temporarily take out the patient id column
     ptid_col: DataFrame = get_del_ptid_col(data_set=data)
 
-    # Get the nominal data and one hot encode it
-    nominal_data, nominal_cols = get_cols_by_type(data_set=data, data_types=col_types, col_type=NOMINAL_COL_TYPE)
+    # One hot encode the nominal columns after the numeric columns, using the categories found for the data set
+    data: ndarray = encode_data(data=data, col_types=col_types, cohort=cohort, dataset=dataset)
+
+    # The data set is clustered and scored in fewer dimensions, while the features are still ranked in full
+    if reduction != NO_REDUCTION:
+        data: ndarray = get_reduced_data(data=data, reduction=reduction, n_components=n_components)
+
+    return data, ptid_col, n_kept_feats
+
+
+def get_reduced_data(data: ndarray, reduction: str, n_components: int) -> ndarray:
+    """Reduces the dimensions of the data set with PCA or a random projection, from the cache if it was done before"""
+
+    # A reduction to at least as many dimensions as the data set has would not make the clustering any cheaper
+    if n_components >= min(data.shape):
+        return data
+
+    # Each feature set is only reduced once, however many pipelines and numbers of clusters it is clustered for
+    key: str = get_cache_key(data=data, reduction=reduction, n_components=n_components)
+    reduced_data: ndarray = load_cached(cache_name=REDUCTION_CACHE_NAME, key=key)
+
+    if reduced_data is not None:
+        return reduced_data
+
+    if reduction == PCA_REDUCTION:
+        model = PCA(n_components=n_components, svd_solver='randomized', random_state=0)
+    else:
+        model = SparseRandomProjection(n_components=n_components, random_state=0, dense_output=True)
+
+    reduced_data: ndarray = model.fit_transform(data)
+    save_cached(cache_name=REDUCTION_CACHE_NAME, key=key, matrix=reduced_data)
+
+    return reduced_data
+
+
+def get_projected_data_set(
+    cohort: str, dataset: str, cluster_method: str, n_clusters: int, iteration: int, n_kept_feats: int,
+    data: DataFrame = None, col_types: DataFrame = None
+) -> tuple:
+    """Encodes the data set and randomly projects it a block of features at a time to save memory"""
+
+    # A data set in memory is not read from disk, and its number of kept features is not that of a path on disk
+    data_path = None
+
+    if data is None:
+        data_path: str = get_data_path(
+            cohort=cohort, dataset=dataset, cluster_method=cluster_method, n_clusters=n_clusters, iteration=iteration,
+            n_kept_feats=n_kept_feats
+        )
+        col_types_path: str = get_col_types_path(
+            cohort=cohort, dataset=dataset, cluster_method=cluster_method, n_clusters=n_clusters, iteration=iteration,
+            n_kept_feats=n_kept_feats
+        )
+        col_types: DataFrame = read_data(data_path=col_types_path)
+        _, extension = splitext(get_stored_path(data_path=data_path))
+
+        # Data sets stored as a matrix are memory mapped so only a block of features is read from disk at a time
+        # whereas the other storage formats are parsed in full, once
+        if extension != STORAGE_EXTENSIONS[MATRIX_STORAGE_FORMAT]:
+            data: DataFrame = read_data(data_path=data_path)
+
+    n_kept_feats: int = get_n_kept_feats(col_types=col_types, n_kept_feats=n_kept_feats)
+
+    if data is None:
+        ptid_col: DataFrame = read_data(data_path=data_path, cols=[PTID_COL])
+    else:
+        ptid_col: DataFrame = data[[PTID_COL]].copy()
+
+    # The nominal features are encoded after the numeric features so a block of either is a contiguous block of the
+    # encoded columns, in the same order as if the whole data set were encoded at once
+    is_nominal: ndarray = (col_types.loc[0] == NOMINAL_COL_TYPE).to_numpy()
+    numeric_feats: list = [feat for feat, feat_is_nominal in zip(col_types, is_nominal) if not feat_is_nominal]
+    nominal_feats: list = [feat for feat, feat_is_nominal in zip(col_types, is_nominal) if feat_is_nominal]
+    nominal_blocks: list = [
+        nominal_feats[start:start + MATRIX_COL_BLOCK_SIZE]
+        for start in range(0, len(nominal_feats), MATRIX_COL_BLOCK_SIZE)
+    ]
+    feat_blocks: list = [
+        numeric_feats[start:start + MATRIX_COL_BLOCK_SIZE]
+        for start in range(0, len(numeric_feats), MATRIX_COL_BLOCK_SIZE)
+    ] + nominal_blocks
+
+    # The number of encoded columns depends on the categories of every nominal feature, which are usually cached so
+    # only the nominal features without cached categories are read before the projection
+    vocab: dict = get_vocab(data=data, nominal_cols=[], cohort=cohort, dataset=dataset)
+
+    for block_feats in nominal_blocks:
+        uncached_feats: list = [feat for feat in block_feats if feat not in vocab]
+
+        if len(uncached_feats) > 0:
+            vocab.update(get_vocab(
+                data=get_feat_block(data=data, data_path=data_path, feats=uncached_feats), nominal_cols=uncached_feats,
+                cohort=cohort, dataset=dataset
+            ))
+
+    n_encoded_feats: int = len(numeric_feats) + sum(len(vocab[feat]) for feat in nominal_feats)
+    projected_data: ndarray = zeros((ptid_col.shape[0], min(n_encoded_feats, N_PROJECTED_FEATS)))
+    components = None
+
+    # The projection preserves the distances between individuals approximately, so it is only needed when there are
+    # more encoded features than projected features
+    if n_encoded_feats > N_PROJECTED_FEATS:
+        # The random components only depend on the number of features, so the projection is fit without any data
+        projection = SparseRandomProjection(n_components=N_PROJECTED_FEATS, random_state=0, dense_output=True)
+        projection.fit(csr_matrix((1, n_encoded_feats)))
+        components = projection.components_.tocsc()
+
+    start: int = 0
+
+    # The projection of the whole encoded data set is the sum of the projections of its blocks of encoded columns
+    for block_feats in feat_blocks:
+        block: ndarray = encode_data(
+            data=get_feat_block(data=data, data_path=data_path, feats=block_feats), col_types=col_types[block_feats],
+            cohort=cohort, dataset=dataset, vocab=vocab
+        )
+        end: int = start + block.shape[-1]
+
+        if components is None:
+            projected_data[:, start:end] = block
+        else:
+            projected_data += block @ components[:, start:end].T
+
+        start: int = end
+
+    return projected_data, ptid_col, n_kept_feats
+
+
+def get_feat_block(data: DataFrame, data_path: str, feats: list) -> DataFrame:
+    """Gets a block of features from the data set in memory or otherwise from its memory mapped matrix"""
+
+    if data is None:
+        return read_data(data_path=data_path, cols=feats)
+
+    return data[feats]
+
 
-    if nominal_data.shape[-1] > 0:
-        nominal_data: DataFrame = get_dummies(nominal_data, columns=nominal_cols, dummy_na=False)
+def get_affinity(data: ndarray, cluster_method: str, do_cache_affinity: bool):
+    """Gets the affinity matrix that spectral clustering would compute, from the cache if it was computed before"""
 
-    # Get the numeric data
-    numeric_data, _ = get_cols_by_type(data_set=data, data_types=col_types, col_type=NUMERIC_COL_TYPE)
+    # These are the default affinity parameters of SpectralClustering
+    n_neighbors: int = 10
+    gamma: float = 1.0
 
-    # Combine the numeric and nominal columns into one complete data set
-    data: DataFrame = concat([numeric_data, nominal_data], axis=1)
+    if do_cache_affinity:
+        key: str = get_cache_key(data=data, affinity=cluster_method, n_neighbors=n_neighbors, gamma=gamma)
+        affinity = load_cached(cache_name=AFFINITY_CACHE_NAME, key=key)
 
-    return data.to_numpy(), ptid_col, n_kept_feats
+        if affinity is not None:
+            return affinity
 
+    if cluster_method == 'nearest_neighbors':
+        # The nearest neighbors graph is sparse and is kept sparse in the cache
+        connectivity = kneighbors_graph(data, n_neighbors=n_neighbors, include_self=True)
+        affinity = 0.5 * (connectivity + connectivity.T)
+    else:
+        affinity: ndarray = pairwise_kernels(data, metric=cluster_method, filter_params=True, gamma=gamma)
 
-def get_cols_by_type(data_set: DataFrame, data_types: DataFrame, col_type: str) -> tuple:
-    """Gets the columns and column names of a given type"""
+    if do_cache_affinity:
+        save_cached(cache_name=AFFINITY_CACHE_NAME, key=key, matrix=affinity)
 
-    col_bools: Series = data_types.loc[0] == col_type
-    cols: Series = data_types[col_bools.index[col_bools]]
-    cols: list = list(cols)
-    data: DataFrame = data_set[cols]
-    return data, cols
+    return affinity
@@ -0,0 +1,86 @@
+"""Clusters a data set for a range of numbers of clusters using a single spectral embedding"""
+
+from os.path import join, isdir
+from os import mkdir
+from time import perf_counter
+from numpy import ndarray
+from numpy.random import RandomState
+from sklearn.cluster import k_means
+from sklearn.manifold import spectral_embedding
+
+from handler.cluster import get_data_set, get_affinity, save_clustering
+from handler.pipeline import make_data_dirs, ITER_DIR
+from handler.profiling import profile_stage, set_profile_path
+from handler.manifest import CLUSTER_STAGE, record_stage
+from handler.utils import PROFILE_PATH, MANIFEST_PATH, SCALABLE_CLUSTER_METHODS, NO_REDUCTION
+
+
+def cluster_sweep_handler(
+    cohort: str, dataset: str, cluster_method: str, min_n_clusters: int, max_n_clusters: int,
+    do_cache_affinity: bool, score_mode: str, score_sample_size: int, score_working_memory: int,
+    reduction: str = NO_REDUCTION, n_components: int = None
+):
+    """Main function of this module"""
+
+    assert 2 <= min_n_clusters <= max_n_clusters
+
+    # The sweep shares the spectral embedding of an affinity matrix, which the scalable clustering methods do not have
+    assert cluster_method not in SCALABLE_CLUSTER_METHODS
+
+    # The sweep clusters the full data set, which is the same for every number of clusters
+    iteration: int = 0
+    data, ptid_col, n_kept_feats = get_data_set(
+        cohort=cohort, dataset=dataset, cluster_method=cluster_method, n_clusters=None, iteration=iteration,
+        n_kept_feats=None, reduction=reduction, n_components=n_components
+    )
+    affinity = get_affinity(data=data, cluster_method=cluster_method, do_cache_affinity=do_cache_affinity)
+
+    # Compute enough eigenvectors for the largest number of clusters the same way spectral clustering would
+    embedding_start_time: float = perf_counter()
+    random_state: RandomState = RandomState(0)
+    embedding: ndarray = spectral_embedding(
+        affinity, n_components=max_n_clusters, random_state=random_state, eigen_tol='auto', drop_first=False
+    )
+
+    # Spectral clustering continues with the random state left by the eigensolver when assigning the labels
+    post_embedding_state: tuple = random_state.get_state()
+    embedding_runtime: float = perf_counter() - embedding_start_time
+
+    for n_clusters in range(min_n_clusters, max_n_clusters + 1):
+        iter_dir: str = join(
+            make_data_dirs(cohort=cohort, dataset=dataset, cluster_method=cluster_method, n_clusters=n_clusters),
+            ITER_DIR + str(iteration)
+        )
+
+        if not isdir(iter_dir):
+            mkdir(iter_dir)
+
+        set_profile_path(profile_path=PROFILE_PATH.format(cohort, dataset, cluster_method, n_clusters, iteration))
+
+        # The runtime of each clustering includes the shared embedding
+        start_time: float = perf_counter() - embedding_runtime
+
+        # The embedding for a number of clusters is made up of the leading eigenvectors of the largest embedding
+        k_means_random_state: RandomState = RandomState()
+        k_means_random_state.set_state(post_embedding_state)
+
+        with profile_stage(stage='cluster_sweep.k_means'):
+            _, labels, _ = k_means(
+                embedding[:, :n_clusters], n_clusters, random_state=k_means_random_state, n_init=10
+            )
+
+        _, clustering_score = save_clustering(
+            data=data, labels=labels, ptid_col=ptid_col, cohort=cohort, dataset=dataset,
+            cluster_method=cluster_method, n_clusters=n_clusters, iteration=iteration, n_kept_feats=n_kept_feats,
+            score_mode=score_mode, score_sample_size=score_sample_size, score_working_memory=score_working_memory,
+            start_time=start_time
+        )
+
+        # A pipeline continued from the sweep starts after its clustering, and any later iterations of a pipeline
+        # run before are dropped from the manifest since they were selected from the clustering that was replaced
+        record_stage(
+            manifest={}, manifest_path=MANIFEST_PATH.format(cohort, dataset, cluster_method, n_clusters),
+            iteration=iteration, stage=CLUSTER_STAGE, clustering_score=clustering_score
+        )
+        print('Number Of Clusters:', n_clusters)
+        print('Clustering Score:', clustering_score)
@@ -1,14 +1,29 @@
 """Combines the data sets into one"""
 
-from os.path import join
+from os.path import join, splitext, isfile
+from os import remove, replace, makedirs
+from glob import glob
 
-from pandas import DataFrame, merge, concat, read_csv, Series
-from handler.utils import PTID_COL, BASE_DATA_PATH, BASE_COL_TYPES_PATH, DEBUG_IDENTIFIER, get_del_ptid_col
+from pandas import DataFrame, merge, concat, Index
+from numpy import ndarray, float32, empty, fmin, fmax, isnan, subtract, divide, hstack
+from handler.cache import get_cache_key, get_file_cache_key
+from handler.utils import (
+    PTID_COL, BASE_DATA_PATH, BASE_COL_TYPES_PATH, DEBUG_IDENTIFIER, MATRIX_STORAGE_FORMAT, STORAGE_EXTENSIONS,
+    MATRIX_COL_BLOCK_SIZE, MATRIX_INDEX_EXTENSION, CACHE_DIR, get_del_ptid_col, get_stored_path, read_data,
+    read_matrix, write_data, open_matrix, write_matrix_index
+)
 
+COMBINE_CACHE_NAME: str = 'combine'
 
-def combine_handler(cohort: str, dataset: str, mri_path: str, do_debug: bool):
+
+def combine_handler(
+    cohort: str, dataset: str, mri_path: str, do_debug: bool, do_stream: bool = False,
+    block_size: int = MATRIX_COL_BLOCK_SIZE, do_incremental: bool = False
+):
     """Main method of this module"""
 
+    assert not (do_stream and do_incremental)
+
     phenotypes_data_name: str = 'phenotypes'
     expression_data_name: str = 'expression'
     mri_data_name: str = 'mri'
@@ -17,69 +32,253 @@ def combine_handler(cohort: str, dataset: str, mri_path: str, do_debug: bool):
         expression_data_name: str = DEBUG_IDENTIFIER + expression_data_name
         mri_data_name: str = DEBUG_IDENTIFIER + mri_data_name
 
-    # Load the data
-    phenotypes_data, phenotypes_col_types = load_data(data_name=phenotypes_data_name, cohort=cohort)
-    expression_data, expression_col_types = load_data(data_name=expression_data_name, cohort=cohort)
+    data_paths: list = [
+        BASE_DATA_PATH.format(cohort, phenotypes_data_name), BASE_DATA_PATH.format(cohort, expression_data_name)
+    ]
+    col_types_paths: list = [
+        BASE_COL_TYPES_PATH.format(cohort, phenotypes_data_name),
+        BASE_COL_TYPES_PATH.format(cohort, expression_data_name)
+    ]
 
     if mri_path is not None:
-        mri_data: DataFrame = read_csv(mri_path)
         mri_col_types_path: list = mri_path.split('/')
         mri_col_types_path[-1] = mri_col_types_path[-1].replace('data', 'col-types')
         mri_col_types_path: str = join(*mri_col_types_path)
-        mri_col_types: DataFrame = read_csv(mri_col_types_path)
+        data_paths.append(mri_path)
+        col_types_paths.append(mri_col_types_path)
     else:
-        mri_data, mri_col_types = load_data(data_name=mri_data_name, cohort=cohort)
+        data_paths.append(BASE_DATA_PATH.format(cohort, mri_data_name))
+        col_types_paths.append(BASE_COL_TYPES_PATH.format(cohort, mri_data_name))
+
+    if do_stream:
+        stream_combine(
+            cohort=cohort, dataset=dataset, data_paths=data_paths, col_types_paths=col_types_paths,
+            block_size=block_size
+        )
+        return
+    elif do_incremental:
+        incremental_combine(
+            cohort=cohort, dataset=dataset, data_names=[phenotypes_data_name, expression_data_name, mri_data_name],
+            data_paths=data_paths, col_types_paths=col_types_paths
+        )
+        return
+
+    # Load the data
+    phenotypes_data, expression_data, mri_data = [read_data(data_path=data_path) for data_path in data_paths]
 
     # Merge the data sets by PTID
     combined_data: DataFrame = merge(phenotypes_data, expression_data, on=PTID_COL, how='inner')
     combined_data: DataFrame = merge(combined_data, mri_data, on=PTID_COL, how='inner')
 
     # Remove the columns that only have one unique value as a result of the merge
-    combined_data: DataFrame = remove_cols_of_one_unique_val(data=combined_data)
-
     # Normalize the data again since the minimum and maximum column values may have been changed in the merge
     # This will affect the nominal columns too but that's okay since their values are still distinguishable
-    combined_data = normalize(df=combined_data)
+    ptid_col: DataFrame = get_del_ptid_col(data_set=combined_data)
+    matrix, cols_left = remove_constant_cols_and_normalize(
+        matrix=combined_data.to_numpy(dtype=float32), cols=list(combined_data.columns)
+    )
+    combined_data: DataFrame = DataFrame(matrix, columns=cols_left, copy=False)
+    combined_data.insert(0, PTID_COL, ptid_col[PTID_COL].to_numpy())
 
     # Likewise, combine the column types data frames
-    col_types: DataFrame = concat([phenotypes_col_types, expression_col_types, mri_col_types], axis=1)
+    col_types: DataFrame = concat([read_data(data_path=path) for path in col_types_paths], axis=1)
 
     # Filter the column types based on what features remain after the merge
-    cols_left: list = list(combined_data.columns)
-    cols_left.remove(PTID_COL)
     col_types: DataFrame = col_types[cols_left]
 
     # Save the combined data set
-    combined_data.to_csv(BASE_DATA_PATH.format(cohort, dataset), index=False)
-    col_types.to_csv(BASE_COL_TYPES_PATH.format(cohort, dataset), index=False)
+    write_data(data=combined_data, data_path=BASE_DATA_PATH.format(cohort, dataset))
+    write_data(data=col_types, data_path=BASE_COL_TYPES_PATH.format(cohort, dataset))
+
+
+def stream_combine(cohort: str, dataset: str, data_paths: list, col_types_paths: list, block_size: int):
+    """Combines the data sets a block of columns at a time and saves the result as a memory mapped matrix"""
+
+    # Get the patients in all the data sets in the order that merging the data sets would give them
+    ptids: Index = None
+
+    for data_path in data_paths:
+        data_ptids: Index = Index(read_data(data_path=data_path, cols=[PTID_COL])[PTID_COL])
+        ptids: Index = data_ptids if ptids is None else ptids[ptids.isin(data_ptids)]
+
+    col_types: list = [read_data(data_path=path) for path in col_types_paths]
+    n_cols: int = sum(data_col_types.shape[-1] for data_col_types in col_types)
+
+    # The columns which are kept are written next to each other, so the matrix may end up with unused columns
+    data_path: str = splitext(BASE_DATA_PATH.format(cohort, dataset))[0] + STORAGE_EXTENSIONS[MATRIX_STORAGE_FORMAT]
+    tmp_data_path: str = data_path + '.tmp'
+    matrix: ndarray = open_matrix(data_path=tmp_data_path, n_rows=len(ptids), n_cols=n_cols)
+    cols_left: list = []
+
+    for data_path_i, data_col_types in zip(data_paths, col_types):
+        cols: list = list(data_col_types)
+
+        for start in range(0, len(cols), block_size):
+            block: DataFrame = read_data(data_path=data_path_i, cols=[PTID_COL] + cols[start:start + block_size])
+
+            # Line up the rows with the patients in the combined data set
+            block: DataFrame = block.set_index(PTID_COL).loc[ptids]
+
+            # Every column of the block is complete so its statistics are the same as in the combined data set
+            block, block_cols = remove_constant_cols_and_normalize(
+                matrix=block.to_numpy(dtype=float32), cols=list(block.columns)
+            )
+            matrix[:, len(cols_left):len(cols_left) + len(block_cols)] = block
+            cols_left.extend(block_cols)
+
+    matrix.flush()
+
+    if len(cols_left) == n_cols:
+        replace(tmp_data_path, data_path)
+    else:
+        # Copy the columns that were kept into a matrix without the unused columns
+        combined_matrix: ndarray = open_matrix(data_path=data_path, n_rows=len(ptids), n_cols=len(cols_left))
+
+        for start in range(0, len(cols_left), block_size):
+            end: int = min(start + block_size, len(cols_left))
+            combined_matrix[:, start:end] = matrix[:, start:end]
+
+        combined_matrix.flush()
+        del matrix
+        remove(tmp_data_path)
+
+    write_matrix_index(data_path=data_path, ptids=ptids.to_numpy(), feats=cols_left)
+
+    # Filter the column types based on what features remain after the merge
+    col_types: DataFrame = concat(col_types, axis=1)[cols_left]
+    write_data(data=col_types, data_path=BASE_COL_TYPES_PATH.format(cohort, dataset))
+
+
+def incremental_combine(cohort: str, dataset: str, data_names: list, data_paths: list, col_types_paths: list):
+    """Combines the data sets from a cache of each of them, only reading and normalizing again the changed data sets"""
+
+    cache_dirs: list = [join(CACHE_DIR, COMBINE_CACHE_NAME, cohort, data_name) for data_name in data_names]
+    data_sets: list = []
+
+    for cache_dir, data_path in zip(cache_dirs, data_paths):
+        data_sets.append(get_cached_data(cache_dir=cache_dir, data_path=data_path))
+
+    # Get the patients in all the data sets in the order that merging the data sets would give them
+    ptids: Index = None
+
+    for _, data in data_sets:
+        data_ptids: Index = Index(data[PTID_COL])
+        ptids: Index = data_ptids if ptids is None else ptids[ptids.isin(data_ptids)]
+
+    # The normalized columns of a data set only need to be computed again if it or the patients in common changed
+    # Changes are detected per data set rather than per row or column, since finding the changed values would scan
+    # the whole data set like computing its column statistics again does, so every column of a changed data set is
+    # scanned and normalized again
+    ptids_key: str = get_cache_key(data=ptids.to_numpy().astype(str))
+    blocks: list = [
+        get_normalized_block(cache_dir=cache_dir, data_key=data_key, data=data, ptids=ptids, ptids_key=ptids_key)
+        for cache_dir, (data_key, data) in zip(cache_dirs, data_sets)
+    ]
+    cols_left: list = [col for block in blocks for col in block.columns if col != PTID_COL]
+    combined_data: DataFrame = DataFrame(
+        hstack([block.drop(columns=PTID_COL).to_numpy(dtype=float32) for block in blocks]), columns=cols_left,
+        copy=False
+    )
+    combined_data.insert(0, PTID_COL, ptids.to_numpy())
+
+    # Filter the column types based on what features remain after the merge
+    col_types: DataFrame = concat([read_data(data_path=path) for path in col_types_paths], axis=1)[cols_left]
+
+    write_data(data=combined_data, data_path=BASE_DATA_PATH.format(cohort, dataset))
+    write_data(data=col_types, data_path=BASE_COL_TYPES_PATH.format(cohort, dataset))
+
+
+def get_cached_data(cache_dir: str, data_path: str) -> tuple:
+    """Gets a data set from its cache, keyed by the contents of its file, reading it into the cache if it changed"""
+
+    data_path: str = get_stored_path(data_path=data_path)
+    data_paths: list = [data_path]
+    index_path: str = splitext(data_path)[0] + MATRIX_INDEX_EXTENSION
+
+    if isfile(index_path):
+        data_paths.append(index_path)
+
+    data_key: str = get_file_cache_key(paths=data_paths)
+    cache_path: str = join(cache_dir, data_key + STORAGE_EXTENSIONS[MATRIX_STORAGE_FORMAT])
+
+    if not isfile(cache_path):
+        print('Reading Changed Data Set:', data_path)
+        data: DataFrame = read_data(data_path=data_path)
+
+        # Only the latest version of each data set is kept in the cache
+        makedirs(cache_dir, exist_ok=True)
+
+        for stale_path in glob(join(cache_dir, '*')):
+            remove(stale_path)
+
+        write_data(data=data, data_path=cache_path, storage_format=MATRIX_STORAGE_FORMAT)
+
+    return data_key, read_matrix(data_path=cache_path)
+
+
+def get_normalized_block(cache_dir: str, data_key: str, data: DataFrame, ptids: Index, ptids_key: str) -> DataFrame:
+    """Gets the normalized columns of a data set for the patients in common, computing them if they are not cached"""
+
+    block_path: str = join(cache_dir, '{}-{}{}'.format(data_key, ptids_key, STORAGE_EXTENSIONS[MATRIX_STORAGE_FORMAT]))
+
+    if not isfile(block_path):
+        # The minimum and maximum of each column are computed again over the rows of the patients in common
+        block: DataFrame = data.set_index(PTID_COL).loc[ptids]
+        matrix, cols = remove_constant_cols_and_normalize(
+            matrix=block.to_numpy(dtype=float32), cols=list(block.columns)
+        )
+        block: DataFrame = DataFrame(matrix, columns=cols, copy=False)
+        block.insert(0, PTID_COL, ptids.to_numpy())
+
+        # Only the normalized columns for the latest patients in common are kept in the cache
+        for stale_path in glob(join(cache_dir, '{}-*'.format(data_key))):
+            remove(stale_path)
+
+        write_data(data=block, data_path=block_path, storage_format=MATRIX_STORAGE_FORMAT)
+
+    return read_matrix(data_path=block_path)
+
+
+def remove_constant_cols_and_normalize(matrix: ndarray, cols: list) -> tuple:
+    """Removes the columns that only have one unique value and normalizes the other columns in place"""
+
+    mins, maxs, is_constant = get_col_stats(matrix=matrix)
 
+    if not matrix.flags.writeable:
+        matrix: ndarray = matrix.copy()
 
-def load_data(data_name: str, cohort: str) -> tuple:
-    """Loads one of the data sets to be combined"""
+    if is_constant.any():
+        is_kept: ndarray = ~is_constant
+        matrix: ndarray = matrix[:, is_kept]
+        mins: ndarray = mins[is_kept]
+        maxs: ndarray = maxs[is_kept]
+        cols: list = [col for col, is_col_kept in zip(cols, is_kept) if is_col_kept]
 
-    data_path: str = BASE_DATA_PATH.format(cohort, data_name)
-    data: DataFrame = read_csv(data_path)
-    col_types_path: str = BASE_COL_TYPES_PATH.format(cohort, data_name)
-    col_types: DataFrame = read_csv(col_types_path)
-    return data, col_types
+    subtract(matrix, mins, out=matrix)
+    divide(matrix, maxs - mins, out=matrix)
 
+    return matrix, cols
 
-def normalize(df: DataFrame) -> DataFrame:
-    """Normalizes the data"""
 
-    ptid_col: DataFrame = get_del_ptid_col(df)
-    df: DataFrame = (df - df.min(axis=0)) / (df.max(axis=0) - df.min(axis=0))
-    df: DataFrame = concat([ptid_col, df], axis=1)
-    return df
+def get_col_stats(matrix: ndarray) -> tuple:
+    """Computes the minimum and maximum of each column and whether it only has one unique value in one pass"""
 
+    n_rows, n_cols = matrix.shape
+    mins: ndarray = empty(n_cols, dtype=matrix.dtype)
+    maxs: ndarray = empty(n_cols, dtype=matrix.dtype)
+    n_nans: ndarray = empty(n_cols, dtype=int)
 
-def remove_cols_of_one_unique_val(data: DataFrame) -> DataFrame:
-    """Removes columns from the current data set that only have one unique value as a result of the filtering"""
+    # Compute all the statistics of a block of columns while the block is in the cache
+    for start in range(0, n_cols, MATRIX_COL_BLOCK_SIZE):
+        block: ndarray = matrix[:, start:start + MATRIX_COL_BLOCK_SIZE]
+        end: int = start + block.shape[-1]
 
-    for col_name in list(data):
-        col: Series = data[col_name]
+        # Missing values are ignored by the minimum and maximum but they count as a unique value
+        fmin.reduce(block, axis=0, out=mins[start:end])
+        fmax.reduce(block, axis=0, out=maxs[start:end])
+        isnan(block).sum(axis=0, out=n_nans[start:end])
 
-        if len(col.unique()) == 1:
-            del data[col_name]
+    is_all_nan: ndarray = n_nans == n_rows
+    is_constant: ndarray = is_all_nan | ((mins == maxs) & (n_nans == 0))
 
-    return data
+    return mins, maxs, is_constant
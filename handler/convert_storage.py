@@ -0,0 +1,51 @@
+"""Converts the data sets and column types that have already been saved to a different storage format"""
+
+from os.path import join, splitext, isdir
+from os import walk, remove
+from pandas import DataFrame, read_csv
+
+from handler.utils import PREPARED_DATA_DIR, DATA_DIR, CACHE_DIR, CSV_EXTENSION, write_data
+
+
+def convert_storage_handler(storage_format: str, do_remove_csv: bool):
+    """Main method of this module"""
+
+    for data_dir in (PREPARED_DATA_DIR, DATA_DIR):
+        if not isdir(data_dir):
+            continue
+
+        for cur_dir, sub_dirs, file_names in walk(data_dir):
+            # The cache does not contain data sets
+            if cur_dir == CACHE_DIR:
+                sub_dirs.clear()
+                continue
+
+            for file_name in sorted(file_names):
+                if not is_data_csv(data_dir=data_dir, file_name=file_name):
+                    continue
+
+                csv_path: str = join(cur_dir, file_name)
+                data: DataFrame = read_csv(csv_path)
+                data_path: str = write_data(data=data, data_path=csv_path, storage_format=storage_format)
+
+                # Column types stay CSVs in the matrix storage format
+                if data_path == csv_path:
+                    continue
+
+                print(csv_path, '->', data_path)
+
+                if do_remove_csv:
+                    remove(csv_path)
+
+
+def is_data_csv(data_dir: str, file_name: str) -> bool:
+    """Determines whether a file is a data set or column types CSV, as opposed to a clustering or a score"""
+
+    _, extension = splitext(file_name)
+
+    if extension != CSV_EXTENSION:
+        return False
+    elif data_dir == PREPARED_DATA_DIR:
+        return True
+    else:
+        return file_name.startswith('data-') or file_name.startswith('col-types-')
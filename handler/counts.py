@@ -1,85 +1,115 @@
 """Counts the number of individuals in each category of a given variate"""
 
-from pandas import DataFrame, read_csv
+from os.path import splitext
+from pandas import DataFrame, Series, read_csv, crosstab, concat
 from pickle import load
+from scipy.stats import chi2_contingency
 
+from handler.catalog import query_clusterings
 from handler.utils import PTID_COL, CLUSTER_ID_COL
 
+CATEGORY_COL: str = 'category'
+MISSING_CATEGORY: str = 'missing'
+JSON_EXTENSION: str = '.json'
 
-def counts_handler(clustering_path: str, feat_map_path: str):
+
+def counts_handler(
+    clustering_paths: list, feat_map_path: str, cohort: str = None, dataset: str = None, cluster_method: str = None,
+    top_n: int = None, output_path: str = None
+):
     """Main method of this module"""
 
-    clustering: DataFrame = read_csv(clustering_path)
-    feat_map: dict = load(open(feat_map_path, 'rb'))
-    clustering: dict = convert_clustering_to_dict(clustering=clustering)
-    counts: dict = {}
+    # The clusterings in the catalog are found by both their cohort and data set, so neither is given without the other
+    assert (cohort is None) == (dataset is None)
 
-    for ptid, clusterid in clustering.items():
-        variant_category: object = feat_map[ptid]
+    # The best clusterings in the catalog are counted along with the clusterings that were given
+    if cohort is not None:
+        clusterings: DataFrame = query_clusterings(
+            cohort=cohort, dataset=dataset, cluster_method=cluster_method, top_n=top_n
+        )
+        clustering_paths: list = clustering_paths + list(clusterings['path'])
 
-        # Add the variant that corresponds to this cluster ID
-        if clusterid in counts:
-            cluster_counts: dict = counts[clusterid]
+    assert len(clustering_paths) > 0
 
-            if variant_category in cluster_counts:
-                cluster_counts[variant_category] += 1
-            else:
-                cluster_counts[variant_category] = 1
-        else:
-            counts[clusterid] = {variant_category: 1}
+    # The feature map is loaded once for every clustering
+    with open(feat_map_path, 'rb') as f:
+        feat_map: Series = Series(load(f))
 
-    grand_total: int = get_grand_total(counts=counts)
-    assert grand_total == len(clustering)
+    tables: list = []
 
-    for clusterid, cluster_counts in counts.items():
-        # Get the total count
-        cluster_total: int = get_cluster_total(cluster_counts=cluster_counts)
+    for clustering_path in clustering_paths:
+        clustering: DataFrame = read_csv(clustering_path)
+        table: DataFrame = get_counts_table(clustering=clustering, feat_map=feat_map)
+        table.insert(0, 'clustering_path', clustering_path)
+        tables.append(table)
 
-        cluster_print: str = 'Cluster {}: {}/{} ({:.2f}%)'.format(
-            clusterid, cluster_total, grand_total, cluster_total / grand_total * 100.0
-        )
-        print(cluster_print)
+        if output_path is None:
+            print_counts_table(clustering_path=clustering_path, table=table)
 
-        for variant_category, count in cluster_counts.items():
-            variant_print: str = '\t{}: {}/{} ({:.2f}%)'.format(
-                variant_category, count, cluster_total, count / cluster_total * 100.0
-            )
-            print(variant_print)
+    if output_path is not None:
+        table: DataFrame = concat(tables, ignore_index=True)
+        _, extension = splitext(output_path)
 
-        print()
+        if extension == JSON_EXTENSION:
+            table.to_json(output_path, orient='records', indent=4)
+        else:
+            table.to_csv(output_path, index=False)
 
 
-def convert_clustering_to_dict(clustering: DataFrame) -> dict:
-    """Converts a clustering from data frame format to a dictionary format"""
+def get_counts_table(clustering: DataFrame, feat_map: Series) -> DataFrame:
+    """Counts the individuals of each cluster in each category and tests if the categories depend on the clusters"""
 
-    ptids: list = list(clustering[PTID_COL])
-    clusterids: list = list(clustering[CLUSTER_ID_COL])
-    clustering: dict = {}
+    # Every individual in the clustering must be in the feature map
+    categories: Series = feat_map.loc[clustering[PTID_COL]]
 
-    for ptid, clusterid in zip(ptids, clusterids):
-        clustering[ptid] = clusterid
+    # The individuals whose category is missing are counted in a category of their own rather than left out
+    categories: Series = categories.astype(object).where(categories.notna(), MISSING_CATEGORY)
+    contingency: DataFrame = crosstab(
+        clustering[CLUSTER_ID_COL].to_numpy(), categories.to_numpy(), rownames=[CLUSTER_ID_COL],
+        colnames=[CATEGORY_COL]
+    )
 
-    return clustering
+    # The chi-square test needs more than one cluster and category
+    if min(contingency.shape) > 1:
+        chi_square, p_value, dof, _ = chi2_contingency(contingency.to_numpy())
+    else:
+        chi_square, p_value, dof = 0.0, 1.0, 0
 
+    table: DataFrame = contingency.stack().rename('count').reset_index()
+    table: DataFrame = table[table['count'] > 0].reset_index(drop=True)
+    cluster_totals: Series = contingency.sum(axis=1)
+    table['cluster_total'] = cluster_totals.loc[table[CLUSTER_ID_COL]].to_numpy()
+    table['grand_total'] = int(contingency.to_numpy().sum())
+    table['chi_square'] = float(chi_square)
+    table['p_value'] = float(p_value)
+    table['dof'] = int(dof)
 
-def get_grand_total(counts: dict) -> int:
-    """Computes the total number of samples in the entire clustering"""
+    return table
 
-    grand_total: int = 0
 
-    for cluster_counts in counts.values():
-        cluster_total: int = get_cluster_total(cluster_counts=cluster_counts)
-        grand_total += cluster_total
+def print_counts_table(clustering_path: str, table: DataFrame):
+    """Prints the share of the individuals in each cluster and of the individuals of each cluster in each category"""
 
-    return grand_total
+    print(clustering_path)
+    grand_total: int = table.loc[0, 'grand_total']
 
+    for clusterid, cluster_counts in table.groupby(CLUSTER_ID_COL):
+        cluster_total: int = cluster_counts['cluster_total'].iloc[0]
 
-def get_cluster_total(cluster_counts: dict):
-    """Computes the total number of samples in a cluster"""
+        cluster_print: str = 'Cluster {}: {}/{} ({:.2f}%)'.format(
+            clusterid, cluster_total, grand_total, cluster_total / grand_total * 100.0
+        )
+        print(cluster_print)
 
-    cluster_total: int = 0
+        for variant_category, count in zip(cluster_counts[CATEGORY_COL], cluster_counts['count']):
+            variant_print: str = '\t{}: {}/{} ({:.2f}%)'.format(
+                variant_category, count, cluster_total, count / cluster_total * 100.0
+            )
+            print(variant_print)
 
-    for count in cluster_counts.values():
-        cluster_total += count
+        print()
 
-    return cluster_total
+    print('Chi-Square: {:.4f} (p = {:.4g}, dof = {})'.format(
+        table.loc[0, 'chi_square'], table.loc[0, 'p_value'], table.loc[0, 'dof']
+    ))
+    print()
@@ -1,41 +1,69 @@
 """Creates a smaller data set from a larger one for the purpose of quicker debugging"""
 
-from pandas import DataFrame, read_csv, concat
-from numpy.random import shuffle, seed
+from pandas import DataFrame, Series
+from numpy import ndarray, sort
+from numpy.random import shuffle, seed, permutation
 
-from handler.utils import BASE_DATA_PATH, BASE_COL_TYPES_PATH, get_del_ptid_col, DEBUG_IDENTIFIER
+from handler.utils import (
+    BASE_DATA_PATH, BASE_COL_TYPES_PATH, PTID_COL, DEBUG_IDENTIFIER, read_cols, read_data, write_data
+)
 
 
-def debug_datasets_handler(cohort: str, dataset: str):
+def debug_datasets_handler(
+    cohort: str, dataset: str, n_debug_cols: int = 1000, n_debug_rows: int = None, do_stratify: bool = False
+):
     """Main method of this module"""
 
-    n_debug_cols: int = 1000
-
     # Seed the numpy random number generator for consistency
     seed(0)
 
-    # Read the data
+    # Only the header is read to choose the columns so the full data set is never loaded
     data_path: str = BASE_DATA_PATH.format(cohort, dataset)
-    data: DataFrame = read_csv(data_path)
-
-    ptid_col: DataFrame = get_del_ptid_col(data_set=data)
+    cols: list = [col for col in read_cols(data_path=data_path) if col != PTID_COL]
 
     # Shuffle the data to get a better distribution of the data set and avoid bias in the columns selected for debugging
-    shuffled_cols: list = list(data)
+    shuffled_cols: list = list(cols)
     shuffle(shuffled_cols)
-    shuffled_cols: list = shuffled_cols[:n_debug_cols]
-    data: DataFrame = data[shuffled_cols]
 
-    # Sample the column types accordingly
     col_types_path: str = BASE_COL_TYPES_PATH.format(cohort, dataset)
-    col_types: DataFrame = read_csv(col_types_path)
-    col_types: DataFrame = col_types[shuffled_cols].copy()
+    col_types: DataFrame = read_data(data_path=col_types_path)
+
+    if do_stratify:
+        shuffled_cols: list = get_stratified_cols(
+            shuffled_cols=shuffled_cols, col_types=col_types, n_debug_cols=n_debug_cols
+        )
+    else:
+        shuffled_cols: list = shuffled_cols[:n_debug_cols]
+
+    # Read only the sampled columns, which the columnar storage formats can do without reading the other columns
+    data: DataFrame = read_data(data_path=data_path, cols=[PTID_COL] + shuffled_cols)
+
+    if n_debug_rows is not None and n_debug_rows < data.shape[0]:
+        # Keep the sampled individuals in the order of the data set
+        rows: ndarray = sort(permutation(data.shape[0])[:n_debug_rows])
+        data: DataFrame = data.iloc[rows].reset_index(drop=True)
 
-    data: DataFrame = concat([ptid_col, data], axis=1)
+    # Sample the column types accordingly
+    col_types: DataFrame = col_types[shuffled_cols].copy()
 
     # Save the debug data set and column types
     dataset: str = DEBUG_IDENTIFIER + dataset
     debug_data_path: str = BASE_DATA_PATH.format(cohort, dataset)
     debug_col_types_path: str = BASE_COL_TYPES_PATH.format(cohort, dataset)
-    data.to_csv(debug_data_path, index=False)
-    col_types.to_csv(debug_col_types_path, index=False)
+    write_data(data=data, data_path=debug_data_path)
+    write_data(data=col_types, data_path=debug_col_types_path)
+
+
+def get_stratified_cols(shuffled_cols: list, col_types: DataFrame, n_debug_cols: int) -> list:
+    """Takes the first shuffled columns of each column type in proportion to how many columns have the type"""
+
+    col_type_per_col: Series = col_types.iloc[0][shuffled_cols]
+    col_type_counts: Series = col_type_per_col.value_counts()
+
+    # Every column type keeps at least one column so the debug data set has all of them
+    n_cols_per_type: Series = (col_type_counts * n_debug_cols / len(shuffled_cols)).round().astype(int).clip(lower=1)
+    is_sampled: Series = (
+        col_type_per_col.groupby(col_type_per_col).cumcount() < col_type_per_col.map(n_cols_per_type)
+    )
+
+    return list(col_type_per_col.index[is_sampled.to_numpy()])
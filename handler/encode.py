@@ -0,0 +1,94 @@
+"""Encodes the features of a data set as a matrix, one-hot encoding the nominal features with cached vocabularies"""
+
+from os.path import isfile, getmtime
+from os import replace, getpid
+from pickle import load, dump
+from pandas import DataFrame
+from numpy import ndarray, float32, array, empty, zeros, unique, isnan, searchsorted, flatnonzero, minimum, cumsum
+
+from handler.utils import (
+    BASE_DATA_PATH, BASE_VOCAB_PATH, NOMINAL_COL_TYPE, MATRIX_COL_BLOCK_SIZE, get_stored_path
+)
+
+
+def encode_data(data: DataFrame, col_types: DataFrame, cohort: str, dataset: str, vocab: dict = None) -> ndarray:
+    """Puts the numeric features and then the one-hot encoded nominal features of a data set into a matrix"""
+
+    cols: list = list(col_types)
+    is_nominal: ndarray = (col_types.loc[0] == NOMINAL_COL_TYPE).to_numpy()
+    numeric_cols: list = [col for col, col_is_nominal in zip(cols, is_nominal) if not col_is_nominal]
+    nominal_cols: list = [col for col, col_is_nominal in zip(cols, is_nominal) if col_is_nominal]
+
+    if vocab is None:
+        vocab: dict = get_vocab(data=data, nominal_cols=nominal_cols, cohort=cohort, dataset=dataset)
+
+    n_categories: ndarray = array([len(vocab[col]) for col in nominal_cols], dtype=int)
+
+    # Each nominal feature has a column for each of its categories, after the numeric features
+    offsets: ndarray = len(numeric_cols) + cumsum(n_categories) - n_categories
+    # The matrix is kept in the precision of the data so a float32 data set is not encoded at twice its size
+    dtype = float32 if (data.dtypes[cols] == float32).all() else float
+    matrix: ndarray = empty((data.shape[0], len(numeric_cols) + n_categories.sum()), dtype=dtype)
+
+    for start in range(0, len(numeric_cols), MATRIX_COL_BLOCK_SIZE):
+        block_cols: list = numeric_cols[start:start + MATRIX_COL_BLOCK_SIZE]
+        matrix[:, start:start + len(block_cols)] = data[block_cols].to_numpy(dtype=dtype)
+
+    matrix[:, len(numeric_cols):] = 0.0
+
+    for col, offset in zip(nominal_cols, offsets):
+        vals: ndarray = data[col].to_numpy()
+
+        # The vocabulary is compared in the precision of the data so it matches data stored in a lower precision
+        categories: ndarray = vocab[col].astype(vals.dtype)
+        codes: ndarray = minimum(searchsorted(categories, vals), max(len(categories) - 1, 0))
+
+        # Missing values and values outside of the vocabulary are encoded as zeros in every column
+        rows: ndarray = flatnonzero(categories[codes] == vals) if len(categories) > 0 else zeros(0, dtype=int)
+        matrix[rows, offset + codes[rows]] = 1.0
+
+    return matrix
+
+
+def get_encoded_cols(col_types: DataFrame, vocab: dict) -> list:
+    """Names the columns of the matrix that encode_data puts the features of a data set into"""
+
+    numeric_cols: list = [col for col in col_types if col_types.loc[0, col] != NOMINAL_COL_TYPE]
+    nominal_cols: list = [col for col in col_types if col_types.loc[0, col] == NOMINAL_COL_TYPE]
+
+    return numeric_cols + ['{}={:g}'.format(col, category) for col in nominal_cols for category in vocab[col]]
+
+
+def get_vocab(data: DataFrame, nominal_cols: list, cohort: str, dataset: str) -> dict:
+    """Gets the sorted categories of each nominal feature, from the cache next to the prepared data if possible"""
+
+    vocab_path: str = BASE_VOCAB_PATH.format(cohort, dataset)
+
+    # The vocabulary is only valid for the version of the prepared data set it was found from
+    data_mtime: float = getmtime(get_stored_path(data_path=BASE_DATA_PATH.format(cohort, dataset)))
+    vocab: dict = {}
+
+    if isfile(vocab_path):
+        with open(vocab_path, 'rb') as f:
+            cached_mtime, cached_vocab = load(f)
+
+        if cached_mtime == data_mtime:
+            vocab: dict = cached_vocab
+
+    # Every iteration of the pipeline has the same individuals so the categories of a feature never change
+    missing_cols: list = [col for col in nominal_cols if col not in vocab]
+
+    if len(missing_cols) > 0:
+        for col in missing_cols:
+            categories: ndarray = unique(data[col].to_numpy(dtype=float))
+            vocab[col] = categories[~isnan(categories)]
+
+        # Several pipelines may save the vocabulary at once so write to a temporary file and move it into place
+        tmp_path: str = '{}.{}.tmp'.format(vocab_path, getpid())
+
+        with open(tmp_path, 'wb') as f:
+            dump((data_mtime, vocab), f)
+
+        replace(tmp_path, vocab_path)
+
+    return vocab
@@ -1,37 +1,111 @@
-"""Selects features from an ARFF using a WEKA feature selection algorithm"""
+"""Selects features from an ARFF using a WEKA feature selection algorithm or its native equivalent"""
 
-from os import popen
-from pandas import DataFrame, concat
+from glob import glob
+from pandas import DataFrame, merge, read_csv
+from numpy import ndarray, concatenate
 
-from handler.utils import ARFF_PATH, get_data_path, get_col_types_path, get_data, get_del_ptid_col
+from handler.info_gain import get_info_gains, rank_feats
+from handler.profiling import profile_stage, run_command
+from handler.schedule import get_next_n_kept_feats
+from handler.manifest import load_manifest, get_clustering_scores
+from handler.utils import (
+    ARFF_PATH, BASE_DATA_PATH, CLUSTERING_PATH, MANIFEST_PATH, PTID_COL, CLUSTER_ID_COL, NOMINAL_COL_TYPE,
+    NATIVE_RANKER, WEKA_RANKER, DECAY_SCHEDULE, SCORE_AWARE_SCHEDULE, MATRIX_COL_BLOCK_SIZE, get_data_path,
+    get_col_types_path, get_data, get_n_kept_feats, read_data, write_data
+)
 
 
 def feat_select_handler(
-    cohort: str, dataset: str, cluster_method: str, n_clusters: int, iteration: int, n_kept_feats: int
-):
+    cohort: str, dataset: str, cluster_method: str, n_clusters: int, iteration: int, n_kept_feats: int,
+    data: DataFrame = None, col_types: DataFrame = None, do_checkpoint: bool = True, ranker: str = WEKA_RANKER,
+    clustering: DataFrame = None, schedule: str = DECAY_SCHEDULE, target_n_kept_feats: int = 1,
+    clustering_scores: list = None
+) -> tuple:
     """Main method of this module"""
 
-    # We need to get the previous data now because n_kept_feats will change after selecting features
-    data, col_types, n_kept_feats = get_data(
-        cohort=cohort, dataset=dataset, cluster_method=cluster_method, n_clusters=n_clusters, iteration=iteration,
-        n_kept_feats=n_kept_feats
+    # We need the previous column types now because n_kept_feats will change after selecting features
+    if data is None:
+        col_types_path: str = get_col_types_path(
+            cohort=cohort, dataset=dataset, cluster_method=cluster_method, n_clusters=n_clusters,
+            iteration=iteration, n_kept_feats=n_kept_feats
+        )
+        col_types: DataFrame = read_data(data_path=col_types_path)
+
+    prev_n_kept_feats: int = get_n_kept_feats(col_types=col_types, n_kept_feats=n_kept_feats)
+
+    # The score-aware schedule chooses how many features to remove from the scores of the clusterings so far, which
+    # the pipeline records in its manifest when it does not pass them in memory
+    if schedule == SCORE_AWARE_SCHEDULE and clustering_scores is None:
+        manifest: dict = load_manifest(manifest_path=MANIFEST_PATH.format(cohort, dataset, cluster_method, n_clusters))
+        clustering_scores: list = get_clustering_scores(manifest=manifest, iteration=iteration)
+
+    next_n_kept_feats: int = get_next_n_kept_feats(
+        schedule=schedule, n_kept_feats=prev_n_kept_feats, clustering_scores=clustering_scores,
+        target_n_kept_feats=target_n_kept_feats
     )
 
-    if n_kept_feats <= 100:
-        # If the number of remaining features is less than or equal to 100, just take off one feature at a time
-        n_kept_feats_decay: float = (n_kept_feats - 1) / n_kept_feats
-    elif n_kept_feats < 500:
-        # Decrease the number of features by a lower amount
-        n_kept_feats_decay: float = 0.95
+    if ranker == NATIVE_RANKER:
+        # Rank the features directly from the data and the clustering rather than from the ARFF
+        with profile_stage(stage='feat_select.load'):
+            if data is None:
+                data, _, _ = get_data(
+                    cohort=cohort, dataset=dataset, cluster_method=cluster_method, n_clusters=n_clusters,
+                    iteration=iteration, n_kept_feats=n_kept_feats
+                )
+
+            if clustering is None:
+                clustering: DataFrame = load_clustering(
+                    cohort=cohort, dataset=dataset, cluster_method=cluster_method, n_clusters=n_clusters,
+                    iteration=iteration, n_kept_feats=prev_n_kept_feats
+                )
+
+        with profile_stage(stage='feat_select.rank'):
+            feats_to_keep: list = get_native_ranking(
+                data=data, col_types=col_types, clustering=clustering, n_kept_feats=next_n_kept_feats
+            )
     else:
-        n_kept_feats_decay: float = 0.9
+        assert ranker == WEKA_RANKER
+
+        # Run the feature selection WEKA algorithm on the ARFF
+        arff_path: str = ARFF_PATH.format(cohort, dataset, cluster_method, n_clusters, iteration, prev_n_kept_feats)
+
+        with profile_stage(stage='feat_select.rank'):
+            feats_to_keep: list = get_weka_ranking(arff_path=arff_path, n_kept_feats=next_n_kept_feats)
+
+        # Since WEKA ranked the features from the ARFF, only the selected features of the data need to be read
+        with profile_stage(stage='feat_select.load'):
+            if data is None:
+                data, _, _ = get_data(
+                    cohort=cohort, dataset=dataset, cluster_method=cluster_method, n_clusters=n_clusters,
+                    iteration=iteration, n_kept_feats=n_kept_feats, feats=feats_to_keep
+                )
+
+    n_kept_feats: int = next_n_kept_feats
+    assert n_kept_feats == len(feats_to_keep)
+
+    # Only the column types are subset, which decide the features of the data set that the later stages use
+    # This keeps an in-memory data set a view of the memory mapped matrix rather than a copy of its selected features
+    col_types: DataFrame = col_types[feats_to_keep].copy()
+
+    if do_checkpoint:
+        with profile_stage(stage='feat_select.save'):
+            save_next_data(
+                cohort=cohort, dataset=dataset, cluster_method=cluster_method, n_clusters=n_clusters,
+                iteration=iteration, n_kept_feats=n_kept_feats, data=data[[PTID_COL] + feats_to_keep],
+                col_types=col_types
+            )
+
+    return data, col_types, n_kept_feats
+
+
+def get_weka_ranking(arff_path: str, n_kept_feats: int) -> list:
+    """Gets the names of the features with the highest information gain from WEKA, best first"""
 
-    # Run the feature selection WEKA algorithm on the ARFF
-    arff_path: str = ARFF_PATH.format(cohort, dataset, cluster_method, n_clusters, iteration, n_kept_feats)
-    n_kept_feats: int = int(n_kept_feats * n_kept_feats_decay)
     command: str = 'java -cp ~/weka-3-8-4/weka.jar weka.attributeSelection.InfoGainAttributeEval -s '
     command += '"weka.attributeSelection.Ranker -T 0.0 -N {}" -i {}'.format(n_kept_feats, arff_path)
-    rank_output: str = popen(command).read()
+
+    # WEKA is waited for so its CPU time and memory are counted in the profile of the ranking
+    rank_output: str = run_command(command=command)
 
     # Create a list of the features that were kept / selected
     rank_output: list = rank_output.split('\n')
@@ -51,14 +125,53 @@ def feat_select_handler(
         feat: str = line[-1]
         feats_to_keep.append(feat)
 
-    assert n_kept_feats == len(feats_to_keep)
-    print(n_kept_feats)
+    return feats_to_keep
+
+
+def get_native_ranking(data: DataFrame, col_types: DataFrame, clustering: DataFrame, n_kept_feats: int) -> list:
+    """Gets the names of the features with the highest information gain without using WEKA, best first"""
+
+    # Line the cluster labels up with the rows of the data
+    labels: DataFrame = merge(data[[PTID_COL]], clustering, on=PTID_COL, how='inner')
+    assert labels.shape[0] == data.shape[0]
+    labels: ndarray = labels[CLUSTER_ID_COL].to_numpy()
+
+    feats: list = list(col_types)
+    is_nominal: ndarray = (col_types.loc[0] == NOMINAL_COL_TYPE).to_numpy()
+    info_gains: list = []
+
+    # Only a block of the features is copied out of the data set at a time
+    for start in range(0, len(feats), MATRIX_COL_BLOCK_SIZE):
+        block_feats: list = feats[start:start + MATRIX_COL_BLOCK_SIZE]
+        info_gains.append(get_info_gains(
+            data=data[block_feats].to_numpy(dtype=float), is_nominal=is_nominal[start:start + len(block_feats)],
+            labels=labels
+        ))
+
+    ranking: ndarray = rank_feats(info_gains=concatenate(info_gains), n_kept_feats=n_kept_feats)
+
+    return [feats[i] for i in ranking]
+
+
+def load_clustering(
+    cohort: str, dataset: str, cluster_method: str, n_clusters: int, iteration: int, n_kept_feats: int
+) -> DataFrame:
+    """Loads the clustering of an iteration without knowing its clustering score"""
+
+    clustering_paths: list = glob(
+        CLUSTERING_PATH.format(cohort, dataset, cluster_method, n_clusters, iteration, n_kept_feats, '*')
+    )
+    assert len(clustering_paths) == 1
+
+    return read_csv(clustering_paths[0])
+
+
+def save_next_data(
+    cohort: str, dataset: str, cluster_method: str, n_clusters: int, iteration: int, n_kept_feats: int,
+    data: DataFrame, col_types: DataFrame
+):
+    """Saves the selected features as the data set and column types of the next iteration of the pipeline"""
 
-    # Select the features from the previous data
-    ptid_col: DataFrame = get_del_ptid_col(data_set=data)
-    data: DataFrame = data[feats_to_keep].copy()
-    data: DataFrame = concat([ptid_col, data], axis=1)
-    col_types: DataFrame = col_types[feats_to_keep].copy()
     next_data_path: str = get_data_path(
         cohort=cohort, dataset=dataset, cluster_method=cluster_method, n_clusters=n_clusters, iteration=iteration + 1,
         n_kept_feats=n_kept_feats
@@ -67,5 +180,6 @@ def feat_select_handler(
         cohort=cohort, dataset=dataset, cluster_method=cluster_method, n_clusters=n_clusters, iteration=iteration + 1,
         n_kept_feats=n_kept_feats
     )
-    data.to_csv(next_data_path, index=False)
-    col_types.to_csv(next_col_types_path, index=False)
+    # When the full data set is a memory mapped matrix, only the indices of the selected features are saved
+    write_data(data=data, data_path=next_data_path, base_data_path=BASE_DATA_PATH.format(cohort, dataset))
+    write_data(data=col_types, data_path=next_col_types_path)
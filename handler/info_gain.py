@@ -0,0 +1,178 @@
+"""Ranks features by information gain the same way as WEKA's InfoGainAttributeEval and Ranker, without a JVM"""
+
+from numpy import (
+    ndarray, log, log2, where, zeros, unique, bincount, cumsum, argsort, lexsort, arange, flatnonzero, isnan, outer
+)
+
+LN_2: float = log(2)
+
+
+def rank_feats(info_gains: ndarray, n_kept_feats: int) -> ndarray:
+    """Gets the column indices of the features with the highest information gain, best first"""
+
+    # Sort by descending information gain and break ties by the column order
+    # WEKA's Ranker orders features of the same information gain by an unstable sort instead, so tied features can be
+    # in a different order than WEKA and a tie at the number of features kept can keep different features
+    ranking: ndarray = lexsort((arange(len(info_gains)), -info_gains))
+
+    return ranking[:n_kept_feats]
+
+
+def get_info_gains(data: ndarray, is_nominal: ndarray, labels: ndarray) -> ndarray:
+    """Computes the information gain of every column with respect to the labels"""
+
+    _, labels = unique(labels, return_inverse=True)
+    n_classes: int = labels.max() + 1
+    one_hot_labels: ndarray = zeros((len(labels), n_classes))
+    one_hot_labels[arange(len(labels)), labels] = 1.0
+    class_entropy: float = entropy(counts=one_hot_labels.sum(axis=0))
+
+    # Sort every column at once so the numeric columns can be discretized from the sorted order
+    # The missing values are sorted to the end of each column, like WEKA sorts them
+    sorted_idxs: ndarray = argsort(data, axis=0, kind='stable')
+    is_missing: ndarray = isnan(data)
+    info_gains: ndarray = zeros(data.shape[-1])
+
+    for i in range(data.shape[-1]):
+        # WEKA leaves the missing values out of the discretization and the counts of the values
+        is_present: ndarray = ~is_missing[:, i]
+        missing_counts: ndarray = one_hot_labels[is_missing[:, i]].sum(axis=0)
+
+        if is_nominal[i]:
+            _, values = unique(data[is_present, i], return_inverse=True)
+            present_labels: ndarray = labels[is_present]
+            counts: ndarray = bincount(
+                values * n_classes + present_labels, minlength=(values.max(initial=-1) + 1) * n_classes
+            )
+            counts: ndarray = counts.reshape(-1, n_classes)
+        else:
+            col_idxs: ndarray = sorted_idxs[:is_present.sum(), i]
+            counts: ndarray = get_discretized_counts(
+                sorted_col=data[col_idxs, i], cum_counts=cumsum(one_hot_labels[col_idxs], axis=0)
+            )
+
+        counts: ndarray = distribute_missing_counts(counts=counts, missing_counts=missing_counts)
+        info_gains[i] = class_entropy - entropy_conditioned_on_rows(counts=counts)
+
+    return info_gains
+
+
+def distribute_missing_counts(counts: ndarray, missing_counts: ndarray) -> ndarray:
+    """Distributes the class counts of the missing values over the values in proportion to how common each value is"""
+
+    total: float = counts.sum()
+
+    # Like WEKA, the missing values are their own value if every value is missing so the column has no gain
+    if total == 0:
+        return missing_counts.reshape(1, -1)
+
+    return counts + outer(counts.sum(axis=1) / total, missing_counts)
+
+
+def get_discretized_counts(sorted_col: ndarray, cum_counts: ndarray) -> ndarray:
+    """Discretizes a sorted column with Fayyad and Irani's MDL method and gets the class counts of each interval"""
+
+    if len(sorted_col) == 0:
+        return zeros((0, cum_counts.shape[-1]))
+
+    # A split can only be made between two different values
+    is_boundary: ndarray = sorted_col[:-1] < sorted_col[1:]
+    cut_idxs: list = []
+    subsets: list = [(0, len(sorted_col))]
+
+    while len(subsets) > 0:
+        first, last_plus_one = subsets.pop()
+        cut_idx: int = get_cut_idx(
+            cum_counts=cum_counts, is_boundary=is_boundary, first=first, last_plus_one=last_plus_one
+        )
+
+        if cut_idx is not None:
+            cut_idxs.append(cut_idx)
+            subsets.append((first, cut_idx + 1))
+            subsets.append((cut_idx + 1, last_plus_one))
+
+    # The class counts of each interval are the differences of the cumulative counts at the interval ends
+    interval_ends: ndarray = cum_counts[sorted(cut_idxs) + [len(sorted_col) - 1]]
+    interval_ends[1:] -= interval_ends[:-1].copy()
+
+    return interval_ends
+
+
+def get_cut_idx(cum_counts: ndarray, is_boundary: ndarray, first: int, last_plus_one: int) -> int:
+    """Gets the index after which the best accepted split of a subset of a sorted column is, if there is one"""
+
+    if last_plus_one - first < 2:
+        return None
+
+    candidate_idxs: ndarray = flatnonzero(is_boundary[first:last_plus_one - 1]) + first
+    n_cut_points: int = len(candidate_idxs)
+
+    if n_cut_points == 0:
+        return None
+
+    before_counts: ndarray = cum_counts[first - 1] if first > 0 else zeros(cum_counts.shape[-1])
+    prior_counts: ndarray = cum_counts[last_plus_one - 1] - before_counts
+    n_instances: float = prior_counts.sum()
+
+    # Compute the entropy of every candidate split at once
+    left_counts: ndarray = cum_counts[candidate_idxs] - before_counts
+    right_counts: ndarray = prior_counts - left_counts
+    split_entropies: ndarray = (row_entropy_terms(counts=left_counts) + row_entropy_terms(counts=right_counts))
+    split_entropies: ndarray = split_entropies / (n_instances * LN_2)
+
+    best_idx: int = split_entropies.argmin()
+    prior_entropy: float = entropy(counts=prior_counts)
+    gain: float = prior_entropy - split_entropies[best_idx]
+
+    if gain <= 0:
+        return None
+
+    # Fayyad and Irani's minimum description length criterion
+    left_counts: ndarray = left_counts[best_idx]
+    right_counts: ndarray = right_counts[best_idx]
+    n_classes: int = (prior_counts > 0).sum()
+    n_left_classes: int = (left_counts > 0).sum()
+    n_right_classes: int = (right_counts > 0).sum()
+    delta: float = log2(3 ** n_classes - 2) - (
+        n_classes * prior_entropy - n_right_classes * entropy(counts=right_counts)
+        - n_left_classes * entropy(counts=left_counts)
+    )
+
+    if gain > (log2(n_cut_points) + delta) / n_instances:
+        return candidate_idxs[best_idx]
+
+    return None
+
+
+def x_log_x(x: ndarray) -> ndarray:
+    """Computes x * ln(x), taking it to be 0 where x is 0"""
+
+    return where(x > 0, x * log(where(x > 0, x, 1.0)), 0.0)
+
+
+def row_entropy_terms(counts: ndarray) -> ndarray:
+    """Computes the unnormalized entropy of every row of class counts"""
+
+    return x_log_x(counts.sum(axis=-1)) - x_log_x(counts).sum(axis=-1)
+
+
+def entropy(counts: ndarray) -> float:
+    """Computes the entropy in bits of an array of class counts"""
+
+    total: float = counts.sum()
+
+    if total == 0:
+        return 0.0
+
+    return row_entropy_terms(counts=counts) / (total * LN_2)
+
+
+def entropy_conditioned_on_rows(counts: ndarray) -> float:
+    """Computes the entropy in bits of the classes (the columns) given the values (the rows) of a contingency table"""
+
+    total: float = counts.sum()
+
+    if total == 0:
+        return 0.0
+
+    return row_entropy_terms(counts=counts).sum() / (total * LN_2)
@@ -0,0 +1,79 @@
+"""Records the stages of a pipeline that have completed so a pipeline that was stopped can continue where it left off"""
+
+from os import replace, remove
+from os.path import isfile, join
+from glob import glob
+from json import load, dump
+
+from handler.utils import get_tmp_path
+
+CLUSTER_STAGE: str = 'cluster'
+ARFF_STAGE: str = 'arff'
+FEAT_SELECT_STAGE: str = 'feat_select'
+
+# Every temporary file from utils.get_tmp_path has this in its name
+TMP_PATH_PART: str = '.tmp'
+
+
+def load_manifest(manifest_path: str) -> dict:
+    """Loads the completed stages of each iteration of a pipeline, keyed by the iteration"""
+
+    if not isfile(manifest_path):
+        return {}
+
+    with open(manifest_path) as f:
+        manifest: dict = load(f)
+
+    # JSON objects only have string keys
+    return {int(iteration): stages for iteration, stages in manifest.items()}
+
+
+def save_manifest(manifest: dict, manifest_path: str):
+    """Saves the manifest, replacing the previous version only once the new one is completely written"""
+
+    tmp_path: str = get_tmp_path(path=manifest_path)
+
+    with open(tmp_path, 'w') as f:
+        dump({str(iteration): stages for iteration, stages in sorted(manifest.items())}, f, indent=4)
+
+    replace(tmp_path, manifest_path)
+
+
+def record_stage(manifest: dict, manifest_path: str, iteration: int, stage: str, **results):
+    """Records that a stage of an iteration completed along with what the later stages need from its results"""
+
+    manifest.setdefault(iteration, {})[stage] = results
+    save_manifest(manifest=manifest, manifest_path=manifest_path)
+
+
+def get_clustering_scores(manifest: dict, iteration: int) -> list:
+    """Gets the rounded clustering scores of the iterations of a pipeline up to and including this one"""
+
+    return [
+        manifest[prev_iteration][CLUSTER_STAGE]['clustering_score'] for prev_iteration in sorted(manifest)
+        if prev_iteration <= iteration and CLUSTER_STAGE in manifest[prev_iteration]
+    ]
+
+
+def get_resume_point(manifest: dict) -> tuple:
+    """Gets the first iteration whose input data set was saved after the last one and the number of its features"""
+
+    first_iter: int = 0
+    n_kept_feats = None
+
+    for iteration in sorted(manifest):
+        feat_select: dict = manifest[iteration].get(FEAT_SELECT_STAGE)
+
+        # The in-process pipeline does not save the selected data set on every iteration
+        if feat_select is not None and feat_select['is_checkpoint']:
+            first_iter: int = iteration + 1
+            n_kept_feats: int = feat_select['n_kept_feats']
+
+    return first_iter, n_kept_feats
+
+
+def remove_tmp_files(data_dir: str):
+    """Removes the files of the iterations which were left partly written when the pipeline was stopped"""
+
+    for tmp_path in glob(join(data_dir, '*', '*{}*'.format(TMP_PATH_PART))):
+        remove(tmp_path)
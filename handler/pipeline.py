@@ -1,60 +1,196 @@
 """Uses all the handlers involved in clustering and feature selection in a pipeline to find the best clustering"""
 
-from os.path import join, isdir
-from os import mkdir, popen, listdir
+from os.path import join, isdir, isfile, splitext
+from os import mkdir, listdir
 from shutil import rmtree
-
-from handler.utils import DATA_DIR, CSV_EXTENSION
+from glob import glob
+from pandas import DataFrame, read_csv
+
+from handler.utils import (
+    DATA_DIR, PROFILE_PATH, MANIFEST_PATH, SCORE_PATH, WEKA_RANKER, EXACT_SCORE_MODE, DECAY_SCHEDULE, NO_REDUCTION,
+    get_data, get_n_kept_feats, get_storage_format
+)
+from handler.cluster import cluster_handler
+from handler.arff import arff_handler
+from handler.feat_select import feat_select_handler
+from handler.schedule import get_n_stale_iters
+from handler.profiling import profile_stage, run_command, set_profile_path, get_do_profile
+from handler.manifest import (
+    CLUSTER_STAGE, ARFF_STAGE, FEAT_SELECT_STAGE, TMP_PATH_PART, load_manifest, save_manifest, record_stage,
+    get_clustering_scores, get_resume_point, remove_tmp_files
+)
 
 ITER_DIR: str = 'iter'
 
 
 def pipeline_handler(
-    cohort: str, dataset: str, cluster_method: str, n_clusters: int, n_iterations: int, do_continue: bool
+    cohort: str, dataset: str, cluster_method: str, n_clusters: int, n_iterations: int, do_continue: bool,
+    do_in_process: bool = False, checkpoint_interval: int = 1, ranker: str = WEKA_RANKER,
+    do_sparse_arff: bool = False, do_cache_affinity: bool = False, score_mode: str = EXACT_SCORE_MODE,
+    score_sample_size: int = None, score_working_memory: int = None, do_warm_start: bool = False,
+    data: DataFrame = None, col_types: DataFrame = None, schedule: str = DECAY_SCHEDULE, target_n_kept_feats: int = 1,
+    patience: int = None, reduction: str = NO_REDUCTION, n_components: int = None
 ):
     """Main method of this module"""
 
+    # The state of the spectral clustering is only carried between iterations in memory
+    assert do_in_process or not do_warm_start
+
     data_dir: str = make_data_dirs(cohort=cohort, dataset=dataset, cluster_method=cluster_method, n_clusters=n_clusters)
-    first_iter, n_kept_feats = continue_after_last_iter(data_dir=data_dir, do_continue=do_continue)
+    manifest_path: str = MANIFEST_PATH.format(cohort, dataset, cluster_method, n_clusters)
+
+    # The files left partly written when the pipeline was stopped are not the results of any completed stage
+    if do_continue:
+        remove_tmp_files(data_dir=data_dir)
+
+    if do_continue and isfile(manifest_path):
+        # Continue from the stages the manifest records as completed, skipping those of the first iteration
+        manifest: dict = load_manifest(manifest_path=manifest_path)
+        first_iter, n_kept_feats = get_resume_point(manifest=manifest)
+        manifest: dict = {iteration: stages for iteration, stages in manifest.items() if iteration <= first_iter}
+    else:
+        # Pipelines run before the manifest existed continue from the data sets saved in the iteration directories
+        first_iter, n_kept_feats = continue_after_last_iter(data_dir=data_dir, do_continue=do_continue)
+
+        # Their clustering scores are read from the score files once and recorded in the manifest from then on
+        manifest: dict = {
+            iteration: {CLUSTER_STAGE: {'clustering_score': clustering_score}}
+            for iteration, clustering_score in load_clustering_scores(
+                cohort=cohort, dataset=dataset, cluster_method=cluster_method, n_clusters=n_clusters,
+                first_iter=first_iter
+            ).items()
+        }
+
+    save_manifest(manifest=manifest, manifest_path=manifest_path)
     n_iterations += first_iter
 
+    # The rounded scores of the previous iterations decide both when to stop early and the score-aware schedule
+    clustering_scores: list = get_clustering_scores(manifest=manifest, iteration=first_iter - 1)
+
+    # Each clustering starts from the eigenvectors and clustering of the previous iteration when warm starting
+    warm_start: dict = {} if do_warm_start else None
+
+    # When running in-process, the data set of the current iteration is kept in memory between the steps
+    if not do_in_process:
+        # Every step reads its input from disk so every iteration must be saved
+        checkpoint_interval: int = 1
+    elif data is None or first_iter > 0:
+        data, col_types, n_kept_feats = get_data(
+            cohort=cohort, dataset=dataset, cluster_method=cluster_method, n_clusters=n_clusters,
+            iteration=first_iter, n_kept_feats=n_kept_feats
+        )
+    else:
+        # The data set the pipeline starts from was already loaded
+        n_kept_feats: int = get_n_kept_feats(col_types=col_types, n_kept_feats=n_kept_feats)
+
     for iteration in range(first_iter, n_iterations):
         print('Iteration:', iteration)
 
         iter_dir: str = join(data_dir, ITER_DIR + str(iteration))
 
-        if isdir(iter_dir):
-            rmtree(iter_dir)
+        # Only the iteration the pipeline continues from can have stages that were completed already
+        completed_stages: dict = manifest.get(iteration, {})
+
+        if len(completed_stages) == 0:
+            if isdir(iter_dir):
+                rmtree(iter_dir)
 
-        mkdir(iter_dir)
+            mkdir(iter_dir)
+
+        # The resources used by the stages of this iteration are recorded with its results
+        set_profile_path(profile_path=PROFILE_PATH.format(cohort, dataset, cluster_method, n_clusters, iteration))
 
         # Cluster the data and get the cluster label which corresponds to each individual
-        command: str = get_command(
-            handler='cluster', cohort=cohort, dataset=dataset, cluster_method=cluster_method, n_clusters=n_clusters,
-            iteration=iteration, n_kept_feats=n_kept_feats
-        )
-        clustering_score: str = popen(command).read()
-        clustering_score: float = float(clustering_score)
+        if CLUSTER_STAGE in completed_stages:
+            # The clustering is loaded from disk by the stages which need it
+            clustering: DataFrame = None
+            clustering_score: float = completed_stages[CLUSTER_STAGE]['clustering_score']
+        else:
+            with profile_stage(stage='pipeline.cluster'):
+                if do_in_process:
+                    clustering, clustering_score = cluster_handler(
+                        cohort=cohort, dataset=dataset, cluster_method=cluster_method, n_clusters=n_clusters,
+                        iteration=iteration, n_kept_feats=n_kept_feats, data=data, col_types=col_types,
+                        do_cache_affinity=do_cache_affinity, score_mode=score_mode, score_sample_size=score_sample_size,
+                        score_working_memory=score_working_memory, warm_start=warm_start, reduction=reduction,
+                        n_components=n_components
+                    )
+                else:
+                    command: str = get_command(
+                        handler='cluster', cohort=cohort, dataset=dataset, cluster_method=cluster_method,
+                        n_clusters=n_clusters, iteration=iteration, n_kept_feats=n_kept_feats,
+                        do_cache_affinity=do_cache_affinity, score_mode=score_mode, score_sample_size=score_sample_size,
+                        score_working_memory=score_working_memory, reduction=reduction, n_components=n_components
+                    )
+                    # The subprocess is waited for so its CPU time and memory are counted in the profile of this stage
+                    clustering_score: float = float(run_command(command=command))
+
+            record_stage(
+                manifest=manifest, manifest_path=manifest_path, iteration=iteration, stage=CLUSTER_STAGE,
+                clustering_score=clustering_score
+            )
 
         print('Clustering Score:', clustering_score)
 
+        if do_warm_start and warm_start.get('n_cold_solver_iters') is not None:
+            print('Eigensolver Iterations Saved:', warm_start['n_saved_solver_iters'])
+
+        # End the pipeline if the score has not improved on its best for more iterations than the patience
+        clustering_scores.append(clustering_score)
+
+        if patience is not None and get_n_stale_iters(clustering_scores=clustering_scores) > patience:
+            print('Stopping Early With Best Score:', max(clustering_scores))
+            break
+
         # Create the ARFF using the features that remain on this iteration and the cluster labels previously computed
-        command: str = get_command(
-            handler='arff', cohort=cohort, dataset=dataset, cluster_method=cluster_method, n_clusters=n_clusters,
-            iteration=iteration, n_kept_feats=n_kept_feats, clustering_score=clustering_score
-        )
-        popen(command).read()
+        # The native ranker uses the data and cluster labels directly so it does not need the ARFF
+        if ranker == WEKA_RANKER and ARFF_STAGE not in completed_stages:
+            with profile_stage(stage='pipeline.arff'):
+                if do_in_process:
+                    arff_handler(
+                        cohort=cohort, dataset=dataset, cluster_method=cluster_method, n_clusters=n_clusters,
+                        iteration=iteration, n_kept_feats=n_kept_feats, clustering_score=clustering_score, data=data,
+                        col_types=col_types, clustering=clustering, do_sparse_arff=do_sparse_arff
+                    )
+                else:
+                    command: str = get_command(
+                        handler='arff', cohort=cohort, dataset=dataset, cluster_method=cluster_method,
+                        n_clusters=n_clusters, iteration=iteration, n_kept_feats=n_kept_feats,
+                        clustering_score=clustering_score, do_sparse_arff=do_sparse_arff
+                    )
+                    run_command(command=command)
+
+            record_stage(manifest=manifest, manifest_path=manifest_path, iteration=iteration, stage=ARFF_STAGE)
 
         # If we're on the very last feature, don't do this step
         if n_kept_feats is None or n_kept_feats > 1:
-            # Select the best portion of the features according to the cluster labels and a WEKA algorithm
+            # Select the best portion of the features according to the cluster labels and their information gain
             # The amount of remaining features will be smaller than the previous iteration
-            command: str = get_command(
-                handler='feat-select', cohort=cohort, dataset=dataset, cluster_method=cluster_method,
-                n_clusters=n_clusters, iteration=iteration, n_kept_feats=n_kept_feats
+            with profile_stage(stage='pipeline.feat_select'):
+                if do_in_process:
+                    # The selected data set is only saved to disk as a checkpoint for continuing the pipeline later
+                    do_checkpoint: bool = (iteration + 1) % checkpoint_interval == 0 or iteration + 1 == n_iterations
+                    data, col_types, n_kept_feats = feat_select_handler(
+                        cohort=cohort, dataset=dataset, cluster_method=cluster_method, n_clusters=n_clusters,
+                        iteration=iteration, n_kept_feats=n_kept_feats, data=data, col_types=col_types,
+                        do_checkpoint=do_checkpoint, ranker=ranker, clustering=clustering, schedule=schedule,
+                        target_n_kept_feats=target_n_kept_feats, clustering_scores=clustering_scores
+                    )
+                else:
+                    command: str = get_command(
+                        handler='feat-select', cohort=cohort, dataset=dataset, cluster_method=cluster_method,
+                        n_clusters=n_clusters, iteration=iteration, n_kept_feats=n_kept_feats, ranker=ranker,
+                        schedule=schedule, target_n_kept_feats=target_n_kept_feats
+                    )
+                    n_kept_feats: int = int(run_command(command=command))
+                    do_checkpoint: bool = True
+
+            # The pipeline can only continue from after this iteration if the selected data set was saved
+            record_stage(
+                manifest=manifest, manifest_path=manifest_path, iteration=iteration, stage=FEAT_SELECT_STAGE,
+                n_kept_feats=n_kept_feats, is_checkpoint=do_checkpoint
             )
-            n_kept_feats: str = popen(command).read()
-            n_kept_feats: int = int(n_kept_feats)
+
             print('Number Of Features Remaining:', n_kept_feats)
         else:
             # End the pipeline because there's only one feature left
@@ -63,12 +199,20 @@ def pipeline_handler(
 
 def get_command(
     handler: str, cohort: str, dataset: str, cluster_method: str, n_clusters: int, iteration: int,
-    n_kept_feats: int, clustering_score: float = None
+    n_kept_feats: int, clustering_score: float = None, ranker: str = WEKA_RANKER, do_sparse_arff: bool = False,
+    do_cache_affinity: bool = False,
+    score_mode: str = EXACT_SCORE_MODE, score_sample_size: int = None, score_working_memory: int = None,
+    schedule: str = DECAY_SCHEDULE, target_n_kept_feats: int = 1, reduction: str = NO_REDUCTION,
+    n_components: int = None
 ) -> str:
     """Constructs the terminal command for a handler"""
 
-    command: str = 'python3 main.py {} --cohort {} --dataset {} --cluster-method {} --n-clusters {} --iteration {}'
-    command: str = command.format(handler, cohort, dataset, cluster_method, n_clusters, iteration)
+    command: str = 'python3 main.py --storage-format {} {} --cohort {} --dataset {} --cluster-method {} --n-clusters {}'
+    command += ' --iteration {}'
+    command: str = command.format(get_storage_format(), handler, cohort, dataset, cluster_method, n_clusters, iteration)
+
+    if get_do_profile():
+        command: str = command.replace('main.py', 'main.py --profile', 1)
 
     if iteration == 0:
         assert n_kept_feats is None
@@ -79,6 +223,28 @@ def get_command(
     if handler == 'arff':
         command += ' --clustering-score {}'.format(clustering_score)
 
+        if do_sparse_arff:
+            command += ' --do-sparse-arff'
+
+    if handler == 'feat-select':
+        command += ' --ranker {} --schedule {}'.format(ranker, schedule)
+        command += ' --target-n-kept-feats {}'.format(target_n_kept_feats)
+
+    if handler == 'cluster':
+        command += ' --score-mode {}'.format(score_mode)
+
+        if score_sample_size is not None:
+            command += ' --score-sample-size {}'.format(score_sample_size)
+
+        if score_working_memory is not None:
+            command += ' --score-working-memory {}'.format(score_working_memory)
+
+        if do_cache_affinity:
+            command += ' --do-cache-affinity'
+
+        if reduction != NO_REDUCTION:
+            command += ' --reduction {} --n-components {}'.format(reduction, n_components)
+
     return command
 
 
@@ -112,24 +278,53 @@ def continue_after_last_iter(data_dir: str, do_continue: bool) -> int:
             iter_dirs[i] = iteration
 
         iter_dirs: list = sorted(iter_dirs)
-        first_iter: int = iter_dirs[-1]
 
-        if first_iter == 0:
-            n_kept_feats = None
-        else:
-            # Get the number of kept features from the column types CSV saved on the previous iteration
-            n_kept_feats = None
-            iter_dir: str = join(data_dir, ITER_DIR + str(first_iter - 1))
+        # Continue from the latest iteration whose input data set was saved, which may not be the latest iteration
+        # when the in-process pipeline only saves a checkpoint every few iterations
+        for first_iter in reversed(iter_dirs):
+            if first_iter == 0:
+                n_kept_feats = None
+                break
 
-            for path in listdir(iter_dir):
-                if col_types_path_part in path:
-                    n_kept_feats: str = path[len(col_types_path_part):-len(CSV_EXTENSION)]
-                    n_kept_feats: int = int(n_kept_feats)
-                    break
+            # Get the number of kept features from the column types CSV saved on the previous iteration
+            n_kept_feats = get_checkpoint_n_kept_feats(
+                iter_dir=join(data_dir, ITER_DIR + str(first_iter - 1)), col_types_path_part=col_types_path_part
+            )
 
-            assert n_kept_feats is not None
+            if n_kept_feats is not None:
+                break
 
         return first_iter, n_kept_feats
     else:
         # Start from the beginning
         return 0, None
+
+
+def get_checkpoint_n_kept_feats(iter_dir: str, col_types_path_part: str) -> int:
+    """Gets the number of kept features from the column types saved in an iteration, if they were saved"""
+
+    if not isdir(iter_dir):
+        return None
+
+    for path in listdir(iter_dir):
+        # A temporary file of column types that was being written when the pipeline was stopped is not a checkpoint
+        if path.startswith(col_types_path_part) and TMP_PATH_PART not in path:
+            n_kept_feats, _ = splitext(path[len(col_types_path_part):])
+            return int(n_kept_feats)
+
+    return None
+
+
+def load_clustering_scores(cohort: str, dataset: str, cluster_method: str, n_clusters: int, first_iter: int) -> dict:
+    """Loads the rounded clustering scores of the iterations before this one from the score files, by iteration"""
+
+    clustering_scores: dict = {}
+
+    for iteration in range(first_iter):
+        score_paths: list = glob(SCORE_PATH.format(cohort, dataset, cluster_method, n_clusters, iteration, '*'))
+
+        # Iterations clustered before scores were saved have no score
+        if len(score_paths) == 1:
+            clustering_scores[iteration] = round(float(read_csv(score_paths[0]).loc[0, 'score']), 2) + 0.0
+
+    return clustering_scores
@@ -0,0 +1,107 @@
+"""Runs the pipelines for several clustering methods and numbers of clusters in a pool of processes on one node"""
+
+from os.path import join, splitext
+from os import makedirs, remove, getpid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pandas import DataFrame
+from threadpoolctl import threadpool_limits
+
+from handler.pipeline import pipeline_handler
+from handler.profiling import set_do_profile, get_do_profile
+from handler.utils import (
+    CACHE_DIR, NO_REDUCTION, BASE_DATA_PATH, BASE_COL_TYPES_PATH, STORAGE_EXTENSIONS, MATRIX_STORAGE_FORMAT,
+    MATRIX_INDEX_EXTENSION, get_stored_path, get_storage_format, set_storage_format, read_data, read_matrix,
+    write_matrix
+)
+
+SWEEP_CACHE_NAME: str = 'sweep'
+
+
+def pipeline_sweep_handler(
+    cohort: str, dataset: str, cluster_methods: list, min_n_clusters: int, max_n_clusters: int, n_iterations: int,
+    do_continue: bool, n_workers: int, n_blas_threads: int, checkpoint_interval: int, ranker: str,
+    do_sparse_arff: bool, do_cache_affinity: bool, score_mode: str, score_sample_size: int,
+    score_working_memory: int, do_warm_start: bool, schedule: str, target_n_kept_feats: int, patience: int,
+    reduction: str = NO_REDUCTION, n_components: int = None
+):
+    """Main method of this module"""
+
+    assert 2 <= min_n_clusters <= max_n_clusters
+
+    # The arguments that are the same for every pipeline
+    pipeline_kwargs: dict = {
+        'cohort': cohort, 'dataset': dataset, 'n_iterations': n_iterations, 'do_continue': do_continue,
+        'checkpoint_interval': checkpoint_interval, 'ranker': ranker, 'do_sparse_arff': do_sparse_arff,
+        'do_cache_affinity': do_cache_affinity, 'score_mode': score_mode, 'score_sample_size': score_sample_size,
+        'score_working_memory': score_working_memory, 'do_warm_start': do_warm_start, 'schedule': schedule,
+        'target_n_kept_feats': target_n_kept_feats, 'patience': patience, 'reduction': reduction,
+        'n_components': n_components
+    }
+
+    # Every pipeline starts from the same data set which the workers map into memory instead of each loading a copy
+    shared_data_path, is_shared_copy = get_shared_data_path(cohort=cohort, dataset=dataset)
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=n_workers, initializer=init_worker,
+            initargs=(get_storage_format(), get_do_profile(), n_blas_threads)
+        ) as executor:
+            futures: dict = {}
+
+            for cluster_method in cluster_methods:
+                for n_clusters in range(min_n_clusters, max_n_clusters + 1):
+                    future = executor.submit(
+                        run_pipeline, shared_data_path=shared_data_path, cluster_method=cluster_method,
+                        n_clusters=n_clusters, **pipeline_kwargs
+                    )
+                    futures[future] = (cluster_method, n_clusters)
+
+            for future in as_completed(futures):
+                # Raise the error of a pipeline that failed in its worker
+                future.result()
+                cluster_method, n_clusters = futures[future]
+                print('Finished Pipeline:', cluster_method, n_clusters)
+    finally:
+        if is_shared_copy:
+            remove(shared_data_path)
+            remove(splitext(shared_data_path)[0] + MATRIX_INDEX_EXTENSION)
+
+
+def get_shared_data_path(cohort: str, dataset: str) -> tuple:
+    """Gets the path to the data set as a memory mappable matrix, saving a copy of it as one if it is not stored so"""
+
+    data_path: str = get_stored_path(data_path=BASE_DATA_PATH.format(cohort, dataset))
+
+    if data_path.endswith(STORAGE_EXTENSIONS[MATRIX_STORAGE_FORMAT]):
+        return data_path, False
+
+    shared_dir: str = join(CACHE_DIR, SWEEP_CACHE_NAME)
+    makedirs(shared_dir, exist_ok=True)
+    shared_data_path: str = join(
+        shared_dir, '{}-{}-{}{}'.format(cohort, dataset, getpid(), STORAGE_EXTENSIONS[MATRIX_STORAGE_FORMAT])
+    )
+    write_matrix(data=read_data(data_path=data_path), data_path=shared_data_path)
+
+    return shared_data_path, True
+
+
+def init_worker(storage_format: str, do_profile: bool, n_blas_threads: int):
+    """Sets up a worker process with the storage format, profiling and the number of threads for BLAS and OpenMP"""
+
+    set_storage_format(storage_format=storage_format)
+    set_do_profile(do_profile=do_profile)
+
+    if n_blas_threads is not None:
+        threadpool_limits(limits=n_blas_threads)
+
+
+def run_pipeline(shared_data_path: str, cohort: str, dataset: str, **pipeline_kwargs):
+    """Runs a pipeline in a worker process starting from the memory mapped data set"""
+
+    # The pages of the matrix are shared by the workers since they are only read
+    data: DataFrame = read_matrix(data_path=shared_data_path)
+    col_types: DataFrame = read_data(data_path=BASE_COL_TYPES_PATH.format(cohort, dataset))
+
+    pipeline_handler(
+        cohort=cohort, dataset=dataset, do_in_process=True, data=data, col_types=col_types, **pipeline_kwargs
+    )
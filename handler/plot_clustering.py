@@ -1,16 +1,31 @@
 """Creates a graphical visualization of a clustering"""
 
+from os.path import splitext, normpath
+from re import fullmatch
+from glob import glob
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pandas import DataFrame, read_csv, merge
-import matplotlib.pyplot as plt
+from numpy import ndarray, arange, zeros
+from matplotlib.figure import Figure
 
-from handler.utils import PTID_COL, CLUSTER_ID_COL
+from handler.encode import get_encoded_cols, get_vocab
+from handler.best_clustering import CLUSTERING_PATH_PATTERN
+from handler.utils import (
+    PTID_COL, CLUSTER_ID_COL, PCA_REDUCTION, read_data, get_col_types_path, get_storage_format, set_storage_format
+)
+
+PLOT_EXTENSION: str = '.png'
+ROW_COL: str = 'row'
+
+# Each process draws every one of its plots on the same figure, which is created without pyplot so it needs no display
+_figure: Figure = None
 
 
 def plot_clustering_handler(clustering_path: str, data_path: str):
     """Main method of this module"""
 
     # Attach the cluster IDs to the data
-    data: DataFrame = read_csv(data_path)
+    data: DataFrame = read_data(data_path=data_path)
     clustering: DataFrame = read_csv(clustering_path)
     data: DataFrame = merge(data, clustering, on=PTID_COL, how='inner')
 
@@ -24,10 +39,95 @@ def plot_clustering_handler(clustering_path: str, data_path: str):
     feats2: list = list(data[feat2])
 
     # Plot the data
-    fig = plt.figure()
-    ax = fig.add_subplot(111)
+    draw_clustering(
+        feats1=feats1, feats2=feats2, cluster_ids=cluster_ids, feat1=feat1, feat2=feat2,
+        plot_path='clustering-plot' + PLOT_EXTENSION
+    )
+
+
+def plot_clusterings_handler(clustering_paths: list, n_workers: int):
+    """Plots many clusterings of the pipelines in a pool of processes, each next to its clustering"""
+
+    # The paths may be glob patterns so many iterations can be plotted without listing each of them
+    clustering_paths: list = sorted({normpath(path) for pattern in clustering_paths for path in glob(pattern)})
+    assert len(clustering_paths) > 0
+
+    with ProcessPoolExecutor(
+        max_workers=n_workers, initializer=set_storage_format, initargs=(get_storage_format(),)
+    ) as executor:
+        futures: dict = {
+            executor.submit(plot_pipeline_clustering, clustering_path=path): path for path in clustering_paths
+        }
+
+        for future in as_completed(futures):
+            # The in-process pipeline does not save the data set of every iteration
+            try:
+                print('Saved Plot:', future.result())
+            except FileNotFoundError:
+                print('Skipped Plot Without A Saved Data Set:', futures[future])
+
+
+def plot_pipeline_clustering(clustering_path: str) -> str:
+    """Plots a clustering of a pipeline against its data set, projected to two dimensions if it has more features"""
+
+    match = fullmatch(CLUSTERING_PATH_PATTERN, clustering_path)
+    assert match is not None, 'Not the path to a clustering of a pipeline: {}'.format(clustering_path)
+    cohort, dataset, cluster_method, n_clusters, iteration, n_kept_feats, _ = match.groups()
+    iteration: int = int(iteration)
+
+    # The data set of the first iteration is the full data set, which has no number of kept features in its path
+    path_args: dict = {
+        'cohort': cohort, 'dataset': dataset, 'cluster_method': cluster_method, 'n_clusters': int(n_clusters),
+        'iteration': iteration, 'n_kept_feats': int(n_kept_feats) if iteration > 0 else None
+    }
+
+    # The clustering module imports scikit-learn, which only the workers that project a data set need to import
+    from handler.cluster import get_data_set
+
+    # The projection is cached so plotting a data set again, or for another number of clusters, reuses it
+    data, ptid_col, _ = get_data_set(**path_args, reduction=PCA_REDUCTION, n_components=2)
+
+    # The categories of the nominal features were cached when the data set was encoded
+    vocab: dict = get_vocab(data=None, nominal_cols=[], cohort=cohort, dataset=dataset)
+    encoded_cols: list = get_encoded_cols(col_types=read_data(data_path=get_col_types_path(**path_args)), vocab=vocab)
+
+    if data.shape[-1] == 1:
+        # The last iteration of a pipeline has a single feature, which is plotted along one axis
+        data: ndarray = data.repeat(2, axis=1)
+        data[:, 1] = zeros(data.shape[0])
+        feat1, feat2 = encoded_cols[0], ''
+    elif data.shape[-1] == len(encoded_cols):
+        # The data set is not projected when it has no more encoded columns than the projection has components
+        feat1, feat2 = encoded_cols[:2]
+    else:
+        feat1, feat2 = 'Component 1', 'Component 2'
+
+    # Line the cluster IDs up with the rows of the data
+    ptid_col[ROW_COL] = arange(ptid_col.shape[0])
+    clustering: DataFrame = merge(ptid_col, read_csv(clustering_path), on=PTID_COL, how='inner')
+    rows: ndarray = clustering[ROW_COL].to_numpy()
+    plot_path: str = splitext(clustering_path)[0] + PLOT_EXTENSION
+
+    draw_clustering(
+        feats1=data[rows, 0], feats2=data[rows, 1], cluster_ids=clustering[CLUSTER_ID_COL].to_numpy(), feat1=feat1,
+        feat2=feat2, plot_path=plot_path
+    )
+
+    return plot_path
+
+
+def draw_clustering(feats1, feats2, cluster_ids, feat1: str, feat2: str, plot_path: str):
+    """Draws a scatter plot of the individuals colored by their clusters and saves it"""
+
+    global _figure
+
+    if _figure is None:
+        _figure = Figure()
+
+    _figure.clear()
+    ax = _figure.add_subplot(111)
     scatter = ax.scatter(feats1, feats2, c=cluster_ids, s=50)
     ax.set_xlabel(feat1)
     ax.set_ylabel(feat2)
-    plt.colorbar(scatter)
-    plt.savefig('clustering-plot.png')
+    _figure.colorbar(scatter)
+    _figure.savefig(plot_path)
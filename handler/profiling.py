@@ -0,0 +1,129 @@
+"""Profiles the wall time, CPU time and peak memory of the stages of the handlers as JSON Lines"""
+
+from os.path import dirname, isdir, isfile
+from os import wait4, waitstatus_to_exitcode
+from sys import platform
+from subprocess import Popen, PIPE
+from time import perf_counter, process_time, time
+from json import dumps
+from resource import getrusage, RUSAGE_SELF, RUSAGE_CHILDREN
+from contextlib import contextmanager
+
+# Whether to profile, which is set once from the program arguments, and where the stages are currently recorded
+_do_profile: bool = False
+_profile_path = None
+
+# The peak resident set size of each stage that is being profiled so far, innermost last, in KiB
+_stage_peak_rss: list = []
+
+# Linux resets the peak resident set size of a process when this is written to its clear_refs
+CLEAR_REFS_PATH: str = '/proc/self/clear_refs'
+STATUS_PATH: str = '/proc/self/status'
+RESET_PEAK_RSS: str = '5'
+
+
+def set_do_profile(do_profile: bool):
+    """Sets whether to profile the stages of the handlers"""
+
+    global _do_profile
+    _do_profile = do_profile
+
+
+def get_do_profile() -> bool:
+    """Gets whether the stages of the handlers are profiled"""
+
+    return _do_profile
+
+
+def set_profile_path(profile_path: str):
+    """Sets the JSON Lines file that the stages are recorded in from now on, if profiling"""
+
+    global _profile_path
+    _profile_path = profile_path
+
+
+@contextmanager
+def profile_stage(stage: str):
+    """Records the resources used by the stage run in this context, doing nothing when not profiling"""
+
+    if not _do_profile or _profile_path is None:
+        yield
+        return
+
+    start_time: float = time()
+    start_wall_time: float = perf_counter()
+    start_cpu_time: float = get_cpu_time()
+
+    # The peak of this process is measured from the start of the stage, after the stages it is in are given theirs
+    reset_peak_rss()
+    _stage_peak_rss.append(0)
+
+    try:
+        yield
+    finally:
+        reset_peak_rss()
+        peak_rss: int = _stage_peak_rss.pop()
+
+    record: dict = {
+        'stage': stage, 'start_time': start_time, 'wall_time': perf_counter() - start_wall_time,
+        'cpu_time': get_cpu_time() - start_cpu_time, 'peak_rss_mb': peak_rss / 2 ** 10
+    }
+
+    # The iteration directory may have been removed by the stage
+    if isdir(dirname(_profile_path)):
+        with open(_profile_path, 'a') as f:
+            f.write(dumps(record) + '\n')
+
+
+def run_command(command: str) -> str:
+    """Runs a shell command and gets its output, counting its resources in the stages that are being profiled"""
+
+    process: Popen = Popen(command, shell=True, stdout=PIPE, text=True)
+    output: str = process.stdout.read()
+    process.stdout.close()
+
+    # Waiting for the command directly gets the peak of the command and its own subprocesses alone
+    _, status, usage = wait4(process.pid, 0)
+    process.returncode = waitstatus_to_exitcode(status)
+    record_peak_rss(peak_rss=to_kib(max_rss=usage.ru_maxrss))
+
+    return output
+
+
+def get_cpu_time() -> float:
+    """Gets the CPU time of this process and of its finished subprocesses so far, in seconds"""
+
+    # The handlers and WEKA that the pipeline runs as subprocesses use the CPU time of a pipeline stage
+    children = getrusage(RUSAGE_CHILDREN)
+
+    return process_time() + children.ru_utime + children.ru_stime
+
+
+def reset_peak_rss():
+    """Records the peak resident set size of this process since the last reset in the stages and resets the peak"""
+
+    if isfile(CLEAR_REFS_PATH):
+        with open(STATUS_PATH) as f:
+            peak_rss: int = next(int(line.split()[1]) for line in f if line.startswith('VmHWM:'))
+
+        record_peak_rss(peak_rss=peak_rss)
+
+        with open(CLEAR_REFS_PATH, 'w') as f:
+            f.write(RESET_PEAK_RSS)
+    else:
+        # Without Linux's proc file system the peak can not be reset, so it is the peak of the process so far
+        record_peak_rss(peak_rss=to_kib(max_rss=getrusage(RUSAGE_SELF).ru_maxrss))
+
+
+def record_peak_rss(peak_rss: int):
+    """Raises the peak resident set size of every stage that is being profiled to at least the given peak, in KiB"""
+
+    for i in range(len(_stage_peak_rss)):
+        _stage_peak_rss[i] = max(_stage_peak_rss[i], peak_rss)
+
+
+def to_kib(max_rss: int) -> int:
+    """Converts a maximum resident set size from the resource module to KiB"""
+
+    # The resident set size is in bytes on MacOS and in KiB otherwise
+    return max_rss // 2 ** 10 if platform == 'darwin' else max_rss
@@ -0,0 +1,53 @@
+"""Summarizes where the time and memory of the profiled pipelines of a cohort and data set went"""
+
+from glob import glob
+from re import fullmatch
+from pandas import DataFrame, read_json, concat
+
+from handler.utils import PROFILE_PATH
+
+# The clustering method, number of clusters and iteration of a profile
+PROFILE_PATH_PATTERN: str = r'clean-data/[^/]+/[^/]+/([^/]+)/k=(\d+)/iter(\d+)/profile\.jsonl'
+
+
+def report_handler(cohort: str, dataset: str, top_n: int):
+    """Main method of this module"""
+
+    profiles: list = []
+
+    for profile_path in sorted(glob(PROFILE_PATH.format(cohort, dataset, '*', '*', '*'))):
+        cluster_method, n_clusters, iteration = fullmatch(PROFILE_PATH_PATTERN, profile_path).groups()
+        profile: DataFrame = read_json(profile_path, lines=True)
+        profile['cluster_method'] = cluster_method
+        profile['n_clusters'] = int(n_clusters)
+        profile['iteration'] = int(iteration)
+        profiles.append(profile)
+
+    assert len(profiles) > 0, 'No profiles were found; run the pipeline with --profile'
+    profiles: DataFrame = concat(profiles, ignore_index=True)
+
+    # The pipeline stages contain the stages of the handlers so each level of stages is summarized separately
+    profiles['level'] = profiles['stage'].str.split('.').str[0] == 'pipeline'
+    hotspots: DataFrame = profiles.groupby(['level', 'stage']).agg(
+        n_runs=('wall_time', 'size'), total_wall_time=('wall_time', 'sum'), mean_wall_time=('wall_time', 'mean'),
+        max_wall_time=('wall_time', 'max'), total_cpu_time=('cpu_time', 'sum'), peak_rss_mb=('peak_rss_mb', 'max')
+    ).reset_index()
+    hotspots['share_of_wall_time'] = hotspots['total_wall_time'] / hotspots.groupby('level')[
+        'total_wall_time'
+    ].transform('sum')
+
+    for is_pipeline_level, title in ((True, 'PIPELINE STAGES:'), (False, 'HANDLER STAGES:')):
+        level_hotspots: DataFrame = hotspots[hotspots['level'] == is_pipeline_level]
+
+        if level_hotspots.shape[0] > 0:
+            print(title)
+            level_hotspots: DataFrame = level_hotspots.drop(columns='level')
+            print(level_hotspots.sort_values('total_wall_time', ascending=False).to_string(index=False))
+
+    # The slowest runs of the handler stages show which clusterings and iterations were the most expensive
+    print('SLOWEST STAGES:')
+    slowest: DataFrame = profiles[~profiles['level']].nlargest(top_n, 'wall_time')
+    slowest_cols: list = [
+        'stage', 'cluster_method', 'n_clusters', 'iteration', 'wall_time', 'cpu_time', 'peak_rss_mb'
+    ]
+    print(slowest[slowest_cols].to_string(index=False))
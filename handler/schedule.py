@@ -0,0 +1,65 @@
+"""Decides how many features to keep on the next iteration of the pipeline"""
+
+from handler.utils import DECAY_SCHEDULE, BISECT_SCHEDULE, SCORE_AWARE_SCHEDULE
+
+
+def get_next_n_kept_feats(
+    schedule: str, n_kept_feats: int, clustering_scores: list = None, target_n_kept_feats: int = 1
+) -> int:
+    """Gets the number of features to keep after this iteration, which is always fewer than are kept now"""
+
+    assert n_kept_feats > 1
+
+    if schedule == DECAY_SCHEDULE:
+        next_n_kept_feats: int = get_decayed_n_kept_feats(n_kept_feats=n_kept_feats)
+    elif schedule == BISECT_SCHEDULE:
+        # Halve the distance to the target and then take off one feature at a time
+        n_removed_feats: int = (n_kept_feats - target_n_kept_feats) // 2
+        next_n_kept_feats: int = n_kept_feats - n_removed_feats
+    else:
+        assert schedule == SCORE_AWARE_SCHEDULE
+        next_n_kept_feats: int = get_score_aware_n_kept_feats(
+            n_kept_feats=n_kept_feats, clustering_scores=clustering_scores
+        )
+
+    return max(min(next_n_kept_feats, n_kept_feats - 1), 1)
+
+
+def get_decayed_n_kept_feats(n_kept_feats: int) -> int:
+    """Gets the number of features to keep by shrinking the number of features faster the more there are"""
+
+    if n_kept_feats <= 100:
+        # If the number of remaining features is less than or equal to 100, just take off one feature at a time
+        n_kept_feats_decay: float = (n_kept_feats - 1) / n_kept_feats
+    elif n_kept_feats < 500:
+        # Decrease the number of features by a lower amount
+        n_kept_feats_decay: float = 0.95
+    else:
+        n_kept_feats_decay: float = 0.9
+
+    return int(n_kept_feats * n_kept_feats_decay)
+
+
+def get_score_aware_n_kept_feats(n_kept_feats: int, clustering_scores: list) -> int:
+    """Gets the number of features to keep by decaying while the score improves and taking larger steps otherwise"""
+
+    n_removed_feats: int = n_kept_feats - get_decayed_n_kept_feats(n_kept_feats=n_kept_feats)
+
+    # A feature selection run on its own may not have the scores of a pipeline
+    if clustering_scores is None or len(clustering_scores) == 0:
+        n_stale_iters: int = 0
+    else:
+        n_stale_iters: int = get_n_stale_iters(clustering_scores=clustering_scores)
+
+    # Double the step for every iteration since the best score, removing at most half of the features
+    n_removed_feats: int = min(n_removed_feats * 2 ** n_stale_iters, n_kept_feats // 2)
+
+    return n_kept_feats - max(n_removed_feats, 1)
+
+
+def get_n_stale_iters(clustering_scores: list) -> int:
+    """Counts the iterations since the first iteration with the best clustering score"""
+
+    best_iter: int = max(range(len(clustering_scores)), key=lambda iteration: clustering_scores[iteration])
+
+    return len(clustering_scores) - 1 - best_iter
@@ -0,0 +1,111 @@
+"""Scores clusterings with the silhouette coefficient, either exactly or approximately for large data sets"""
+
+from numpy import ndarray, zeros, unique, arange, sqrt, inf, where, maximum, bincount
+from numpy.random import RandomState
+from sklearn import config_context
+from sklearn.metrics import silhouette_score, pairwise_distances_chunked
+from sklearn.metrics.pairwise import euclidean_distances
+
+from handler.utils import EXACT_SCORE_MODE, SUBSAMPLE_SCORE_MODE, SIMPLIFIED_SCORE_MODE
+
+# The z score of a 95% confidence interval
+Z_SCORE: float = 1.96
+
+
+def score_clustering(
+    data: ndarray, labels: ndarray, score_mode: str, score_sample_size: int, score_working_memory: int
+) -> tuple:
+    """Computes the silhouette score of a clustering and the bounds of its confidence interval"""
+
+    if score_mode == EXACT_SCORE_MODE:
+        # The pairwise distances are computed in chunks which fit in the working memory, given in MiB
+        with config_context(working_memory=score_working_memory):
+            score: float = silhouette_score(data, labels)
+
+        return score, score, score
+    elif score_mode == SUBSAMPLE_SCORE_MODE:
+        return get_subsample_score(
+            data=data, labels=labels, sample_size=score_sample_size, working_memory=score_working_memory
+        )
+    else:
+        assert score_mode == SIMPLIFIED_SCORE_MODE
+        score: float = get_simplified_score(data=data, labels=labels)
+
+        return score, score, score
+
+
+def get_subsample_score(data: ndarray, labels: ndarray, sample_size: int, working_memory: int) -> tuple:
+    """Estimates the silhouette score from the exact silhouettes of a random sample of the data"""
+
+    n_samples: int = data.shape[0]
+
+    if sample_size >= n_samples:
+        sample_idxs: ndarray = arange(n_samples)
+    else:
+        sample_idxs: ndarray = RandomState(0).choice(n_samples, size=sample_size, replace=False)
+
+    _, labels = unique(labels, return_inverse=True)
+    n_clusters: int = labels.max() + 1
+    cluster_sizes: ndarray = bincount(labels, minlength=n_clusters)
+    sample_labels: ndarray = labels[sample_idxs]
+
+    # Sum the distances from each sampled individual to every individual in each cluster, a chunk at a time
+    one_hot_labels: ndarray = zeros((n_samples, n_clusters))
+    one_hot_labels[arange(n_samples), labels] = 1.0
+    chunks = pairwise_distances_chunked(
+        data[sample_idxs], data, reduce_func=lambda chunk, _: chunk @ one_hot_labels, working_memory=working_memory
+    )
+    cluster_dists: ndarray = zeros((len(sample_idxs), n_clusters))
+    start: int = 0
+
+    for chunk in chunks:
+        cluster_dists[start:start + chunk.shape[0]] = chunk
+        start += chunk.shape[0]
+
+    # The mean distance to the other members of the individual's own cluster excludes the individual itself
+    own_cluster: tuple = (arange(len(sample_idxs)), sample_labels)
+    own_sizes: ndarray = cluster_sizes[sample_labels] - 1
+    intra_dists: ndarray = cluster_dists[own_cluster] / maximum(own_sizes, 1)
+    cluster_dists: ndarray = cluster_dists / cluster_sizes
+    cluster_dists[own_cluster] = inf
+    inter_dists: ndarray = cluster_dists.min(axis=1)
+
+    silhouettes: ndarray = get_silhouettes(intra_dists=intra_dists, inter_dists=inter_dists)
+
+    # Individuals alone in their cluster have a silhouette of 0
+    silhouettes: ndarray = where(own_sizes > 0, silhouettes, 0.0)
+    score: float = silhouettes.mean()
+
+    # Sampling without replacement from a finite population shrinks the standard error
+    finite_population_correction: float = sqrt((n_samples - len(sample_idxs)) / max(n_samples - 1, 1))
+    std_err: float = silhouettes.std(ddof=1) / sqrt(len(sample_idxs)) * finite_population_correction
+    margin: float = Z_SCORE * std_err
+
+    return score, score - margin, score + margin
+
+
+def get_simplified_score(data: ndarray, labels: ndarray) -> float:
+    """Computes the simplified silhouette score which uses the distances to the cluster centroids"""
+
+    _, labels = unique(labels, return_inverse=True)
+    n_clusters: int = labels.max() + 1
+    centroids: ndarray = zeros((n_clusters, data.shape[-1]))
+
+    for cluster_id in range(n_clusters):
+        centroids[cluster_id] = data[labels == cluster_id].mean(axis=0)
+
+    centroid_dists: ndarray = euclidean_distances(data, centroids)
+    own_cluster: tuple = (arange(data.shape[0]), labels)
+    intra_dists: ndarray = centroid_dists[own_cluster]
+    centroid_dists[own_cluster] = inf
+    inter_dists: ndarray = centroid_dists.min(axis=1)
+
+    return get_silhouettes(intra_dists=intra_dists, inter_dists=inter_dists).mean()
+
+
+def get_silhouettes(intra_dists: ndarray, inter_dists: ndarray) -> ndarray:
+    """Computes the silhouette of each individual from its intra-cluster and nearest inter-cluster distances"""
+
+    denominators: ndarray = maximum(intra_dists, inter_dists)
+
+    return where(denominators > 0, (inter_dists - intra_dists) / where(denominators > 0, denominators, 1.0), 0.0)
@@ -0,0 +1,87 @@
+"""Generates a synthetic cohort shaped like the prepared data, with clusters of individuals built into it"""
+
+from os import makedirs
+from numpy import ndarray, arange, array, sort
+from numpy.random import default_rng, Generator
+from pandas import DataFrame
+
+from handler.utils import (
+    PREPARED_DATA_DIR, BASE_DATA_PATH, BASE_COL_TYPES_PATH, PTID_COL, NUMERIC_COL_TYPE, NOMINAL_COL_TYPE, write_data
+)
+
+# The share of the features in each data set that is combined
+PHENOTYPES_SHARE: float = 0.1
+MRI_SHARE: float = 0.2
+
+# The share of the individuals missing from the expression and MRI data sets, which the combine drops
+MISSING_PTIDS_SHARE: float = 0.05
+
+# Nominal features have this many categories, which are normalized like the rest of the prepared data
+N_CATEGORIES: int = 3
+
+
+def synthetic_data_handler(
+    cohort: str, n_ptids: int, n_feats: int, nominal_ratio: float, n_true_clusters: int, informative_ratio: float,
+    cluster_separation: float, seed: int
+):
+    """Main method of this module"""
+
+    makedirs('{}/{}'.format(PREPARED_DATA_DIR, cohort), exist_ok=True)
+    rng: Generator = default_rng(seed)
+    ptids: ndarray = array(['SYN{:06d}'.format(ptid) for ptid in range(n_ptids)])
+    true_clusters: ndarray = rng.integers(n_true_clusters, size=n_ptids)
+
+    n_phenotype_feats: int = max(int(n_feats * PHENOTYPES_SHARE), 1)
+    n_mri_feats: int = max(int(n_feats * MRI_SHARE), 1)
+    n_expression_feats: int = max(n_feats - n_phenotype_feats - n_mri_feats, 1)
+
+    for data_name, n_data_feats, nominal_data_ratio, n_missing_ptids in (
+        ('phenotypes', n_phenotype_feats, nominal_ratio, 0),
+        ('expression', n_expression_feats, 0.0, int(n_ptids * MISSING_PTIDS_SHARE)),
+        ('mri', n_mri_feats, 0.0, int(n_ptids * MISSING_PTIDS_SHARE))
+    ):
+        # Only the phenotypes have nominal features, like the real data sets
+        ptid_idxs: ndarray = sort(rng.permutation(n_ptids)[n_missing_ptids:])
+        data, col_types = get_synthetic_data(
+            rng=rng, data_name=data_name, ptids=ptids[ptid_idxs], true_clusters=true_clusters[ptid_idxs],
+            n_true_clusters=n_true_clusters, n_feats=n_data_feats, nominal_ratio=nominal_data_ratio,
+            informative_ratio=informative_ratio, cluster_separation=cluster_separation
+        )
+        write_data(data=data, data_path=BASE_DATA_PATH.format(cohort, data_name))
+        write_data(data=col_types, data_path=BASE_COL_TYPES_PATH.format(cohort, data_name))
+
+
+def get_synthetic_data(
+    rng: Generator, data_name: str, ptids: ndarray, true_clusters: ndarray, n_true_clusters: int, n_feats: int,
+    nominal_ratio: float, informative_ratio: float, cluster_separation: float
+) -> tuple:
+    """Generates a normalized data set and its column types, where the informative features separate the clusters"""
+
+    n_ptids: int = len(ptids)
+    feats: list = ['{}_{}'.format(data_name, feat) for feat in range(n_feats)]
+    is_nominal: ndarray = rng.random(n_feats) < nominal_ratio
+    is_informative: ndarray = rng.random(n_feats) < informative_ratio
+
+    # Informative numeric features are shifted by the center of each individual's cluster
+    matrix: ndarray = rng.standard_normal((n_ptids, n_feats))
+    centers: ndarray = rng.standard_normal((n_true_clusters, n_feats)) * cluster_separation
+    matrix[:, is_informative] += centers[true_clusters][:, is_informative]
+
+    # Nominal features are binned, so the informative ones are more likely to take some categories in each cluster
+    bin_edges: ndarray = arange(1, N_CATEGORIES) / N_CATEGORIES
+    ranks: ndarray = matrix[:, is_nominal].argsort(axis=0).argsort(axis=0) / n_ptids
+    matrix[:, is_nominal] = (ranks[:, :, None] >= bin_edges).sum(axis=-1)
+
+    # The prepared data sets are normalized to be between 0 and 1
+    mins: ndarray = matrix.min(axis=0)
+    ranges: ndarray = matrix.max(axis=0) - mins
+    ranges[ranges == 0] = 1.0
+    matrix: ndarray = (matrix - mins) / ranges
+
+    data: DataFrame = DataFrame(matrix, columns=feats)
+    data.insert(0, PTID_COL, ptids)
+    col_types: DataFrame = DataFrame(
+        [[NOMINAL_COL_TYPE if feat_is_nominal else NUMERIC_COL_TYPE for feat_is_nominal in is_nominal]], columns=feats
+    )
+
+    return data, col_types
@@ -1,20 +1,58 @@
 """Contains functionality data shared between handlers"""
 
-from pandas import DataFrame, read_csv
+from os.path import splitext, isfile, getmtime
+from os import replace, getpid
+from pandas import DataFrame, read_csv, read_parquet, read_feather
+from numpy import ndarray, load, save, savez, array, arange, float32
+from numpy.lib.format import open_memmap
 
 PTID_COL: str = 'PTID'
+PREPARED_DATA_DIR: str = 'prepared-data'
 DATA_DIR: str = 'clean-data'
+CACHE_DIR: str = 'clean-data/cache'
+CATALOG_PATH: str = 'clean-data/catalog.sqlite'
 CSV_EXTENSION: str = '.csv'
 CLUSTERING_PATH: str = 'clean-data/{}/{}/{}/k={}/iter{}/clustering-{}-{}.csv'
 ARFF_PATH: str = 'clean-data/{}/{}/{}/k={}/iter{}/data-{}.arff'
 DATA_PATH: str = 'clean-data/{}/{}/{}/k={}/iter{}/data-{}.csv'
+SCORE_PATH: str = 'clean-data/{}/{}/{}/k={}/iter{}/score-{}.csv'
 COL_TYPES_PATH: str = 'clean-data/{}/{}/{}/k={}/iter{}/col-types-{}.csv'
+PROFILE_PATH: str = 'clean-data/{}/{}/{}/k={}/iter{}/profile.jsonl'
+MANIFEST_PATH: str = 'clean-data/{}/{}/{}/k={}/manifest.json'
 BASE_DATA_PATH: str = 'prepared-data/{}/{}.csv'
 BASE_COL_TYPES_PATH: str = 'prepared-data/{}/{}-col-types.csv'
+BASE_VOCAB_PATH: str = 'prepared-data/{}/{}-vocab.pkl'
 DEBUG_IDENTIFIER: str = 'dbg-'
 CLUSTER_ID_COL: str = 'CLUSTER_ID'
 NUMERIC_COL_TYPE: str = 'numeric'
 NOMINAL_COL_TYPE: str = 'nominal'
+WEKA_RANKER: str = 'weka'
+NATIVE_RANKER: str = 'native'
+EXACT_SCORE_MODE: str = 'exact'
+SUBSAMPLE_SCORE_MODE: str = 'subsample'
+SIMPLIFIED_SCORE_MODE: str = 'simplified'
+NYSTROM_CLUSTER_METHOD: str = 'nystrom'
+MINI_BATCH_CLUSTER_METHOD: str = 'minibatch_kmeans'
+SCALABLE_CLUSTER_METHODS: tuple = (NYSTROM_CLUSTER_METHOD, MINI_BATCH_CLUSTER_METHOD)
+NO_REDUCTION: str = 'none'
+PCA_REDUCTION: str = 'pca'
+RANDOM_PROJECTION_REDUCTION: str = 'random-projection'
+DECAY_SCHEDULE: str = 'decay'
+BISECT_SCHEDULE: str = 'bisect'
+SCORE_AWARE_SCHEDULE: str = 'score-aware'
+CSV_STORAGE_FORMAT: str = 'csv'
+PARQUET_STORAGE_FORMAT: str = 'parquet'
+FEATHER_STORAGE_FORMAT: str = 'feather'
+MATRIX_STORAGE_FORMAT: str = 'matrix'
+STORAGE_EXTENSIONS: dict = {
+    CSV_STORAGE_FORMAT: CSV_EXTENSION, PARQUET_STORAGE_FORMAT: '.parquet', FEATHER_STORAGE_FORMAT: '.feather',
+    MATRIX_STORAGE_FORMAT: '.npy'
+}
+MATRIX_INDEX_EXTENSION: str = '.index.npz'
+MATRIX_COL_BLOCK_SIZE: int = 10000
+
+# The format in which data sets and column types are saved, which is set once from the program arguments
+_storage_format: str = CSV_STORAGE_FORMAT
 
 
 def _get_path(
@@ -56,7 +94,8 @@ def get_col_types_path(
 
 
 def get_data(
-        cohort: str, dataset: str, cluster_method: str, n_clusters: int, iteration: int, n_kept_feats: int
+        cohort: str, dataset: str, cluster_method: str, n_clusters: int, iteration: int, n_kept_feats: int,
+        feats: list = None
 ) -> tuple:
     """Gets a data set, it's column types and n_kept_feats if at the beginning of the clustering pipeline"""
 
@@ -64,20 +103,27 @@ def get_data(
         cohort=cohort, dataset=dataset, cluster_method=cluster_method, n_clusters=n_clusters, iteration=iteration,
         n_kept_feats=n_kept_feats
     )
-    data: DataFrame = read_csv(data_path)
+    data: DataFrame = read_data(data_path=data_path, cols=None if feats is None else [PTID_COL] + feats)
 
     col_types_path: str = get_col_types_path(
         cohort=cohort, dataset=dataset, cluster_method=cluster_method, n_clusters=n_clusters, iteration=iteration,
         n_kept_feats=n_kept_feats
     )
-    col_types: DataFrame = read_csv(col_types_path)
+    col_types: DataFrame = read_data(data_path=col_types_path)
+    n_kept_feats: int = get_n_kept_feats(col_types=col_types, n_kept_feats=n_kept_feats)
+
+    return data, col_types, n_kept_feats
+
+
+def get_n_kept_feats(col_types: DataFrame, n_kept_feats: int) -> int:
+    """Gets n_kept_feats from the column types if at the beginning of the clustering pipeline, otherwise checks it"""
 
     if n_kept_feats is None:
         n_kept_feats: int = col_types.shape[-1]
     else:
         assert n_kept_feats == col_types.shape[-1]
 
-    return data, col_types, n_kept_feats
+    return n_kept_feats
 
 
 def get_del_ptid_col(data_set: DataFrame) -> DataFrame:
@@ -87,3 +133,221 @@ def get_del_ptid_col(data_set: DataFrame) -> DataFrame:
     del data_set[PTID_COL]
 
     return col
+
+
+def set_storage_format(storage_format: str):
+    """Sets the format in which data sets and column types are saved"""
+
+    global _storage_format
+
+    assert storage_format in STORAGE_EXTENSIONS
+    _storage_format = storage_format
+
+
+def get_storage_format() -> str:
+    """Gets the format in which data sets and column types are saved"""
+
+    return _storage_format
+
+
+def get_stored_path(data_path: str) -> str:
+    """Gets the path to the latest copy of a data set in any storage format, preferring the current format in a tie"""
+
+    base_path, _ = splitext(data_path)
+    storage_formats: list = [_storage_format] + [f for f in STORAGE_EXTENSIONS if f != _storage_format]
+    stored_paths: list = [
+        base_path + STORAGE_EXTENSIONS[storage_format] for storage_format in storage_formats
+        if isfile(base_path + STORAGE_EXTENSIONS[storage_format])
+    ]
+
+    if len(stored_paths) == 0:
+        raise FileNotFoundError('No data set is stored at {} in any storage format'.format(base_path))
+
+    # An older copy in another format, such as a CSV from before a streamed combine, must not shadow the latest copy
+    return max(stored_paths, key=getmtime)
+
+
+def read_data(data_path: str, cols: list = None) -> DataFrame:
+    """Reads a data set or column types, only reading the given columns if the columns are specified"""
+
+    data_path: str = get_stored_path(data_path=data_path)
+    _, extension = splitext(data_path)
+
+    if extension == STORAGE_EXTENSIONS[MATRIX_STORAGE_FORMAT]:
+        return read_matrix(data_path=data_path, cols=cols)
+    elif extension == STORAGE_EXTENSIONS[PARQUET_STORAGE_FORMAT]:
+        return read_parquet(data_path, columns=cols)
+    elif extension == STORAGE_EXTENSIONS[FEATHER_STORAGE_FORMAT]:
+        return read_feather(data_path, columns=cols)
+    else:
+        data: DataFrame = read_csv(data_path, usecols=cols)
+
+        # Unlike the columnar formats, the CSV reader keeps the columns in the order of the file
+        return data if cols is None else data[cols]
+
+
+def read_cols(data_path: str) -> list:
+    """Reads the names of the columns of a data set or column types without reading any of their rows"""
+
+    data_path: str = get_stored_path(data_path=data_path)
+    base_path, extension = splitext(data_path)
+
+    if extension == STORAGE_EXTENSIONS[MATRIX_STORAGE_FORMAT]:
+        index = load(base_path + MATRIX_INDEX_EXTENSION)
+
+        if 'base_data_path' in index:
+            # The features of the data set are in the order of the full matrix they are a subset of
+            feat_idxs: ndarray = load(data_path)
+            index = load(splitext(str(index['base_data_path']))[0] + MATRIX_INDEX_EXTENSION)
+            return [PTID_COL] + index['cols'][feat_idxs].tolist()
+
+        return [PTID_COL] + index['cols'].tolist()
+    elif extension == STORAGE_EXTENSIONS[PARQUET_STORAGE_FORMAT]:
+        # The columns are read from the schema at the end of the file, which pandas does not expose
+        from pyarrow.parquet import read_schema
+        return read_schema(data_path).names
+    elif extension == STORAGE_EXTENSIONS[FEATHER_STORAGE_FORMAT]:
+        from pyarrow.ipc import open_file
+        return open_file(data_path).schema.names
+    else:
+        return list(read_csv(data_path, nrows=0))
+
+
+def write_data(data: DataFrame, data_path: str, storage_format: str = None, base_data_path: str = None) -> str:
+    """Writes a data set or column types in the current storage format and returns the path it was written to"""
+
+    if storage_format is None:
+        storage_format: str = _storage_format
+
+    if storage_format == MATRIX_STORAGE_FORMAT and PTID_COL not in data:
+        # Column types are not numeric so they are written as a CSV instead of a matrix
+        storage_format: str = CSV_STORAGE_FORMAT
+
+    base_path, _ = splitext(data_path)
+    data_path: str = base_path + STORAGE_EXTENSIONS[storage_format]
+
+    # The data set only appears at its path once it is completely written, in case the job is killed while writing
+    tmp_path: str = get_tmp_path(path=data_path)
+
+    if storage_format == MATRIX_STORAGE_FORMAT:
+        write_matrix(data=data, data_path=tmp_path, base_data_path=base_data_path)
+
+        # The index is moved into place first since the matrix is what is looked for when reading the data set
+        replace(splitext(tmp_path)[0] + MATRIX_INDEX_EXTENSION, base_path + MATRIX_INDEX_EXTENSION)
+    elif storage_format == PARQUET_STORAGE_FORMAT:
+        data.to_parquet(tmp_path, index=False)
+    elif storage_format == FEATHER_STORAGE_FORMAT:
+        data.reset_index(drop=True).to_feather(tmp_path)
+    else:
+        data.to_csv(tmp_path, index=False)
+
+    replace(tmp_path, data_path)
+
+    return data_path
+
+
+def write_csv(data: DataFrame, csv_path: str):
+    """Writes a data frame to a CSV which only appears at its path once it is completely written"""
+
+    tmp_path: str = get_tmp_path(path=csv_path)
+    data.to_csv(tmp_path, index=False)
+    replace(tmp_path, csv_path)
+
+
+def get_tmp_path(path: str) -> str:
+    """Gets a path, unique to this process, to write a file to before moving it into place"""
+
+    base_path, extension = splitext(path)
+
+    return '{}.{}.tmp{}'.format(base_path, getpid(), extension)
+
+
+def read_matrix(data_path: str, cols: list = None) -> DataFrame:
+    """Reads a data set from a memory mapped matrix, viewing the features in the matrix if they are contiguous"""
+
+    base_path, _ = splitext(data_path)
+    index = load(base_path + MATRIX_INDEX_EXTENSION)
+    feat_idxs = None
+
+    if 'base_data_path' in index:
+        # The data set is a subset of the features of a data set which is stored as a full matrix
+        feat_idxs: ndarray = load(data_path)
+        data_path: str = str(index['base_data_path'])
+        base_path, _ = splitext(data_path)
+        index = load(base_path + MATRIX_INDEX_EXTENSION)
+
+    all_feats: ndarray = index['cols']
+    ptids: ndarray = index['ptids']
+    matrix: ndarray = load(data_path, mmap_mode='r')
+
+    if feat_idxs is None:
+        feat_idxs: ndarray = arange(len(all_feats))
+
+    if cols is not None:
+        feat_to_idx: dict = dict(zip(all_feats[feat_idxs], feat_idxs))
+        feat_idxs: ndarray = array([feat_to_idx[col] for col in cols if col != PTID_COL], dtype=int)
+
+    if len(feat_idxs) == 0 or (feat_idxs == arange(feat_idxs[0], feat_idxs[0] + len(feat_idxs))).all():
+        # Contiguous features are a slice of the matrix, so the data frame is a single block viewing the memory map
+        start: int = feat_idxs[0] if len(feat_idxs) > 0 else 0
+        matrix: ndarray = matrix[:, start:start + len(feat_idxs)]
+    else:
+        # Scattered features can not be viewed as one block so only they are copied out of the matrix, once
+        matrix: ndarray = matrix[:, feat_idxs]
+
+    data: DataFrame = DataFrame(matrix, columns=all_feats[feat_idxs], copy=False)
+
+    # The patient IDs are inserted where they were asked for, rather than selecting the columns again which would copy
+    if cols is None:
+        data.insert(0, PTID_COL, ptids)
+    elif PTID_COL in cols:
+        data.insert(cols.index(PTID_COL), PTID_COL, ptids)
+
+    return data
+
+
+def write_matrix(data: DataFrame, data_path: str, base_data_path: str = None):
+    """Writes a data set as a memory mappable float32 matrix, or as feature indices of a data set that is one"""
+
+    base_path, _ = splitext(data_path)
+    feats: list = [col for col in data.columns if col != PTID_COL]
+
+    if base_data_path is not None:
+        base_data_path: str = get_stored_path(data_path=base_data_path)
+
+    if base_data_path is not None and base_data_path.endswith(STORAGE_EXTENSIONS[MATRIX_STORAGE_FORMAT]):
+        # Only save which features of the full matrix are in the data set, in the order of the full matrix
+        base_index = load(splitext(base_data_path)[0] + MATRIX_INDEX_EXTENSION)
+        feat_to_idx: dict = {feat: idx for idx, feat in enumerate(base_index['cols'])}
+        feat_idxs: ndarray = array(sorted(feat_to_idx[feat] for feat in feats), dtype=int)
+        save(data_path, feat_idxs)
+        savez(base_path + MATRIX_INDEX_EXTENSION, base_data_path=array(base_data_path))
+        return
+
+    # Store the features column by column so a feature or a block of features can be viewed without copying
+    matrix: ndarray = open_matrix(data_path=data_path, n_rows=data.shape[0], n_cols=len(feats))
+
+    for start in range(0, len(feats), MATRIX_COL_BLOCK_SIZE):
+        block_feats: list = feats[start:start + MATRIX_COL_BLOCK_SIZE]
+        matrix[:, start:start + len(block_feats)] = data[block_feats].to_numpy(dtype=float32)
+
+    matrix.flush()
+    write_matrix_index(data_path=data_path, ptids=data[PTID_COL].to_numpy(), feats=feats)
+
+
+def open_matrix(data_path: str, n_rows: int, n_cols: int) -> ndarray:
+    """Creates a memory mapped float32 matrix which stores its columns contiguously"""
+
+    return open_memmap(data_path, mode='w+', dtype=float32, shape=(n_rows, n_cols), fortran_order=True)
+
+
+def write_matrix_index(data_path: str, ptids: ndarray, feats: list):
+    """Saves the patient IDs and feature names of the rows and columns of a memory mapped matrix"""
+
+    base_path, _ = splitext(data_path)
+
+    # The index is saved without pickling so the patient IDs are saved as strings unless they are numbers
+    if ptids.dtype == object:
+        ptids: ndarray = ptids.astype(str)
+
+    savez(base_path + MATRIX_INDEX_EXTENSION, ptids=ptids, cols=array(feats, dtype=str))
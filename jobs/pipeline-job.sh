@@ -3,11 +3,13 @@
 SCRIPT_NAME="pipeline"
 COHORT="adni"
 DATASET="phenotypes"
-CLUSTER_METHOD="nearest_neighbors"
+CLUSTER_METHOD="nearest_neighbors" # "nystrom" or "minibatch_kmeans" for data sets whose affinity matrix does not fit
 N_CLUSTERS=$1
 N_ITERATIONS="200"
 DO_DEBUG="" # "" is false and "--do-debug" is true
 DO_CONTINUE="" # "" is false and "--do-continue" is true
+DO_IN_PROCESS="--do-in-process" # "" is false and "--do-in-process" is true
+DO_CACHE_AFFINITY="--do-cache-affinity" # "" is false and "--do-cache-affinity" is true
 JOB_NAME=${SCRIPT_NAME}-${COHORT}-${DATASET}-${CLUSTER_METHOD}-${N_CLUSTERS}
 
 sbatch -J $JOB_NAME \
@@ -17,4 +19,4 @@ sbatch -J $JOB_NAME \
     --mem=32G \
     -o ${JOB_NAME}.out \
     -e ${JOB_NAME}.err \
-    jobs/${SCRIPT_NAME}.sh ${COHORT} ${DATASET} ${CLUSTER_METHOD} ${N_CLUSTERS} ${N_ITERATIONS} ${DO_DEBUG} ${DO_CONTINUE}
+    jobs/${SCRIPT_NAME}.sh ${COHORT} ${DATASET} ${CLUSTER_METHOD} ${N_CLUSTERS} ${N_ITERATIONS} ${DO_DEBUG} ${DO_CONTINUE} ${DO_IN_PROCESS} ${DO_CACHE_AFFINITY}
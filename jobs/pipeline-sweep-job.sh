@@ -0,0 +1,22 @@
+#!/bin/bash
+
+SCRIPT_NAME="pipeline-sweep"
+COHORT="adni"
+DATASET="phenotypes"
+N_ITERATIONS="200"
+N_WORKERS="19"
+N_BLAS_THREADS="1"
+DO_DEBUG="" # "" is false and "--do-debug" is true
+DO_CONTINUE="" # "" is false and "--do-continue" is true
+DO_CACHE_AFFINITY="--do-cache-affinity" # "" is false and "--do-cache-affinity" is true
+JOB_NAME=${SCRIPT_NAME}-${COHORT}-${DATASET}
+
+sbatch -J $JOB_NAME \
+    --time=00-12:00:00 \
+    --nodes=1 \
+    --ntasks=1 \
+    --cpus-per-task=$((N_WORKERS * N_BLAS_THREADS)) \
+    --mem=64G \
+    -o ${JOB_NAME}.out \
+    -e ${JOB_NAME}.err \
+    jobs/${SCRIPT_NAME}.sh ${COHORT} ${DATASET} ${N_ITERATIONS} ${N_WORKERS} ${N_BLAS_THREADS} ${DO_DEBUG} ${DO_CONTINUE} ${DO_CACHE_AFFINITY}
@@ -0,0 +1,13 @@
+#!/bin/sh
+
+COHORT=$1
+DATASET=$2
+N_ITERATIONS=$3
+N_WORKERS=$4
+N_BLAS_THREADS=$5
+DO_DEBUG=$6
+DO_CONTINUE=$7
+DO_CACHE_AFFINITY=$8
+
+source ../env/bin/activate
+python3 main.py pipeline-sweep --cohort $COHORT --dataset $DATASET --n-iterations $N_ITERATIONS --n-workers $N_WORKERS --n-blas-threads $N_BLAS_THREADS $DO_DEBUG $DO_CONTINUE $DO_CACHE_AFFINITY
@@ -7,6 +7,8 @@ N_CLUSTERS=$4
 N_ITERATIONS=$5
 DO_DEBUG=$6
 DO_CONTINUE=$7
+DO_IN_PROCESS=$8
+DO_CACHE_AFFINITY=$9
 
 source ../env/bin/activate
-python3 main.py pipeline --cohort $COHORT --dataset $DATASET --cluster-method $CLUSTER_METHOD --n-clusters $N_CLUSTERS --n-iterations $N_ITERATIONS $DO_DEBUG $DO_CONTINUE
+python3 main.py pipeline --cohort $COHORT --dataset $DATASET --cluster-method $CLUSTER_METHOD --n-clusters $N_CLUSTERS --n-iterations $N_ITERATIONS $DO_DEBUG $DO_CONTINUE $DO_IN_PROCESS $DO_CACHE_AFFINITY
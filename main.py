@@ -3,16 +3,12 @@
 from argparse import ArgumentParser, Namespace
 import sys
 
-from handler.debug_datasets import debug_datasets_handler
-from handler.combine import combine_handler
-from handler.cluster import cluster_handler
-from handler.arff import arff_handler
-from handler.feat_select import feat_select_handler
-from handler.pipeline import pipeline_handler
-from handler.best_clustering import best_clustering_handler
-from handler.counts import counts_handler
-from handler.plot_clustering import plot_clustering_handler
-from handler.utils import DEBUG_IDENTIFIER
+from handler.profiling import set_do_profile, set_profile_path
+from handler.utils import (
+    DEBUG_IDENTIFIER, WEKA_RANKER, NATIVE_RANKER, EXACT_SCORE_MODE, SUBSAMPLE_SCORE_MODE, SIMPLIFIED_SCORE_MODE,
+    CSV_STORAGE_FORMAT, STORAGE_EXTENSIONS, MATRIX_COL_BLOCK_SIZE, DECAY_SCHEDULE, BISECT_SCHEDULE,
+    SCORE_AWARE_SCHEDULE, PROFILE_PATH, NO_REDUCTION, PCA_REDUCTION, RANDOM_PROJECTION_REDUCTION, set_storage_format
+)
 
 
 def add_do_debug_arg(parser: ArgumentParser):
@@ -56,7 +52,7 @@ def add_cluster_method_arg(parser: ArgumentParser):
 
     parser.add_argument(
         '--cluster-method', type=str, required=True,
-        help='Which clustering method to use; choices: rbf, nearest_neighbors'
+        help='Which clustering method to use; choices: rbf, nearest_neighbors, nystrom, minibatch_kmeans'
     )
 
 
@@ -87,6 +83,124 @@ def add_clustering_path_arg(parser: ArgumentParser):
     )
 
 
+def add_ranker_arg(parser: ArgumentParser):
+    """Adds the feature ranker argument to the parser"""
+
+    parser.add_argument(
+        '--ranker', type=str, required=False, default=WEKA_RANKER, choices=[NATIVE_RANKER, WEKA_RANKER],
+        help='Whether to rank the features by information gain in Python or with WEKA (which requires the ARFF)'
+    )
+
+
+def add_schedule_args(parser: ArgumentParser):
+    """Adds the arguments for how many features to remove on each iteration to a parser"""
+
+    parser.add_argument(
+        '--schedule', type=str, required=False, default=DECAY_SCHEDULE,
+        choices=[DECAY_SCHEDULE, BISECT_SCHEDULE, SCORE_AWARE_SCHEDULE],
+        help='Whether to shrink the features by a fixed decay, halve the distance to the target number of features, '
+             'or decay while the clustering score improves and remove more features the longer it does not'
+    )
+    parser.add_argument(
+        '--target-n-kept-feats', type=int, required=False, default=1,
+        help='The number of features the bisect schedule halves the distance to before removing one at a time'
+    )
+
+
+def add_patience_arg(parser: ArgumentParser):
+    """Adds the patience argument to a parser"""
+
+    parser.add_argument(
+        '--patience', type=int, required=False, default=None,
+        help='How many iterations without a better clustering score to run before stopping the pipeline early'
+    )
+
+
+def add_do_sparse_arff_arg(parser: ArgumentParser):
+    """Adds the do sparse ARFF argument to a parser"""
+
+    parser.add_argument(
+        '--do-sparse-arff', required=False, action='store_true',
+        help='Whether to write the ARFF in the sparse format, which omits values of zero, or not'
+    )
+
+
+def add_do_cache_affinity_arg(parser: ArgumentParser):
+    """Adds the do-cache-affinity argument to the parser"""
+
+    parser.add_argument(
+        '--do-cache-affinity', required=False, action='store_true',
+        help='Whether to reuse the affinity matrix of a data set that has already been clustered or not'
+    )
+
+
+def add_score_args(parser: ArgumentParser):
+    """Adds the arguments that configure how clusterings are scored to the parser"""
+
+    parser.add_argument(
+        '--score-mode', type=str, required=False, default=EXACT_SCORE_MODE,
+        choices=[EXACT_SCORE_MODE, SUBSAMPLE_SCORE_MODE, SIMPLIFIED_SCORE_MODE],
+        help='Whether to compute the exact silhouette score, estimate it from a random sample of individuals or '
+             'compute the simplified silhouette score from the distances to the cluster centroids'
+    )
+    parser.add_argument(
+        '--score-sample-size', type=int, required=False, default=1000,
+        help='The number of individuals whose silhouettes are computed in the subsample score mode'
+    )
+    parser.add_argument(
+        '--score-working-memory', type=int, required=False, default=None,
+        help='The memory budget in MiB for each chunk of pairwise distances. Exclude argument to use the default'
+    )
+
+
+def add_synthetic_data_args(parser: ArgumentParser):
+    """Adds the arguments that configure the size and cluster structure of a synthetic cohort to a parser"""
+
+    parser.add_argument(
+        '--n-ptids', type=int, required=False, default=500,
+        help='The number of individuals in the synthetic cohort'
+    )
+    parser.add_argument(
+        '--n-feats', type=int, required=False, default=2000,
+        help='The number of features across the phenotypes, expression and MRI data sets of the synthetic cohort'
+    )
+    parser.add_argument(
+        '--nominal-ratio', type=float, required=False, default=0.3,
+        help='The share of the phenotypes which are nominal'
+    )
+    parser.add_argument(
+        '--n-true-clusters', type=int, required=False, default=3,
+        help='The number of clusters the individuals of the synthetic cohort are drawn from'
+    )
+    parser.add_argument(
+        '--informative-ratio', type=float, required=False, default=0.1,
+        help='The share of the features which differ between the clusters'
+    )
+    parser.add_argument(
+        '--cluster-separation', type=float, required=False, default=2.0,
+        help='The standard deviation of the cluster centers of the informative features, relative to their noise'
+    )
+    parser.add_argument(
+        '--seed', type=int, required=False, default=0,
+        help='The seed of the random numbers of the synthetic cohort'
+    )
+
+
+def add_reduction_args(parser: ArgumentParser):
+    """Adds the arguments for reducing the dimensions of the data set before clustering it to a parser"""
+
+    parser.add_argument(
+        '--reduction', type=str, required=False, default=NO_REDUCTION,
+        choices=[NO_REDUCTION, PCA_REDUCTION, RANDOM_PROJECTION_REDUCTION],
+        help='How to reduce the dimensions of the data set that is clustered and scored. The features are still '
+             'selected from the full data set'
+    )
+    parser.add_argument(
+        '--n-components', type=int, required=False, default=100,
+        help='The number of dimensions to reduce the data set to'
+    )
+
+
 def add_file_path_args(parser: ArgumentParser):
     """Adds the arguments that are used for constructing file paths to data"""
 
@@ -102,6 +216,14 @@ def parse_args(argv) -> Namespace:
     """Gets the arguments for this repo"""
 
     parser: ArgumentParser = ArgumentParser()
+    parser.add_argument(
+        '--storage-format', type=str, required=False, default=CSV_STORAGE_FORMAT, choices=list(STORAGE_EXTENSIONS),
+        help='The format to save data sets and column types in. They are read from whichever format they were saved in'
+    )
+    parser.add_argument(
+        '--profile', required=False, action='store_true',
+        help='Whether to record the wall time, CPU time and peak memory of each stage with the results of its iteration'
+    )
 
     subparsers = parser.add_subparsers(dest='handler_type', title='handler_type')
     subparsers.required = True
@@ -110,6 +232,18 @@ def parse_args(argv) -> Namespace:
     debug_datasets_parser: ArgumentParser = subparsers.add_parser('debug-datasets')
     add_cohort_arg(parser=debug_datasets_parser)
     add_dataset_arg(parser=debug_datasets_parser)
+    debug_datasets_parser.add_argument(
+        '--n-debug-cols', type=int, required=False, default=1000,
+        help='The number of randomly chosen columns to keep in the debug data set'
+    )
+    debug_datasets_parser.add_argument(
+        '--n-debug-rows', type=int, required=False, default=None,
+        help='The number of randomly chosen individuals to keep in the debug data set. If not set, keeps all of them'
+    )
+    debug_datasets_parser.add_argument(
+        '--do-stratify', required=False, action='store_true',
+        help='Whether to choose the columns of each column type in proportion to how many columns have the type or not'
+    )
 
     # Configure the combine handler
     combine_parser: ArgumentParser = subparsers.add_parser('combine')
@@ -120,11 +254,46 @@ def parse_args(argv) -> Namespace:
         help='path the feature-selected MRI data to combine with the rest of the data. If not set, takes full data set.'
     )
     add_do_debug_arg(parser=combine_parser)
+    combine_parser.add_argument(
+        '--do-stream', required=False, action='store_true',
+        help='Whether to combine the data sets a block of columns at a time and save a memory mapped matrix or not. '
+             'Best used with data sets stored in a columnar format'
+    )
+    combine_parser.add_argument(
+        '--block-size', type=int, required=False, default=MATRIX_COL_BLOCK_SIZE,
+        help='The number of columns to read at a time when streaming'
+    )
+    combine_parser.add_argument(
+        '--do-incremental', required=False, action='store_true',
+        help='Whether to cache each data set and its normalized columns, keyed by the contents of its file, so that a '
+             'rerun only reads and normalizes again the whole data sets whose file or patients in common changed'
+    )
 
     # Configure the cluster handler
     cluster_parser: ArgumentParser = subparsers.add_parser('cluster')
     add_file_path_args(parser=cluster_parser)
     add_do_debug_arg(parser=cluster_parser)
+    add_do_cache_affinity_arg(parser=cluster_parser)
+    add_score_args(parser=cluster_parser)
+    add_reduction_args(parser=cluster_parser)
+
+    # Configure the cluster-sweep handler
+    cluster_sweep_parser: ArgumentParser = subparsers.add_parser('cluster-sweep')
+    add_cohort_arg(parser=cluster_sweep_parser)
+    add_dataset_arg(parser=cluster_sweep_parser)
+    add_cluster_method_arg(parser=cluster_sweep_parser)
+    add_do_debug_arg(parser=cluster_sweep_parser)
+    add_do_cache_affinity_arg(parser=cluster_sweep_parser)
+    add_score_args(parser=cluster_sweep_parser)
+    add_reduction_args(parser=cluster_sweep_parser)
+    cluster_sweep_parser.add_argument(
+        '--min-n-clusters', type=int, required=False, default=2,
+        help='The smallest number of clusters to use'
+    )
+    cluster_sweep_parser.add_argument(
+        '--max-n-clusters', type=int, required=False, default=20,
+        help='The largest number of clusters to use'
+    )
 
     # Configure the arff handler
     arff_parser: ArgumentParser = subparsers.add_parser('arff')
@@ -134,11 +303,14 @@ def parse_args(argv) -> Namespace:
         '--clustering-score', type=float, required=True,
         help='The clustering score of the previous clustering'
     )
+    add_do_sparse_arff_arg(parser=arff_parser)
 
     # Configure the feat-select handler
     feat_select_parser: ArgumentParser = subparsers.add_parser('feat-select')
     add_file_path_args(parser=feat_select_parser)
     add_do_debug_arg(parser=feat_select_parser)
+    add_ranker_arg(parser=feat_select_parser)
+    add_schedule_args(parser=feat_select_parser)
 
     # Configure the pipeline handler
     pipeline_parser: ArgumentParser = subparsers.add_parser('pipeline')
@@ -147,6 +319,13 @@ def parse_args(argv) -> Namespace:
     add_n_clusters_arg(parser=pipeline_parser)
     add_do_debug_arg(parser=pipeline_parser)
     add_cluster_method_arg(parser=pipeline_parser)
+    add_ranker_arg(parser=pipeline_parser)
+    add_schedule_args(parser=pipeline_parser)
+    add_patience_arg(parser=pipeline_parser)
+    add_do_sparse_arff_arg(parser=pipeline_parser)
+    add_do_cache_affinity_arg(parser=pipeline_parser)
+    add_score_args(parser=pipeline_parser)
+    add_reduction_args(parser=pipeline_parser)
     pipeline_parser.add_argument(
         '--n-iterations', type=int, required=True,
         help='The number of iterations to reduce the features and re-cluster'
@@ -155,15 +334,129 @@ def parse_args(argv) -> Namespace:
         '--do-continue', required=False, action='store_true',
         help='Whether to continue the pipeline from its latest iteration or not'
     )
+    pipeline_parser.add_argument(
+        '--do-in-process', required=False, action='store_true',
+        help='Whether to call the handlers in this process and keep the data in memory between steps or not'
+    )
+    pipeline_parser.add_argument(
+        '--checkpoint-interval', type=int, required=False, default=1,
+        help='How many iterations of the in-process pipeline to run between saving the selected data to disk'
+    )
+    pipeline_parser.add_argument(
+        '--do-warm-start', required=False, action='store_true',
+        help='Whether the in-process pipeline starts each clustering from the eigenvectors and clusters of the last'
+    )
+
+    # Configure the pipeline-sweep handler
+    pipeline_sweep_parser: ArgumentParser = subparsers.add_parser('pipeline-sweep')
+    add_cohort_arg(parser=pipeline_sweep_parser)
+    add_dataset_arg(parser=pipeline_sweep_parser)
+    add_do_debug_arg(parser=pipeline_sweep_parser)
+    add_ranker_arg(parser=pipeline_sweep_parser)
+    add_schedule_args(parser=pipeline_sweep_parser)
+    add_patience_arg(parser=pipeline_sweep_parser)
+    add_do_sparse_arff_arg(parser=pipeline_sweep_parser)
+    add_do_cache_affinity_arg(parser=pipeline_sweep_parser)
+    add_score_args(parser=pipeline_sweep_parser)
+    add_reduction_args(parser=pipeline_sweep_parser)
+    pipeline_sweep_parser.add_argument(
+        '--cluster-methods', type=str, nargs='+', required=False, default=['nearest_neighbors'],
+        help='Which clustering methods to run the pipeline with; '
+             'choices: rbf, nearest_neighbors, nystrom, minibatch_kmeans'
+    )
+    pipeline_sweep_parser.add_argument(
+        '--min-n-clusters', type=int, required=False, default=2,
+        help='The smallest number of clusters to run the pipeline with'
+    )
+    pipeline_sweep_parser.add_argument(
+        '--max-n-clusters', type=int, required=False, default=20,
+        help='The largest number of clusters to run the pipeline with'
+    )
+    pipeline_sweep_parser.add_argument(
+        '--n-iterations', type=int, required=True,
+        help='The number of iterations to reduce the features and re-cluster'
+    )
+    pipeline_sweep_parser.add_argument(
+        '--do-continue', required=False, action='store_true',
+        help='Whether to continue each pipeline from its latest iteration or not'
+    )
+    pipeline_sweep_parser.add_argument(
+        '--checkpoint-interval', type=int, required=False, default=1,
+        help='How many iterations of each pipeline to run between saving the selected data to disk'
+    )
+    pipeline_sweep_parser.add_argument(
+        '--do-warm-start', required=False, action='store_true',
+        help='Whether each pipeline starts each clustering from the eigenvectors and clusters of the last'
+    )
+    pipeline_sweep_parser.add_argument(
+        '--n-workers', type=int, required=False, default=None,
+        help='The number of pipelines to run at once; defaults to the number of CPUs'
+    )
+    pipeline_sweep_parser.add_argument(
+        '--n-blas-threads', type=int, required=False, default=1,
+        help='The number of BLAS and OpenMP threads each pipeline uses'
+    )
 
     # Configure the best-clustering handler
     best_clustering_parser: ArgumentParser = subparsers.add_parser('best-clustering')
     add_cohort_arg(parser=best_clustering_parser)
     add_dataset_arg(parser=best_clustering_parser)
+    best_clustering_parser.add_argument(
+        '--do-backfill', required=False, action='store_true',
+        help='Whether to add the clusterings saved before the catalog existed to the catalog first or not'
+    )
+    best_clustering_parser.add_argument(
+        '--top-n', type=int, required=False, default=None,
+        help='How many of the best clusterings to list; by default, every clustering with the best score is listed'
+    )
+    best_clustering_parser.add_argument(
+        '--filter-cluster-method', type=str, required=False, default=None,
+        help='Only consider the clusterings of this clustering method'
+    )
+    best_clustering_parser.add_argument(
+        '--min-n-clusters', type=int, required=False, default=None,
+        help='Only consider the clusterings with at least this many clusters'
+    )
+    best_clustering_parser.add_argument(
+        '--max-n-clusters', type=int, required=False, default=None,
+        help='Only consider the clusterings with at most this many clusters'
+    )
+    best_clustering_parser.add_argument(
+        '--min-n-kept-feats', type=int, required=False, default=None,
+        help='Only consider the clusterings of at least this many features'
+    )
+    best_clustering_parser.add_argument(
+        '--max-n-kept-feats', type=int, required=False, default=None,
+        help='Only consider the clusterings of at most this many features'
+    )
 
     # Configure the counts handler
     counts_parser: ArgumentParser = subparsers.add_parser('counts')
-    add_clustering_path_arg(parser=counts_parser)
+    counts_parser.add_argument(
+        '--clustering-paths', '--clustering-path', type=str, nargs='*', required=False, default=[],
+        help='paths to the clusterings to count.'
+    )
+    counts_parser.add_argument(
+        '--cohort', type=str, required=False, default=None,
+        help='Also count the best clusterings of this cohort in the catalog, which requires --dataset'
+    )
+    counts_parser.add_argument(
+        '--dataset', type=str, required=False, default=None,
+        help='The data set of the clusterings to count from the catalog, which requires --cohort'
+    )
+    counts_parser.add_argument(
+        '--filter-cluster-method', type=str, required=False, default=None,
+        help='Only count the clusterings in the catalog of this clustering method'
+    )
+    counts_parser.add_argument(
+        '--top-n', type=int, required=False, default=None,
+        help='How many of the best clusterings in the catalog to count; by default, every clustering is counted'
+    )
+    counts_parser.add_argument(
+        '--output-path', type=str, required=False, default=None,
+        help='path to save the counts of every clustering to, as a JSON if it ends in .json and a CSV otherwise. '
+             'Exclude argument to print the counts instead'
+    )
     counts_parser.add_argument(
         '--feat-map-path', type=str, required=True,
         help='path to the mapping from PTID to the variant to count.'
@@ -177,6 +470,75 @@ def parse_args(argv) -> Namespace:
         help='path to the data for the clustering plot.'
     )
 
+    # Configure the plot-clusterings handler
+    plot_clusterings_parser: ArgumentParser = subparsers.add_parser('plot-clusterings')
+    plot_clusterings_parser.add_argument(
+        '--clustering-paths', type=str, nargs='+', required=True,
+        help='paths or glob patterns of the clusterings of the pipelines to plot, each saved next to its clustering'
+    )
+    plot_clusterings_parser.add_argument(
+        '--n-workers', type=int, required=False, default=None,
+        help='The number of plots to draw at once; defaults to the number of CPUs'
+    )
+
+    # Configure the report handler
+    report_parser: ArgumentParser = subparsers.add_parser('report')
+    add_cohort_arg(parser=report_parser)
+    add_dataset_arg(parser=report_parser)
+    report_parser.add_argument(
+        '--top-n', type=int, required=False, default=10,
+        help='How many of the slowest runs of the stages to list'
+    )
+
+    # Configure the synthetic-data handler
+    synthetic_data_parser: ArgumentParser = subparsers.add_parser('synthetic-data')
+    add_cohort_arg(parser=synthetic_data_parser)
+    add_synthetic_data_args(parser=synthetic_data_parser)
+
+    # Configure the benchmark handler
+    benchmark_parser: ArgumentParser = subparsers.add_parser('benchmark')
+    add_synthetic_data_args(parser=benchmark_parser)
+    add_ranker_arg(parser=benchmark_parser)
+    benchmark_parser.add_argument(
+        '--scales', type=int, nargs='+', required=False, default=[1, 2, 4],
+        help='What to multiply the number of individuals and features by for each size of synthetic cohort'
+    )
+    benchmark_parser.add_argument(
+        '--cluster-method', type=str, required=False, default='nearest_neighbors',
+        help='Which clustering method to use; choices: rbf, nearest_neighbors, nystrom, minibatch_kmeans'
+    )
+    benchmark_parser.add_argument(
+        '--n-clusters', type=int, required=False, default=3,
+        help='The number of clusters to use'
+    )
+    benchmark_parser.add_argument(
+        '--n-iterations', type=int, required=False, default=5,
+        help='The number of iterations of the pipeline'
+    )
+    benchmark_parser.add_argument(
+        '--n-repeats', type=int, required=False, default=3,
+        help='How many times to time each handler, of which the median time is recorded'
+    )
+    benchmark_parser.add_argument(
+        '--results-path', type=str, required=False, default='benchmarks/results.jsonl',
+        help='path to the file the times are appended to and compared with'
+    )
+    benchmark_parser.add_argument(
+        '--do-imports-only', required=False, action='store_true',
+        help='Whether to only time how long the handlers take to import or not'
+    )
+    benchmark_parser.add_argument(
+        '--max-slowdown', type=float, required=False, default=None,
+        help='Fail if any time is more than this many times its previous result. Exclude argument to never fail'
+    )
+
+    # Configure the convert-storage handler
+    convert_storage_parser: ArgumentParser = subparsers.add_parser('convert-storage')
+    convert_storage_parser.add_argument(
+        '--do-remove-csv', required=False, action='store_true',
+        help='Whether to remove the CSVs after converting them to the storage format or not'
+    )
+
     args: Namespace = parser.parse_args(argv)
 
     if hasattr(args, 'do_debug') and args.do_debug is True:
@@ -190,42 +552,141 @@ def main(argv: list):
     """Main function of this module"""
 
     args: Namespace = parse_args(argv)
+    set_storage_format(storage_format=args.storage_format)
+    set_do_profile(do_profile=args.profile)
+
+    if args.handler_type in ('cluster', 'arff', 'feat-select'):
+        # The stages of a handler run by the pipeline are recorded with the results of the iteration it is run on
+        set_profile_path(profile_path=PROFILE_PATH.format(
+            args.cohort, args.dataset, args.cluster_method, args.n_clusters, args.iteration
+        ))
 
+    # Only the chosen handler is imported since the pipeline starts this module several times on every iteration
     if args.handler_type == 'debug-datasets':
         # Create a smaller version (less columns) of a data set for debugging
-        debug_datasets_handler(cohort=args.cohort, dataset=args.dataset)
+        from handler.debug_datasets import debug_datasets_handler
+        debug_datasets_handler(
+            cohort=args.cohort, dataset=args.dataset, n_debug_cols=args.n_debug_cols, n_debug_rows=args.n_debug_rows,
+            do_stratify=args.do_stratify
+        )
     elif args.handler_type == 'combine':
         # Combine the phenotypes, MRI data, and gene expression data into a single data set
-        combine_handler(cohort=args.cohort, dataset=args.dataset, mri_path=args.mri_path, do_debug=args.do_debug)
+        from handler.combine import combine_handler
+        combine_handler(
+            cohort=args.cohort, dataset=args.dataset, mri_path=args.mri_path, do_debug=args.do_debug,
+            do_stream=args.do_stream, block_size=args.block_size, do_incremental=args.do_incremental
+        )
     elif args.handler_type == 'cluster':
         # Obtain the cluster labels for the ARFF
-        cluster_handler(
+        from handler.cluster import cluster_handler
+        _, clustering_score = cluster_handler(
             cohort=args.cohort, dataset=args.dataset, cluster_method=args.cluster_method, n_clusters=args.n_clusters,
-            iteration=args.iteration, n_kept_feats=args.n_kept_feats
+            iteration=args.iteration, n_kept_feats=args.n_kept_feats, do_cache_affinity=args.do_cache_affinity,
+            score_mode=args.score_mode, score_sample_size=args.score_sample_size,
+            score_working_memory=args.score_working_memory, reduction=args.reduction, n_components=args.n_components
+        )
+        print(clustering_score)
+    elif args.handler_type == 'cluster-sweep':
+        # Obtain the cluster labels of the full data set for every number of clusters from one spectral embedding
+        from handler.cluster_sweep import cluster_sweep_handler
+        cluster_sweep_handler(
+            cohort=args.cohort, dataset=args.dataset, cluster_method=args.cluster_method,
+            min_n_clusters=args.min_n_clusters, max_n_clusters=args.max_n_clusters,
+            do_cache_affinity=args.do_cache_affinity, score_mode=args.score_mode,
+            score_sample_size=args.score_sample_size, score_working_memory=args.score_working_memory,
+            reduction=args.reduction, n_components=args.n_components
         )
     elif args.handler_type == 'arff':
         # Make the ARFF to be used with WEKA
+        from handler.arff import arff_handler
         arff_handler(
             cohort=args.cohort, dataset=args.dataset, cluster_method=args.cluster_method, n_clusters=args.n_clusters,
-            iteration=args.iteration, n_kept_feats=args.n_kept_feats, clustering_score=args.clustering_score
+            iteration=args.iteration, n_kept_feats=args.n_kept_feats, clustering_score=args.clustering_score,
+            do_sparse_arff=args.do_sparse_arff
         )
     elif args.handler_type == 'feat-select':
-        # Select the features from the ARFF using WEKA
-        feat_select_handler(
+        # Select the features from the ARFF using WEKA or from the data and clustering natively
+        from handler.feat_select import feat_select_handler
+        _, _, n_kept_feats = feat_select_handler(
             cohort=args.cohort, dataset=args.dataset, cluster_method=args.cluster_method, n_clusters=args.n_clusters,
-            iteration=args.iteration, n_kept_feats=args.n_kept_feats
+            iteration=args.iteration, n_kept_feats=args.n_kept_feats, ranker=args.ranker, schedule=args.schedule,
+            target_n_kept_feats=args.target_n_kept_feats
         )
+        print(n_kept_feats)
     elif args.handler_type == 'pipeline':
+        from handler.pipeline import pipeline_handler
         pipeline_handler(
             cohort=args.cohort, dataset=args.dataset, cluster_method=args.cluster_method, n_clusters=args.n_clusters,
-            n_iterations=args.n_iterations, do_continue=args.do_continue
+            n_iterations=args.n_iterations, do_continue=args.do_continue, do_in_process=args.do_in_process,
+            checkpoint_interval=args.checkpoint_interval, ranker=args.ranker, do_sparse_arff=args.do_sparse_arff,
+            do_cache_affinity=args.do_cache_affinity, score_mode=args.score_mode,
+            score_sample_size=args.score_sample_size, score_working_memory=args.score_working_memory,
+            do_warm_start=args.do_warm_start, schedule=args.schedule, target_n_kept_feats=args.target_n_kept_feats,
+            patience=args.patience, reduction=args.reduction, n_components=args.n_components
+        )
+    elif args.handler_type == 'pipeline-sweep':
+        # Run the pipelines for every clustering method and number of clusters in a pool of processes
+        from handler.pipeline_sweep import pipeline_sweep_handler
+        pipeline_sweep_handler(
+            cohort=args.cohort, dataset=args.dataset, cluster_methods=args.cluster_methods,
+            min_n_clusters=args.min_n_clusters, max_n_clusters=args.max_n_clusters, n_iterations=args.n_iterations,
+            do_continue=args.do_continue, n_workers=args.n_workers, n_blas_threads=args.n_blas_threads,
+            checkpoint_interval=args.checkpoint_interval, ranker=args.ranker, do_sparse_arff=args.do_sparse_arff,
+            do_cache_affinity=args.do_cache_affinity, score_mode=args.score_mode,
+            score_sample_size=args.score_sample_size, score_working_memory=args.score_working_memory,
+            do_warm_start=args.do_warm_start, schedule=args.schedule, target_n_kept_feats=args.target_n_kept_feats,
+            patience=args.patience, reduction=args.reduction, n_components=args.n_components
         )
     elif args.handler_type == 'best-clustering':
-        best_clustering_handler(cohort=args.cohort, dataset=args.dataset)
+        from handler.best_clustering import best_clustering_handler
+        best_clustering_handler(
+            cohort=args.cohort, dataset=args.dataset, do_backfill=args.do_backfill, top_n=args.top_n,
+            cluster_method=args.filter_cluster_method, min_n_clusters=args.min_n_clusters,
+            max_n_clusters=args.max_n_clusters, min_n_kept_feats=args.min_n_kept_feats,
+            max_n_kept_feats=args.max_n_kept_feats
+        )
+    elif args.handler_type == 'report':
+        # Summarize the profiles of the pipelines
+        from handler.report import report_handler
+        report_handler(cohort=args.cohort, dataset=args.dataset, top_n=args.top_n)
     elif args.handler_type == 'counts':
-        counts_handler(clustering_path=args.clustering_path, feat_map_path=args.feat_map_path)
+        from handler.counts import counts_handler
+        # Count the individuals of each cluster in each category of a variate for one or more clusterings
+        counts_handler(
+            clustering_paths=args.clustering_paths, feat_map_path=args.feat_map_path, cohort=args.cohort,
+            dataset=args.dataset, cluster_method=args.filter_cluster_method, top_n=args.top_n,
+            output_path=args.output_path
+        )
     elif args.handler_type == 'plot-clustering':
+        from handler.plot_clustering import plot_clustering_handler
         plot_clustering_handler(clustering_path=args.clustering_path, data_path=args.data_path)
+    elif args.handler_type == 'plot-clusterings':
+        # Plot many clusterings in a pool of processes, projecting the data sets with more than two features
+        from handler.plot_clustering import plot_clusterings_handler
+        plot_clusterings_handler(clustering_paths=args.clustering_paths, n_workers=args.n_workers)
+    elif args.handler_type == 'synthetic-data':
+        # Create a cohort with the same data sets as the prepared data for when the real data is not available
+        from handler.synthetic import synthetic_data_handler
+        synthetic_data_handler(
+            cohort=args.cohort, n_ptids=args.n_ptids, n_feats=args.n_feats, nominal_ratio=args.nominal_ratio,
+            n_true_clusters=args.n_true_clusters, informative_ratio=args.informative_ratio,
+            cluster_separation=args.cluster_separation, seed=args.seed
+        )
+    elif args.handler_type == 'benchmark':
+        # Time the handlers and the pipeline on synthetic cohorts and compare with the times recorded before
+        from handler.benchmark import benchmark_handler
+        benchmark_handler(
+            scales=args.scales, n_ptids=args.n_ptids, n_feats=args.n_feats, nominal_ratio=args.nominal_ratio,
+            n_true_clusters=args.n_true_clusters, informative_ratio=args.informative_ratio,
+            cluster_separation=args.cluster_separation, cluster_method=args.cluster_method,
+            n_clusters=args.n_clusters, n_iterations=args.n_iterations, ranker=args.ranker,
+            n_repeats=args.n_repeats, results_path=args.results_path, seed=args.seed,
+            do_imports_only=args.do_imports_only, max_slowdown=args.max_slowdown
+        )
+    elif args.handler_type == 'convert-storage':
+        # Convert the data sets and column types in prepared-data and clean-data to the storage format
+        from handler.convert_storage import convert_storage_handler
+        convert_storage_handler(storage_format=args.storage_format, do_remove_csv=args.do_remove_csv)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,33 @@
+"""Tests the spectral clustering which starts from the eigenvectors and clustering of the previous iteration"""
+
+from numpy import ndarray, float32
+from numpy.random import default_rng
+from sklearn.cluster import SpectralClustering
+from sklearn.metrics.pairwise import rbf_kernel
+
+from handler.cluster import get_warm_started_labels
+
+N_CLUSTERS: int = 3
+
+
+def test_cold_start_matches_spectral_clustering():
+    """The first clustering of a warm started pipeline has the labels of spectral clustering without warm starting"""
+
+    rng = default_rng(0)
+    data: ndarray = rng.normal(size=(300, 5)) + rng.integers(0, N_CLUSTERS, size=300)[:, None] * 3
+    affinity: ndarray = rbf_kernel(data, gamma=0.1).astype(float32)
+
+    expected: ndarray = SpectralClustering(
+        n_clusters=N_CLUSTERS, affinity='precomputed', assign_labels='kmeans', random_state=0
+    ).fit_predict(affinity)
+
+    warm_start: dict = {}
+    labels: ndarray = get_warm_started_labels(affinity=affinity, n_clusters=N_CLUSTERS, warm_start=warm_start)
+
+    assert (labels == expected).all()
+    assert warm_start['n_saved_solver_iters'] == 0 and warm_start['eigenvectors'].shape == (300, N_CLUSTERS)
+
+    # The clustering of the same affinity matrix warm started from its own eigenvectors saves eigensolver iterations
+    get_warm_started_labels(affinity=affinity, n_clusters=N_CLUSTERS, warm_start=warm_start)
+
+    assert warm_start['n_cold_solver_iters'] is not None and warm_start['n_saved_solver_iters'] > 0
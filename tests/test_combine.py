@@ -0,0 +1,46 @@
+"""Tests that the vectorized removal of constant columns and normalization matches the pandas path it replaced"""
+
+from pandas import DataFrame
+from numpy import ndarray, nan, float32
+from numpy.random import default_rng
+from numpy.testing import assert_allclose
+
+from handler.combine import remove_constant_cols_and_normalize
+from handler.benchmark import remove_cols_of_one_unique_val, normalize
+
+N_ROWS: int = 2000
+N_COLS: int = 1000
+
+# The kernel normalizes in float32 whereas the pandas path normalized in float64
+TOLERANCE: float = 1e-6
+
+
+def get_synthetic_data() -> DataFrame:
+    """Makes a combined data set with numeric, nominal, constant, partly missing and entirely missing columns"""
+
+    rng = default_rng(0)
+    data: ndarray = rng.normal(loc=5, scale=3, size=(N_ROWS, N_COLS))
+    data[:, 1::7] = rng.integers(0, 4, size=(N_ROWS, len(range(1, N_COLS, 7))))
+    data[rng.random(size=(N_ROWS, N_COLS)) < 0.05] = nan
+    data[:, 2::11] = 1
+    data[:, 3::13] = nan
+
+    # A constant column with missing values has two unique values so it is not removed
+    data[:, 4] = 2
+    data[::2, 4] = nan
+
+    return DataFrame(data, columns=['feat{}'.format(i) for i in range(N_COLS)])
+
+
+def test_kernel_matches_pandas():
+    """The kernel keeps the same columns as the pandas path and normalizes them to within float32 precision"""
+
+    data: DataFrame = get_synthetic_data()
+
+    expected: DataFrame = normalize(df=remove_cols_of_one_unique_val(data=data.copy()))
+    matrix, cols = remove_constant_cols_and_normalize(matrix=data.to_numpy(dtype=float32), cols=list(data.columns))
+
+    assert cols == list(expected.columns)
+    assert 'feat4' in cols and 'feat2' not in cols and 'feat3' not in cols
+    assert matrix.dtype == float32
+    assert_allclose(matrix, expected.to_numpy(), rtol=0, atol=TOLERANCE, equal_nan=True)
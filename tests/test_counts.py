@@ -0,0 +1,29 @@
+"""Tests the counts of the individuals of each cluster in each category"""
+
+from pandas import DataFrame, Series
+from numpy import nan
+from pytest import raises
+
+from handler.counts import MISSING_CATEGORY, CATEGORY_COL, counts_handler, get_counts_table
+from handler.utils import PTID_COL, CLUSTER_ID_COL
+
+
+def test_missing_categories_are_counted():
+    """The individuals without a category are counted in the missing category and in every total"""
+
+    clustering: DataFrame = DataFrame({PTID_COL: ['a', 'b', 'c', 'd', 'e'], CLUSTER_ID_COL: [0, 0, 1, 1, 1]})
+    feat_map: Series = Series({'a': 'x', 'b': None, 'c': 'y', 'd': nan, 'e': 'y'})
+
+    table: DataFrame = get_counts_table(clustering=clustering, feat_map=feat_map)
+    missing: DataFrame = table[table[CATEGORY_COL] == MISSING_CATEGORY]
+
+    assert list(missing[CLUSTER_ID_COL]) == [0, 1] and list(missing['count']) == [1, 1]
+    assert (table['grand_total'] == table['count'].sum()).all() and table.loc[0, 'grand_total'] == 5
+    assert list(table.groupby(CLUSTER_ID_COL)['cluster_total'].first()) == [2, 3]
+
+
+def test_cohort_requires_dataset():
+    """The catalog is not queried for a cohort without a data set"""
+
+    with raises(AssertionError):
+        counts_handler(clustering_paths=[], feat_map_path='', cohort='cohort')
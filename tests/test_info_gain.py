@@ -0,0 +1,102 @@
+"""Tests that the native ranker gives the same information gains and ranking as WEKA"""
+
+from os.path import join, dirname
+from re import fullmatch
+from numpy import ndarray, array, nan, isnan, zeros
+from scipy.io.arff import loadarff
+
+from handler.info_gain import get_info_gains, rank_feats
+
+FIXTURES_DIR: str = join(dirname(__file__), 'fixtures')
+
+# The output of WEKA 3.9.7 for the fixture, from the same command as feat_select.get_weka_ranking with every feature:
+# java weka.attributeSelection.InfoGainAttributeEval -s "weka.attributeSelection.Ranker -T -1.8E308 -N -1" -i ...
+WEKA_OUTPUT_PATH: str = join(FIXTURES_DIR, 'info-gain-weka.txt')
+ARFF_PATH: str = join(FIXTURES_DIR, 'info-gain.arff')
+
+# WEKA prints the information gains to 4 decimal places
+TOLERANCE: float = 5e-5
+
+
+def load_fixture() -> tuple:
+    """Loads the fixture ARFF as a matrix with missing values as NaN, which columns are nominal and the labels"""
+
+    records, meta = loadarff(ARFF_PATH)
+    feats: list = meta.names()[:-1]
+    data: ndarray = zeros((len(records), len(feats)))
+    is_nominal: ndarray = array([meta[feat][0] == 'nominal' for feat in feats])
+
+    for i, feat in enumerate(feats):
+        if is_nominal[i]:
+            data[:, i] = [nan if val == b'?' else float(val) for val in records[feat]]
+        else:
+            data[:, i] = records[feat]
+
+    labels: ndarray = array([int(label) for label in records[meta.names()[-1]]])
+
+    return feats, data, is_nominal, labels
+
+
+def load_weka_info_gains() -> dict:
+    """Loads the information gain of each feature that WEKA ranked"""
+
+    info_gains: dict = {}
+
+    with open(WEKA_OUTPUT_PATH) as f:
+        for line in f:
+            match = fullmatch(r'\s*([-\d.E]+)\s+\d+\s+(\S+)\s*', line)
+
+            if match is not None:
+                info_gains[match.group(2)] = float(match.group(1))
+
+    return info_gains
+
+
+def get_tied_groups(ranked_feats: list, info_gains: dict) -> list:
+    """Groups the consecutive features of a ranking which have the same information gain"""
+
+    tied_groups: list = []
+
+    for i, feat in enumerate(ranked_feats):
+        if i > 0 and info_gains[feat] == info_gains[ranked_feats[i - 1]]:
+            tied_groups[-1].add(feat)
+        else:
+            tied_groups.append({feat})
+
+    return tied_groups
+
+
+def test_info_gains_match_weka():
+    """The information gain of every feature matches WEKA, including the features with missing values"""
+
+    feats, data, is_nominal, labels = load_fixture()
+    assert isnan(data).any(axis=0).sum() >= 3
+    weka_info_gains: dict = load_weka_info_gains()
+    assert set(weka_info_gains) == set(feats)
+
+    info_gains: ndarray = get_info_gains(data=data, is_nominal=is_nominal, labels=labels)
+
+    for feat, info_gain in zip(feats, info_gains):
+        assert abs(info_gain - weka_info_gains[feat]) < TOLERANCE, feat
+
+
+def test_ranking_matches_weka():
+    """Every feature is ranked in the same order as WEKA, up to the order of the features with the same gain"""
+
+    feats, data, is_nominal, labels = load_fixture()
+    weka_info_gains: dict = load_weka_info_gains()
+
+    info_gains: ndarray = get_info_gains(data=data, is_nominal=is_nominal, labels=labels)
+    ranking: ndarray = rank_feats(info_gains=info_gains, n_kept_feats=len(feats))
+    assert [feats[i] for i in ranking] == [
+        'informative', 'nominal', 'informative_missing', 'nominal_missing', 'noise', 'noise_missing', 'all_missing'
+    ]
+
+    # WEKA orders the tied features by an unstable sort rather than by their column order
+    assert list(weka_info_gains) == [
+        'informative', 'nominal', 'informative_missing', 'nominal_missing', 'all_missing', 'noise', 'noise_missing'
+    ]
+
+    tied_groups: list = get_tied_groups(ranked_feats=[feats[i] for i in ranking], info_gains=weka_info_gains)
+    assert tied_groups == get_tied_groups(ranked_feats=list(weka_info_gains), info_gains=weka_info_gains)
+
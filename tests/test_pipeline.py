@@ -0,0 +1,52 @@
+"""Tests running the pipeline on a small synthetic data set"""
+
+from os import makedirs
+from glob import glob
+
+from pandas import DataFrame
+from numpy.random import default_rng
+from pytest import mark
+
+from handler.pipeline import pipeline_handler
+from handler.utils import (
+    PTID_COL, DATA_DIR, BASE_DATA_PATH, BASE_COL_TYPES_PATH, CLUSTERING_PATH, NUMERIC_COL_TYPE, NOMINAL_COL_TYPE,
+    NATIVE_RANKER, SCALABLE_CLUSTER_METHODS, write_data
+)
+
+COHORT: str = 'cohort'
+DATASET: str = 'dataset'
+N_ROWS: int = 60
+N_NUMERIC_FEATS: int = 10
+
+
+def write_prepared_data():
+    """Writes a prepared data set with numeric features and one nominal feature, and its column types"""
+
+    rng = default_rng(0)
+    data: DataFrame = DataFrame(
+        rng.normal(size=(N_ROWS, N_NUMERIC_FEATS)), columns=['feat{}'.format(i) for i in range(N_NUMERIC_FEATS)]
+    )
+    data['nominal'] = rng.integers(0, 3, size=N_ROWS).astype(float)
+    col_types: DataFrame = DataFrame([[NUMERIC_COL_TYPE] * N_NUMERIC_FEATS + [NOMINAL_COL_TYPE]], columns=data.columns)
+    data.insert(0, PTID_COL, ['ptid{}'.format(i) for i in range(N_ROWS)])
+
+    makedirs('prepared-data/{}'.format(COHORT))
+    makedirs(DATA_DIR)
+    write_data(data=data, data_path=BASE_DATA_PATH.format(COHORT, DATASET))
+    write_data(data=col_types, data_path=BASE_COL_TYPES_PATH.format(COHORT, DATASET))
+
+
+@mark.parametrize('cluster_method', SCALABLE_CLUSTER_METHODS)
+def test_in_process_scalable_clustering(tmp_path, monkeypatch, cluster_method: str):
+    """The scalable clustering methods cluster the data set the in-process pipeline starts from, on iteration 0"""
+
+    monkeypatch.chdir(tmp_path)
+    write_prepared_data()
+
+    pipeline_handler(
+        cohort=COHORT, dataset=DATASET, cluster_method=cluster_method, n_clusters=2, n_iterations=1,
+        do_continue=False, do_in_process=True, ranker=NATIVE_RANKER
+    )
+
+    n_feats: int = N_NUMERIC_FEATS + 1
+    assert len(glob(CLUSTERING_PATH.format(COHORT, DATASET, cluster_method, 2, 0, n_feats, '*'))) == 1
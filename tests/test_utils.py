@@ -0,0 +1,68 @@
+"""Tests the functionality shared between handlers"""
+
+from os import utime
+from numpy import float32, arange, shares_memory, load
+from pandas import DataFrame
+
+import handler.utils
+from handler.utils import (
+    PTID_COL, CSV_STORAGE_FORMAT, MATRIX_STORAGE_FORMAT, get_stored_path, read_data, read_matrix, write_data
+)
+
+
+def write_test_matrix(data_path: str) -> DataFrame:
+    """Writes a small data set as a memory mapped matrix"""
+
+    data: DataFrame = DataFrame(arange(20, dtype=float32).reshape(5, 4), columns=['a', 'b', 'c', 'd'])
+    data.insert(0, PTID_COL, ['P{}'.format(ptid) for ptid in range(5)])
+    write_data(data=data, data_path=data_path, storage_format=MATRIX_STORAGE_FORMAT)
+
+    return data
+
+
+def test_read_matrix_views_memory_map(tmp_path, monkeypatch):
+    """Reading all the features or a contiguous block of them does not copy them out of the memory map"""
+
+    data: DataFrame = write_test_matrix(data_path=str(tmp_path / 'data.csv'))
+    matrices: list = []
+
+    def load_and_keep(*args, **kwargs):
+        loaded = load(*args, **kwargs)
+
+        if kwargs.get('mmap_mode') is not None:
+            matrices.append(loaded)
+
+        return loaded
+
+    monkeypatch.setattr(handler.utils, 'load', load_and_keep)
+
+    read: DataFrame = read_matrix(data_path=str(tmp_path / 'data.npy'))
+    assert list(read.columns) == list(data.columns)
+    assert shares_memory(read[['a', 'b', 'c', 'd']].to_numpy(), matrices[-1])
+    assert (read.to_numpy() == data.to_numpy()).all()
+
+    read: DataFrame = read_matrix(data_path=str(tmp_path / 'data.npy'), cols=[PTID_COL, 'b', 'c'])
+    assert list(read.columns) == [PTID_COL, 'b', 'c']
+    assert shares_memory(read[['b', 'c']].to_numpy(), matrices[-1])
+
+
+def test_read_matrix_scattered_cols(tmp_path):
+    """Scattered features are read in the order they were asked for"""
+
+    data: DataFrame = write_test_matrix(data_path=str(tmp_path / 'data.csv'))
+    read: DataFrame = read_matrix(data_path=str(tmp_path / 'data.npy'), cols=[PTID_COL, 'd', 'a'])
+    assert list(read.columns) == [PTID_COL, 'd', 'a']
+    assert (read.to_numpy() == data[[PTID_COL, 'd', 'a']].to_numpy()).all()
+
+
+def test_stored_path_is_latest_copy(tmp_path):
+    """A data set saved again in another format is read instead of its older copy in the current format"""
+
+    data_path: str = str(tmp_path / 'data.csv')
+    write_test_matrix(data_path=data_path)
+    write_data(data=DataFrame({PTID_COL: ['P0'], 'a': [1.0]}), data_path=data_path, storage_format=CSV_STORAGE_FORMAT)
+    assert get_stored_path(data_path=data_path) == data_path
+
+    utime(data_path, (0, 0))
+    assert get_stored_path(data_path=data_path) == str(tmp_path / 'data.npy')
+    assert list(read_data(data_path=data_path).columns) == [PTID_COL, 'a', 'b', 'c', 'd']